@@ -0,0 +1,338 @@
+import argparse
+import gzip
+import json
+import os
+import threading
+import traceback
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func
+from config import get_setting, get_int_setting
+from database import data_path, run_in_session, session_scope
+from models import AuditLog
+from report_data import iter_chunks
+
+# --- Audit Archive Settings ---
+AUDIT_ARCHIVE_DIR = data_path(get_setting('audit', 'archive_dir', 'audit_archive'))  # Relative: beside the database
+AUDIT_RETENTION_MONTHS = get_int_setting('audit', 'retention_months', 12)  # 0 keeps every log in the database
+ARCHIVE_CHUNK_SIZE = 2000  # Rows read, written and deleted per round trip while archiving
+MANIFEST_NAME = 'manifest.json'
+# Manifest fields holding a month's distinct values, for the log viewer's filter lists
+FILTER_COLUMNS = ('username', 'user_role', 'action_type')
+
+# An archived row, with the same attributes as AuditLog and the same column order as the audit log export
+ArchivedAuditLog = namedtuple('ArchivedAuditLog', ('id', 'timestamp', 'username', 'user_role', 'action_type',
+                                                   'old_value', 'new_value', 'row_hash'))
+
+
+def month_key(day):
+    return day.strftime('%Y-%m')
+
+
+def month_start(key):
+    return datetime.strptime(key, '%Y-%m')
+
+
+def next_month_start(key):
+    start = month_start(key)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def first_database_id(session):
+    """
+    The oldest log id still in the database (None if it has no logs). Archive reads skip ids from here on:
+    a crash after a month was written to its archive file but before its rows were deleted leaves those
+    rows in both places until the month is archived again.
+    """
+    return session.query(func.min(AuditLog.id)).scalar()
+
+
+def retention_cutoff(retention_months, today=None):
+    """First moment that stays in the database: the start of the month retention_months before today's."""
+    today = today or date.today()
+    months = today.year * 12 + today.month - 1 - retention_months
+    return datetime(months // 12, months % 12 + 1, 1)
+
+
+class AuditArchive:
+    """
+    Audit logs moved out of the database, one gzip-compressed JSON-lines file per calendar month
+    (audit-YYYY-MM.jsonl.gz). Files are only ever appended to: each archiving run adds a new gzip
+    member. manifest.json lists the archived months with their row counts and distinct usernames,
+    roles and actions, so queries skip months that cannot match without opening them.
+    Archived logs are older than everything left in the database, so the log viewer and the export
+    read them after the database rows, as if they were one table.
+    """
+
+    def __init__(self, directory=AUDIT_ARCHIVE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()  # The archiver thread writes while the Tk thread or export jobs read
+        self._manifest = None
+        self._manifest_mtime = None
+        self._month_cache = {}  # month -> (file mtime, rows sorted by (timestamp, id))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def month_path(self, month):
+        return self._path(f"audit-{month}.jsonl.gz")
+
+    def manifest(self):
+        """{month: {'rows': n, 'username': [...], 'user_role': [...], 'action_type': [...]}}, re-read when changed."""
+        path = self._path(MANIFEST_NAME)
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                return {}
+            if mtime != self._manifest_mtime:
+                with open(path, encoding='utf-8') as manifest_file:
+                    self._manifest = json.load(manifest_file)
+                self._manifest_mtime = mtime
+            return self._manifest
+
+    def _write_manifest(self, manifest):
+        temp_path = self._path(MANIFEST_NAME + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+        os.replace(temp_path, self._path(MANIFEST_NAME))
+
+    def months(self):
+        return sorted(self.manifest())
+
+    def distinct_values(self, column):
+        """Distinct values of username, user_role or action_type across every archived month."""
+        values = set()
+        for info in self.manifest().values():
+            values.update(info.get(column, ()))
+        return values
+
+    def load_month(self, month):
+        """All archived rows of a month, sorted by (timestamp, id). The last few months read are kept in memory."""
+        path = self.month_path(month)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return []
+        with self._lock:
+            cached = self._month_cache.get(month)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        rows = {}  # By id, so a row archived twice after an interrupted run is only returned once
+        complete = True
+        with gzip.open(path, 'rt', encoding='utf-8') as archive_file:
+            try:
+                for line in archive_file:
+                    record = json.loads(line)
+                    record['timestamp'] = datetime.fromisoformat(record['timestamp'])
+                    record.setdefault('row_hash', None)  # Archived before logs were hash-chained
+                    rows[record['id']] = ArchivedAuditLog(**record)
+            except (EOFError, ValueError):
+                # The archiver is still appending to this month; those rows are also still in the database
+                complete = False
+        ordered = sorted(rows.values(), key=lambda log: (log.timestamp, log.id))
+        if not complete:
+            return ordered
+        with self._lock:
+            if len(self._month_cache) >= 3 and month not in self._month_cache:
+                self._month_cache.pop(next(iter(self._month_cache)))
+            self._month_cache[month] = (mtime, ordered)
+        return ordered
+
+    def _candidate_months(self, username=None, user_role=None, action_type=None, start_date=None, end_date=None):
+        manifest = self.manifest()
+        wanted = {'username': username, 'user_role': user_role, 'action_type': action_type}
+        months = []
+        for month in sorted(manifest):
+            if start_date and next_month_start(month).date() <= start_date:
+                continue
+            if end_date and month_start(month).date() > end_date:
+                continue
+            if any(value and value not in manifest[month].get(column, ()) for column, value in wanted.items()):
+                continue
+            months.append(month)
+        return months
+
+    def estimate_rows(self, start_date=None, end_date=None, username=None, user_role=None, action_type=None):
+        """Upper bound on the archived rows matching the filters, from the manifest alone (for progress bars)."""
+        manifest = self.manifest()
+        return sum(manifest[month]['rows']
+                   for month in self._candidate_months(username, user_role, action_type, start_date, end_date))
+
+    @staticmethod
+    def _matches(log, username, user_role, action_type, start, end, terms=None):
+        if not ((not username or log.username == username) and (not user_role or log.user_role == user_role)
+                and (not action_type or log.action_type == action_type)
+                and (start is None or log.timestamp >= start) and (end is None or log.timestamp < end)):
+            return False
+        if terms:
+            # No full-text index here: every search term must appear somewhere in the log's text
+            haystack = ' '.join(value or '' for value in
+                                (log.action_type, log.username, log.old_value, log.new_value)).lower()
+            return all(term in haystack for term in terms)
+        return True
+
+    def fetch_page(self, username=None, user_role=None, action_type=None, start_date=None, end_date=None,
+                   before=None, limit=100, terms=None, below_id=None):
+        """
+        Up to limit archived logs matching the viewer's filters (and containing every lower-case search
+        term, if given), newest first, older than the before cursor. Logs with ids from below_id on
+        (first_database_id) are skipped, as the database still has them.
+        """
+        start = datetime.combine(start_date, time.min) if start_date else None
+        end = datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None
+        logs = []
+        for month in reversed(self._candidate_months(username, user_role, action_type, start_date, end_date)):
+            if before is not None and month_start(month) > before[0]:
+                continue
+            for log in reversed(self.load_month(month)):
+                if before is not None and (log.timestamp, log.id) >= before:
+                    continue
+                if below_id is not None and log.id >= below_id:
+                    continue
+                if self._matches(log, username, user_role, action_type, start, end, terms):
+                    logs.append(log)
+                    if len(logs) >= limit:
+                        return logs
+        return logs
+
+    def iter_chunks(self, start_date=None, end_date=None, username=None, user_role=None, action_type=None,
+                    chunk_size=5000, terms=None, below_id=None):
+        """
+        Archived logs matching the filters and search terms, oldest first, in lists of up to chunk_size.
+        Logs with ids from below_id on are skipped, like in fetch_page.
+        """
+        start = datetime.combine(start_date, time.min) if start_date else None
+        end = datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None
+        chunk = []
+        for month in self._candidate_months(username, user_role, action_type, start_date, end_date):
+            for log in self.load_month(month):
+                if below_id is not None and log.id >= below_id:
+                    continue
+                if self._matches(log, username, user_role, action_type, start, end, terms):
+                    chunk.append(log)
+                    if len(chunk) >= chunk_size:
+                        yield chunk
+                        chunk = []
+        if chunk:
+            yield chunk
+
+    def archive(self, retention_months=AUDIT_RETENTION_MONTHS, today=None, session_factory=None):
+        """
+        Moves logs older than the retention period out of the database, a month at a time. Each month's
+        rows are appended to its archive file and fsynced before they are deleted (as a unit of work, see
+        run_in_session), so a crash can at worst leave rows in both places: readers skip them (see
+        first_database_id), and they are not written again the next time that month is archived.
+        The newest log always stays, as new logs are hash-chained to it (see audit_chain.py).
+        Returns the number of rows moved.
+        """
+        if retention_months <= 0:
+            return 0
+        cutoff = retention_cutoff(retention_months, today)
+        with session_scope(write=False, session_factory=session_factory) as session:
+            oldest = session.query(func.min(AuditLog.timestamp)).filter(AuditLog.timestamp < cutoff).scalar()
+            newest_id = session.query(func.max(AuditLog.id)).scalar()
+        if oldest is None:
+            return 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = dict(self.manifest())
+        moved = 0
+        month = month_key(oldest)
+        while month_start(month) < cutoff:
+            moved += self._archive_month(month, manifest, newest_id, session_factory)
+            month = month_key(next_month_start(month))
+        return moved
+
+    def _archive_month(self, month, manifest, newest_id, session_factory=None):
+        """Moves one month's logs (except the newest log) into its archive file. Returns the number of rows moved."""
+        with session_scope(write=False, session_factory=session_factory) as session:
+            ids = self._write_month(session, month, manifest, newest_id)
+        if not ids:
+            return 0
+        # The read transaction is over, so it cannot hold up the delete's write lock
+        run_in_session(_delete_logs, ids, session_factory=session_factory)
+        return len(ids)
+
+    def _write_month(self, session, month, manifest, newest_id):
+        """Appends one month's logs that are not archived yet to its file and the manifest. Returns their ids."""
+        query = session.query(AuditLog.id, AuditLog.timestamp, AuditLog.username, AuditLog.user_role,
+                              AuditLog.action_type, AuditLog.old_value, AuditLog.new_value, AuditLog.row_hash).filter(
+            AuditLog.timestamp >= month_start(month), AuditLog.timestamp < next_month_start(month),
+            AuditLog.id < newest_id
+        ).order_by(AuditLog.timestamp, AuditLog.id)
+        info = manifest.get(month, {'rows': 0})
+        already_archived = {log.id for log in self.load_month(month)} if month in manifest else set()
+        values = {column: set(info.get(column, ())) for column in FILTER_COLUMNS}
+        ids = []
+        with open(self.month_path(month), 'ab') as raw_file:
+            with gzip.GzipFile(fileobj=raw_file, mode='wb') as archive_file:
+                for chunk in iter_chunks(query, ARCHIVE_CHUNK_SIZE):
+                    for row in chunk:
+                        ids.append(row.id)
+                        if row.id in already_archived:
+                            continue
+                        record = dict(row._mapping)
+                        record['timestamp'] = record['timestamp'].isoformat()
+                        archive_file.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+                        info['rows'] += 1
+                        for column in FILTER_COLUMNS:
+                            values[column].add(record[column])
+            raw_file.flush()
+            os.fsync(raw_file.fileno())
+        if not ids:
+            return ids
+
+        info.update({column: sorted(values[column]) for column in FILTER_COLUMNS})
+        manifest[month] = info
+        with self._lock:
+            self._write_manifest(manifest)
+        return ids
+
+
+def _delete_logs(session, ids):
+    for index in range(0, len(ids), ARCHIVE_CHUNK_SIZE):
+        session.query(AuditLog).filter(AuditLog.id.in_(ids[index:index + ARCHIVE_CHUNK_SIZE])).delete(
+            synchronize_session=False)
+
+
+audit_archive = AuditArchive()
+
+
+def start_background_archival(retention_months=AUDIT_RETENTION_MONTHS):
+    """Archives old logs on a daemon thread with its own sessions, so start-up does not wait for it."""
+    if retention_months <= 0:
+        return None
+
+    def run():
+        try:
+            moved = audit_archive.archive(retention_months)
+            if moved:
+                print(f"Archived {moved} audit log(s) older than {retention_months} months to {audit_archive.directory}")
+        except Exception:
+            print(f"Error archiving audit logs: {traceback.format_exc()}")
+
+    thread = threading.Thread(target=run, name="AuditArchiver", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    from database import Base, engine
+    from migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Move old audit logs into compressed monthly archive files.")
+    parser.add_argument('--months', type=int, default=AUDIT_RETENTION_MONTHS,
+                        help="months of logs to keep in the database")
+    parser.add_argument('--vacuum', action='store_true', help="compact the database file afterwards")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    print(f"Moved {audit_archive.archive(args.months)} audit log(s) to {audit_archive.directory}")
+    if args.vacuum:
+        with engine.connect() as conn:
+            conn.exec_driver_sql('VACUUM')
+    for archived_month in audit_archive.months():
+        print(f"  {archived_month}: {audit_archive.manifest()[archived_month]['rows']} rows")
@@ -0,0 +1,277 @@
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from config import get_setting
+from database import data_path
+from models import AuditLog, AuditCheckpoint
+from report_data import iter_chunks
+from audit_archive import audit_archive
+
+# --- Audit Chain Settings ---
+# Each audit log stores row_hash = SHA-256(previous log's row_hash + this log's values), so editing or
+# deleting a log breaks every hash after it. Verification re-hashes the chain from the newest signed
+# checkpoint and then records a new checkpoint, so each run only reads the logs written since the last one.
+GENESIS_HASH = '0' * 64  # The "previous hash" of the first chained log
+# Relative: beside the database, so starting from another directory does not create a new key
+CHECKPOINT_KEY_FILE = data_path(get_setting('audit', 'checkpoint_key_file', 'audit_checkpoint.key'))
+VERIFY_CHUNK_SIZE = 5000  # Logs read per round trip while verifying
+VERIFY_INTERVAL = timedelta(days=1)  # Start-up verification is skipped when the newest checkpoint is younger
+SPOT_CHECK_SIZE = 200  # Random logs before the checkpoint re-hashed by each incremental run
+_hash_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))  # Reused: json.dumps builds one per call
+
+
+class AuditChainError(Exception):
+    """The audit log chain does not verify: a log was edited or deleted, or a checkpoint was forged."""
+
+
+def log_hash(previous_hash, log_id, timestamp, username, user_role, action_type, old_value, new_value):
+    """Chain hash of one log: SHA-256 over the previous log's hash and this log's values."""
+    values = _hash_encoder.encode([log_id, timestamp.isoformat() if timestamp else None, username, user_role,
+                                   action_type, old_value, new_value])
+    return hashlib.sha256((previous_hash + values).encode('utf-8')).hexdigest()
+
+
+def chain_tail(session):
+    """(id, row_hash) of the newest log, which the next log is chained to; (0, GENESIS_HASH) for an empty table."""
+    tail = session.query(AuditLog.id, AuditLog.row_hash).order_by(AuditLog.id.desc()).first()
+    return (tail.id, tail.row_hash or GENESIS_HASH) if tail else (0, GENESIS_HASH)
+
+
+def chain_records(records, last_id, last_hash):
+    """Gives new AuditLog value dicts consecutive ids after last_id and chains their hashes to last_hash."""
+    for record in records:
+        last_id += 1
+        last_hash = log_hash(last_hash, last_id, record['timestamp'], record['username'], record['user_role'],
+                             record['action_type'], record.get('old_value'), record.get('new_value'))
+        record['id'] = last_id
+        record['row_hash'] = last_hash
+    return records
+
+
+def load_checkpoint_key(path=CHECKPOINT_KEY_FILE):
+    """
+    The key checkpoints are signed with, created (readable by its owner only) the first time it is needed.
+    It must not be copied along with bar_audit.db: whoever has both can forge checkpoints.
+    """
+    while True:
+        try:
+            with open(path, encoding='ascii') as key_file:
+                return bytes.fromhex(key_file.read().strip())
+        except FileNotFoundError:
+            pass
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            continue  # Another process created it first
+        with os.fdopen(fd, 'w', encoding='ascii') as key_file:
+            key_file.write(os.urandom(32).hex())
+
+
+def checkpoint_signature(key, last_log_id, chain_hash, rows_verified, created_at):
+    message = f"{last_log_id}|{chain_hash}|{rows_verified}|{created_at.isoformat()}"
+    return hmac.new(key, message.encode('ascii'), hashlib.sha256).hexdigest()
+
+
+class ChainVerification:
+    """What a verification run found: how many logs were re-hashed and, if the chain is broken, where."""
+
+    def __init__(self, full):
+        self.full = full
+        self.ok = True
+        self.start_id = 0  # Logs after this id were re-hashed
+        self.checked = 0
+        self.broken_id = None
+        self.problem = None
+        self.checkpoint = None  # The checkpoint recorded by this run, if any
+
+    def fail(self, log_id, problem):
+        self.ok = False
+        self.broken_id = log_id
+        self.problem = problem
+        return self
+
+    def summary(self):
+        scope = "all logs" if self.full or not self.start_id else f"logs after #{self.start_id}"
+        if not self.ok:
+            return f"Audit log chain broken at log #{self.broken_id}: {self.problem}"
+        if not self.checked:
+            return f"Audit log chain intact; no new logs since the last checkpoint (#{self.start_id})."
+        return f"Audit log chain intact: {self.checked} {scope} verified."
+
+
+def _archived_logs(after_id, before_id):
+    """Archived logs with after_id < id < before_id (None: no upper bound), in id order."""
+    for month in audit_archive.months():
+        logs = [log for log in audit_archive.load_month(month)
+                if log.id > after_id and (before_id is None or log.id < before_id)]
+        yield from sorted(logs, key=lambda log: log.id)
+
+
+def _spot_check(session, result, oldest_id, last_id):
+    """
+    Re-hashes a random sample of the logs up to last_id against their predecessors' stored hashes.
+    Catches a log whose values were edited without rewriting the hashes, which the incremental
+    run alone would only find on the next full verification.
+    """
+    columns = (AuditLog.id, AuditLog.timestamp, AuditLog.username, AuditLog.user_role, AuditLog.action_type,
+               AuditLog.old_value, AuditLog.new_value, AuditLog.row_hash)
+    if oldest_id is None or last_id <= oldest_id:
+        return result
+    for sample_id in random.sample(range(oldest_id + 1, last_id + 1), min(SPOT_CHECK_SIZE, last_id - oldest_id)):
+        log = session.query(*columns).filter(AuditLog.id >= sample_id).order_by(AuditLog.id).first()
+        previous = session.query(AuditLog.row_hash).filter(AuditLog.id < log.id).order_by(
+            AuditLog.id.desc()).limit(1).scalar()
+        if log.row_hash is None or previous is None:
+            continue  # Logged before the hash chain was introduced
+        if log.row_hash != log_hash(previous, log.id, log.timestamp, log.username, log.user_role, log.action_type,
+                                    log.old_value, log.new_value):
+            return result.fail(log.id, "the log does not match its hash: it was edited, or a log before it "
+                                       "was deleted or edited")
+    return result
+
+
+def verify_audit_chain(session, full=False, key=None, write_checkpoint=True, job=None):
+    """
+    Re-hashes the audit log chain and, if it is intact, records a signed checkpoint at the newest log.
+    Normally only the logs after the newest checkpoint are re-hashed, once that checkpoint's signature
+    and the hash of its log have been checked, plus a random sample of older logs; full=True re-hashes
+    every log from the first one, archived months included. Logs written before the chain existed have
+    no hash and are skipped.
+    When run as a background job, reports progress and stops at the next chunk once cancelled.
+    Returns a ChainVerification.
+    """
+    key = key or load_checkpoint_key()
+    result = ChainVerification(full)
+    checkpoint = None if full else session.query(AuditCheckpoint).order_by(
+        AuditCheckpoint.last_log_id.desc(), AuditCheckpoint.id.desc()).first()
+    oldest_id, newest_id = session.query(func.min(AuditLog.id), func.max(AuditLog.id)).one()
+
+    previous_hash, after_id = None, 0
+    if checkpoint:
+        signature = checkpoint_signature(key, checkpoint.last_log_id, checkpoint.chain_hash,
+                                         checkpoint.rows_verified, checkpoint.created_at)
+        if not hmac.compare_digest(signature, checkpoint.signature):
+            return result.fail(checkpoint.last_log_id, "the newest checkpoint's signature does not match "
+                                                       "(a forged checkpoint, or a different key file)")
+        stored_hash = session.query(AuditLog.row_hash).filter(AuditLog.id == checkpoint.last_log_id).scalar()
+        if stored_hash is None and (oldest_id is None or oldest_id < checkpoint.last_log_id):
+            # Not archived either: the archive only ever removes the oldest logs
+            return result.fail(checkpoint.last_log_id, "the log of the newest checkpoint has been deleted")
+        if stored_hash is not None and stored_hash != checkpoint.chain_hash:
+            return result.fail(checkpoint.last_log_id, "a log up to the newest checkpoint was changed since it "
+                                                       "was verified")
+        previous_hash, after_id = checkpoint.chain_hash, checkpoint.last_log_id
+        if not _spot_check(session, result, oldest_id, min(after_id, newest_id or 0)).ok:
+            return result
+    result.start_id = after_id
+    total = max((newest_id or 0) - after_id, 1)
+
+    def logs():
+        if oldest_id is None or oldest_id > after_id + 1:
+            # Logs to check that have been archived since; all of them are older than the database's
+            yield from _archived_logs(after_id, oldest_id)
+        query = session.query(AuditLog.id, AuditLog.timestamp, AuditLog.username, AuditLog.user_role,
+                              AuditLog.action_type, AuditLog.old_value, AuditLog.new_value,
+                              AuditLog.row_hash).filter(AuditLog.id > after_id).order_by(AuditLog.id)
+        for chunk in iter_chunks(query, VERIFY_CHUNK_SIZE):
+            if job:
+                job.check_cancelled()
+                job.report_progress(min((chunk[-1].id - after_id) / total, 1.0),
+                                    f"{result.checked} logs verified")
+            yield from chunk
+
+    last_id = after_id
+    for log in logs():
+        if previous_hash is None:
+            if log.row_hash is None:
+                continue  # Logged before the hash chain was introduced
+            previous_hash = GENESIS_HASH
+        expected = log_hash(previous_hash, log.id, log.timestamp, log.username, log.user_role, log.action_type,
+                            log.old_value, log.new_value)
+        if log.row_hash != expected:
+            return result.fail(log.id, "the log does not match its hash: it was edited, or a log before it "
+                                       "was deleted or edited")
+        previous_hash, last_id = expected, log.id
+        result.checked += 1
+
+    if write_checkpoint and result.checked:
+        created_at = datetime.utcnow()
+        result.checkpoint = AuditCheckpoint(
+            last_log_id=last_id, chain_hash=previous_hash, rows_verified=result.checked, created_at=created_at,
+            signature=checkpoint_signature(key, last_id, previous_hash, result.checked, created_at))
+        session.add(result.checkpoint)
+        session.commit()
+    return result
+
+
+def run_verify_job(job, full, username, user_role):
+    """Background job behind "Verify Integrity" on the audit log screen."""
+    from database import Session
+    from helpers import log_action
+    session = Session()  # db_session belongs to the Tk thread
+    try:
+        result = verify_audit_chain(session, full=full, job=job)
+        log_action(username, user_role, 'Verified Audit Logs' if result.ok else 'Audit Chain Broken',
+                   new_value=result.summary(), durable=True)
+        if not result.ok:
+            raise AuditChainError(result.summary())
+        return result.summary()
+    finally:
+        session.close()
+
+
+def start_background_verification(after=None):
+    """
+    Verifies the logs written since the last checkpoint on a daemon thread, unless a checkpoint was
+    made within VERIFY_INTERVAL. `after` is a thread to wait for first (the archiver, which deletes logs).
+    """
+    def run():
+        from database import Session
+        from helpers import log_action
+        if after is not None:
+            after.join()
+        session = Session()
+        try:
+            newest = session.query(func.max(AuditCheckpoint.created_at)).scalar()
+            if newest and datetime.utcnow() - newest < VERIFY_INTERVAL:
+                return
+            result = verify_audit_chain(session)
+            if not result.ok:
+                print(f"Audit log integrity check failed. {result.summary()}")
+                log_action('System', 'System', 'Audit Chain Broken', new_value=result.summary(), durable=True)
+        except Exception:
+            session.rollback()
+            print(f"Error verifying audit logs: {traceback.format_exc()}")
+        finally:
+            session.close()
+
+    thread = threading.Thread(target=run, name="AuditChainVerifier", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    from database import Base, Session, engine
+    from migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Verify the audit log hash chain and record a signed checkpoint.")
+    parser.add_argument('--full', action='store_true', help="re-hash every log instead of those since the last "
+                                                            "checkpoint")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    cli_session = Session()
+    started = datetime.now()
+    cli_result = verify_audit_chain(cli_session, full=args.full)
+    print(f"{cli_result.summary()} ({(datetime.now() - started).total_seconds():.2f} s)")
+    cli_session.close()
+    raise SystemExit(0 if cli_result.ok else 1)
@@ -0,0 +1,204 @@
+import re
+from datetime import datetime, time, timedelta
+from sqlalchemy import and_, or_, func, column, select, table, text, Integer
+from models import AuditLog
+from migrations import AUDIT_SEARCH_TABLE
+from audit_archive import audit_archive, first_database_id
+
+# Number of audit log rows fetched per page by the log viewer
+AUDIT_LOG_PAGE_SIZE = 100
+
+# The FTS5 index created by migration 8; the hidden column named after the table takes the MATCH expression
+audit_search_table = table(AUDIT_SEARCH_TABLE, column('rowid', Integer), column('rank'), column(AUDIT_SEARCH_TABLE))
+_search_available = {}  # Bind -> whether the index exists, checked once per database
+SEARCH_RANK_WINDOW = 1000  # Newest matches ordered by relevance; older matches follow newest first
+
+
+def search_terms(search):
+    """The words of a search box entry, lower-cased, split the way the FTS5 tokenizer splits log text."""
+    return re.findall(r'[^\W_]+', (search or '').lower())
+
+
+def search_match_expression(terms):
+    """FTS5 query matching logs that contain every term, each as a word prefix ("bal" finds "Balance")."""
+    return ' AND '.join(f'"{term}"*' for term in terms)
+
+
+def audit_search_available(session):
+    """True when the database has the full-text index (SQLite built with FTS5); searches fall back to LIKE otherwise."""
+    bind = session.get_bind()
+    if bind not in _search_available:
+        _search_available[bind] = session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': AUDIT_SEARCH_TABLE}).first() is not None
+    return _search_available[bind]
+
+
+def search_log_ids(session, terms):
+    """Subquery of the ids of database logs containing every term, for use with AuditLog.id.in_()."""
+    if audit_search_available(session):
+        return text(f"SELECT rowid FROM {AUDIT_SEARCH_TABLE} WHERE {AUDIT_SEARCH_TABLE} MATCH :match").bindparams(
+            match=search_match_expression(terms)).columns(column('rowid', Integer))
+    return select(AuditLog.id).where(*_like_filters(terms))
+
+
+def _like_filters(terms):
+    columns = (AuditLog.action_type, AuditLog.username, AuditLog.old_value, AuditLog.new_value)
+    return [or_(*(column.ilike(f"%{term}%") for column in columns)) for term in terms]
+
+
+def filter_audit_logs(query, username=None, user_role=None, action_type=None, start_date=None, end_date=None):
+    """Applies the log viewer's filters to a query over AuditLog."""
+    if username:
+        query = query.filter(AuditLog.username == username)
+    if user_role:
+        query = query.filter(AuditLog.user_role == user_role)
+    if action_type:
+        query = query.filter(AuditLog.action_type == action_type)
+    if start_date:
+        query = query.filter(AuditLog.timestamp >= datetime.combine(start_date, time.min))
+    if end_date:
+        query = query.filter(AuditLog.timestamp < datetime.combine(end_date + timedelta(days=1), time.min))
+    return query
+
+
+def _search_match(terms):
+    return audit_search_table.c[AUDIT_SEARCH_TABLE].op('MATCH')(search_match_expression(terms))
+
+
+def _rank_search_window(session, terms, filters):
+    """
+    Ranks the newest SEARCH_RANK_WINDOW matches once, for every page of the search. The window is pinned
+    at the newest log so both queries see the same rows, and later pages reuse the order: bm25 ranks move
+    as logs are added, so re-ranking per page would repeat or skip rows. Returns the ranked stretch's
+    position: (ranked ids, offset, id the recent stretch continues below or None if the window is not full).
+    """
+    # bm25 is computed for every row it orders, so only the newest SEARCH_RANK_WINDOW matches are ranked
+    newest_id = session.query(func.max(AuditLog.id)).scalar() or 0
+    window = select(audit_search_table.c.rowid, audit_search_table.c.rank).where(
+        _search_match(terms), audit_search_table.c.rowid <= newest_id).order_by(
+        audit_search_table.c.rowid.desc()).limit(SEARCH_RANK_WINDOW).subquery()
+    ranked_ids = tuple(log_id for log_id, in filter_audit_logs(session.query(AuditLog.id), **filters).join(
+        window, window.c.rowid == AuditLog.id).order_by(window.c.rank, AuditLog.timestamp.desc(), AuditLog.id.desc()))
+    window_size, oldest_id = session.execute(select(func.count(), func.min(window.c.rowid)).select_from(window)).one()
+    return ranked_ids, 0, oldest_id if window_size >= SEARCH_RANK_WINDOW else None
+
+
+def _ranked_search_page(session, terms, filters, position, limit):
+    ranked_ids, offset, oldest_id = position or _rank_search_window(session, terms, filters)
+    page_ids = ranked_ids[offset:offset + limit]
+    logs_by_id = {log.id: log for log in session.query(AuditLog).filter(AuditLog.id.in_(page_ids))}
+    logs = [logs_by_id[log_id] for log_id in page_ids if log_id in logs_by_id]  # Archived meanwhile: skipped
+    if offset + limit < len(ranked_ids):
+        return logs, ('ranked', (ranked_ids, offset + limit, oldest_id))
+    if oldest_id is None:
+        return logs, _archive_search_cursor()
+    return logs, ('recent', oldest_id)
+
+
+def _recent_search_page(session, terms, filters, before_id, limit):
+    query = filter_audit_logs(session.query(AuditLog), **filters)
+    if audit_search_available(session):
+        query = query.join(audit_search_table, audit_search_table.c.rowid == AuditLog.id).filter(
+            _search_match(terms))
+    else:
+        query = query.filter(*_like_filters(terms))
+    if before_id is not None:
+        query = query.filter(AuditLog.id < before_id)
+    logs = query.order_by(AuditLog.id.desc()).limit(limit + 1).all()
+    if len(logs) > limit:
+        return logs[:limit], ('recent', logs[limit - 1].id)
+    return logs, _archive_search_cursor()
+
+
+def _archive_search_cursor():
+    return ('archive', None) if audit_archive.months() else None
+
+
+def _archive_search_page(session, terms, filters, before, limit):
+    logs = audit_archive.fetch_page(before=before, limit=limit + 1, terms=terms,
+                                    below_id=first_database_id(session), **filters)
+    if len(logs) > limit:
+        return logs[:limit], ('archive', (logs[limit - 1].timestamp, logs[limit - 1].id))
+    return logs, None
+
+
+def search_audit_logs(session, search, username=None, user_role=None, action_type=None,
+                      start_date=None, end_date=None, after=None, limit=AUDIT_LOG_PAGE_SIZE):
+    """
+    Fetches one page of logs containing every word of `search`, in three stretches, each with its own cursor:
+    the newest SEARCH_RANK_WINDOW matches best first (FTS5 bm25 rank, ranked once on the first page),
+    ('ranked', (ranked ids, offset, oldest id)); the older matches newest first, ('recent', id); then
+    archived logs, ('archive', (timestamp, id)). Archived logs have no index, so they are matched by substring.
+    Without FTS5 the ranked stretch is skipped and the database is searched with LIKE. A page never spans
+    two stretches, so it can be shorter than limit.
+    Returns (logs, next_cursor) like fetch_audit_log_page.
+    """
+    terms = search_terms(search)
+    filters = {'username': username, 'user_role': user_role, 'action_type': action_type,
+               'start_date': start_date, 'end_date': end_date}
+    cursor = after or (('ranked', None) if audit_search_available(session) else ('recent', None))
+    while cursor is not None:
+        stretch, position = cursor
+        if stretch == 'ranked':
+            logs, cursor = _ranked_search_page(session, terms, filters, position, limit)
+        elif stretch == 'recent':
+            logs, cursor = _recent_search_page(session, terms, filters, position, limit)
+        else:
+            logs, cursor = _archive_search_page(session, terms, filters, position, limit)
+        if logs:
+            return logs, cursor
+    return [], None
+
+
+def fetch_audit_log_page(session, username=None, user_role=None, action_type=None,
+                         start_date=None, end_date=None, after=None, limit=AUDIT_LOG_PAGE_SIZE, search=None):
+    """
+    Fetches one page of audit logs, newest first, using keyset pagination over (timestamp, id).
+    `after` is the cursor returned by the previous call (None for the first page).
+    Returns (logs, next_cursor); next_cursor is None when there are no more rows.
+    Archived logs are all older than the ones in the database, so once the database runs out the
+    page is filled up from the archive files.
+    With a search text the page comes from search_audit_logs instead, ranked by relevance.
+    """
+    if search_terms(search):
+        return search_audit_logs(session, search, username, user_role, action_type, start_date, end_date,
+                                 after=after, limit=limit)
+    query = filter_audit_logs(session.query(AuditLog), username, user_role, action_type, start_date, end_date)
+
+    if after is not None:
+        after_timestamp, after_id = after
+        query = query.filter(or_(
+            AuditLog.timestamp < after_timestamp,
+            and_(AuditLog.timestamp == after_timestamp, AuditLog.id < after_id)
+        ))
+
+    # Fetch one extra row to find out whether another page exists without a COUNT(*)
+    logs = query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    if len(logs) <= limit and audit_archive.months():
+        before = (logs[-1].timestamp, logs[-1].id) if logs else after
+        logs += audit_archive.fetch_page(username, user_role, action_type, start_date, end_date, before=before,
+                                         limit=limit + 1 - len(logs), below_id=first_database_id(session))
+
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = (logs[-1].timestamp, logs[-1].id)
+    return logs, next_cursor
+
+
+def distinct_audit_values(session, column):
+    """
+    Returns the sorted distinct values of an indexed AuditLog column (e.g. AuditLog.action_type).
+    Walks the index with one MIN() seek per value instead of scanning the whole table, then adds
+    the values of archived months from the archive manifest.
+    """
+    values = []
+    last_value = session.query(func.min(column)).scalar()
+    while last_value is not None:
+        values.append(last_value)
+        last_value = session.query(func.min(column)).filter(column > last_value).scalar()
+    archived = audit_archive.distinct_values(column.key)
+    if archived:
+        values = sorted(archived.union(values))
+    return values
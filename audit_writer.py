@@ -0,0 +1,151 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from database import engine, run_in_session
+from models import AuditLog
+from audit_chain import chain_tail, chain_records
+
+# --- Audit Writer Settings ---
+AUDIT_QUEUE_MAX_SIZE = 10000  # Records held in memory before log_action callers have to wait
+AUDIT_BATCH_SIZE = 200  # Write as soon as this many records are queued...
+AUDIT_FLUSH_INTERVAL = 1.0  # ...or after this many seconds, whichever comes first
+AUDIT_ENQUEUE_TIMEOUT = 5.0  # Seconds to wait for room in a full queue before writing inline
+
+
+class AuditLogWriter:
+    """
+    Queues audit log records in memory and writes them to the database in batches
+    on a background thread with its own session, so callers never commit on the shared db_session.
+    Each batch is hash-chained to the newest log already written (see audit_chain.py).
+    """
+
+    def __init__(self, bind, max_queue_size=AUDIT_QUEUE_MAX_SIZE, batch_size=AUDIT_BATCH_SIZE,
+                 flush_interval=AUDIT_FLUSH_INTERVAL):
+        self.Session = sessionmaker(bind=bind)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._write_lock = threading.Lock()  # Serializes batch writes from the worker and inline fallbacks
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def start(self):
+        """Starts the background writer thread if it is not already running."""
+        with self._start_lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="AuditLogWriter", daemon=True)
+                self._thread.start()
+
+    def submit(self, record, durable=False):
+        """
+        Queues one audit record (a dict of AuditLog column values).
+        With durable=True, blocks until the record and everything queued before it has been committed.
+        Returns False if a durable write failed.
+        """
+        record.setdefault('timestamp', datetime.utcnow())
+        if self._closed:
+            return self._write_batch([record])
+
+        self.start()
+        done = threading.Event() if durable else None
+        item = {'record': record, 'done': done, 'ok': True}
+        try:
+            self._queue.put(item, timeout=AUDIT_ENQUEUE_TIMEOUT)
+        except queue.Full:
+            print("Audit log queue is full; writing record inline.")
+            return self._write_batch([record])
+
+        if done is not None:
+            done.wait()
+            return item['ok']
+        return True
+
+    def flush(self):
+        """Blocks until every record queued so far has been written."""
+        if self._thread is None or self._closed:
+            return True
+        done = threading.Event()
+        item = {'record': None, 'done': done, 'ok': True}
+        self._queue.put(item)
+        done.wait()
+        return item['ok']
+
+    def close(self):
+        """Flushes the queue and stops the writer thread. Safe to call more than once."""
+        with self._start_lock:
+            if self._closed:
+                return
+            self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+        # Write anything that raced in behind the stop marker
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item:
+                leftovers.append(item)
+        ok = self._write_batch([p['record'] for p in leftovers if p['record'] is not None])
+        for p in leftovers:
+            if p['done'] is not None:
+                p['ok'] = ok
+                p['done'].set()
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Flush interval elapsed since the oldest pending record
+
+            stop = item is None
+            if item:
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            flush_now = (stop or item is False or len(pending) >= self.batch_size
+                         or (item and item['done'] is not None))
+            if flush_now and pending:
+                ok = self._write_batch([p['record'] for p in pending if p['record'] is not None])
+                for p in pending:
+                    if p['done'] is not None:
+                        p['ok'] = ok
+                        p['done'].set()
+                pending = []
+                deadline = None
+
+            if stop:
+                return
+
+    def _write_batch(self, records):
+        if not records:
+            return True
+        with self._write_lock:
+            try:
+                # The unit of work holds SQLite's write lock before reading the chain tail, so a writer in
+                # another process cannot append between the read and the insert and fork the chain
+                run_in_session(self._insert_chained, records, session_factory=self.Session)
+                return True
+            except Exception as e:
+                print(f"Error logging action: {e}")
+                return False
+
+    @staticmethod
+    def _insert_chained(session, records):
+        session.bulk_insert_mappings(AuditLog, chain_records([dict(record) for record in records],
+                                                             *chain_tail(session)))
+
+
+audit_writer = AuditLogWriter(engine)
+atexit.register(audit_writer.close)
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from sqlalchemy.orm.exc import StaleDataError
+from config import get_int_setting, get_float_setting
+from database import Session
+from models import User, hash_password
+from helpers import log_action
+
+# --- Login Throttle Settings ---
+LOGIN_FREE_ATTEMPTS = get_int_setting('security', 'login_free_attempts', 3)
+LOGIN_BACKOFF_BASE_SECONDS = get_float_setting('security', 'login_backoff_base_seconds', 2.0)
+LOGIN_BACKOFF_MAX_SECONDS = get_float_setting('security', 'login_backoff_max_seconds', 300.0)
+
+# Checked when the username does not exist, so unknown and known usernames take equally long to reject
+_dummy_hash = None
+
+
+class LoginThrottle:
+    """
+    Remembers failed logins per username in memory. After free_attempts failures, the username is
+    locked for base_seconds, doubling with each further failure up to max_seconds. A successful
+    login clears the count. Locked attempts are rejected before any hashing or logging happens.
+    """
+
+    def __init__(self, free_attempts=LOGIN_FREE_ATTEMPTS, base_seconds=LOGIN_BACKOFF_BASE_SECONDS,
+                 max_seconds=LOGIN_BACKOFF_MAX_SECONDS, clock=time.monotonic):
+        self.free_attempts = free_attempts
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.clock = clock
+        self._failures = {}  # username -> (failure count, locked until)
+        self._lock = threading.Lock()
+
+    def seconds_locked(self, username):
+        """Seconds until this username may try again (0 if it is not locked)."""
+        with self._lock:
+            failures = self._failures.get(username.lower())
+        if not failures:
+            return 0
+        return max(0.0, failures[1] - self.clock())
+
+    def record_failure(self, username):
+        """Counts a failed attempt and returns how many seconds the username is now locked for."""
+        key = username.lower()
+        with self._lock:
+            count = self._failures.get(key, (0, 0.0))[0] + 1
+            delay = 0.0
+            if count > self.free_attempts:
+                delay = min(self.max_seconds, self.base_seconds * 2 ** (count - self.free_attempts - 1))
+            self._failures[key] = (count, self.clock() + delay)
+        return delay
+
+    def record_success(self, username):
+        with self._lock:
+            self._failures.pop(username.lower(), None)
+
+
+def authenticate(username, password):
+    """
+    Checks a username and password with a session of its own, so it can run on a worker thread.
+    Returns the id of the active user, or None. A correct password stored with outdated hash
+    settings is rehashed with the current ones before returning.
+    """
+    global _dummy_hash
+    session = Session()
+    try:
+        user = session.query(User).filter_by(username=username).first()
+        if user is None:
+            if _dummy_hash is None:
+                _dummy_hash = hash_password('')
+            from werkzeug.security import check_password_hash
+            check_password_hash(_dummy_hash, password)
+            return None
+        if not user.check_password(password) or not user.is_active:
+            return None
+        if user.password_needs_rehash():
+            user.set_password(password)
+            try:
+                session.commit()
+                log_action(user.username, user.role, 'Password Rehashed')
+            except StaleDataError:
+                session.rollback()  # Changed on another terminal meanwhile; rehashed at the next login
+        return user.id
+    finally:
+        session.close()
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,99 @@
+"""
+Measures audit log integrity checks: generates a hash-chained audit log, times a full verification
+(which records the first checkpoint), then appends a day's worth of logs and times the incremental
+verification that only re-hashes those. Finally edits one new log behind the trigger's back and
+checks that the incremental verification finds it.
+
+Usage: python benchmarks/bench_audit_chain.py [--rows 2000000] [--daily-rows 5000]
+Runs against a temporary database and key file, so bar_audit.db is never touched.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAFF_COUNT = 20
+ITEMS = ['Beer Bottle', 'Wine Glass', 'Soda Can', 'Spirit Shot']
+BATCH_SIZE = 20000
+
+
+def append_logs(session, rows, start):
+    """Inserts rows chained logs, as the audit writer would, one BATCH_SIZE batch per transaction."""
+    from sqlalchemy import insert
+    from models import AuditLog
+    from audit_chain import chain_tail, chain_records
+
+    step = timedelta(seconds=30)
+    for offset in range(0, rows, BATCH_SIZE):
+        records = [{'username': f"staff{random.randint(1, STAFF_COUNT)}", 'user_role': 'Staff',
+                    'action_type': 'Staff Add Sale', 'old_value': None,
+                    'new_value': f"{random.choice(ITEMS)} x {random.randint(1, 5)}",
+                    'timestamp': start + step * (offset + i)} for i in range(min(BATCH_SIZE, rows - offset))]
+        session.execute(insert(AuditLog), chain_records(records, *chain_tail(session)))
+        session.commit()
+    return start + step * rows
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2000000, help="logs in the chain before the first check")
+    parser.add_argument('--daily-rows', type=int, default=5000, help="logs added between the two checks")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        # Must be set before the app's modules create the engine
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ['BAR_AUDIT_AUDIT_CHECKPOINT_KEY_FILE'] = os.path.join(workdir, 'checkpoint.key')
+        from sqlalchemy import text
+        from database import Base, Session, engine
+        from migrations import run_migrations
+        from audit_writer import audit_writer
+        from audit_chain import verify_audit_chain
+
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        session = Session()
+        random.seed(42)
+        print(f"Generating {args.rows} chained audit logs...")
+        next_start = append_logs(session, args.rows, datetime.now() - timedelta(days=365))
+
+        print(f"{'check':<28} {'logs hashed':>12} {'seconds':>8} {'logs/s':>10}")
+        for name, full, rows in (("full (first checkpoint)", True, 0), ("incremental, nothing new", False, 0),
+                                 ("incremental after a day", False, args.daily_rows)):
+            if rows:
+                append_logs(session, rows, next_start)
+            elapsed, result = timed(lambda: verify_audit_chain(session, full=full))
+            print(f"{name:<28} {result.checked:>12} {elapsed:>8.3f} {result.checked / elapsed:>10.0f}  "
+                  f"{'ok' if result.ok else result.summary()}")
+
+        # Tamper with a log written after the checkpoint, as someone editing bar_audit.db directly would
+        append_logs(session, 100, next_start + timedelta(days=1))
+        session.execute(text("DROP TRIGGER trg_audit_logs_append_only"))
+        session.execute(text("UPDATE audit_logs SET new_value = 'Beer Bottle x 1' "
+                             "WHERE id = (SELECT MAX(id) - 50 FROM audit_logs)"))
+        session.commit()
+        elapsed, result = timed(lambda: verify_audit_chain(session))
+        print(f"{'incremental after tampering':<28} {result.checked:>12} {elapsed:>8.3f} {'':>10}  {result.summary()}")
+
+        session.close()
+        audit_writer.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
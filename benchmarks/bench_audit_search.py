@@ -0,0 +1,129 @@
+"""
+Measures audit log search: generates audit logs that look like the ones the app writes, then times
+the first page of a few searches through the FTS5 index and with the LIKE scan it replaces.
+Also times the index backfill (migration 8) over the existing rows.
+
+Usage: python benchmarks/bench_audit_search.py [--rows 1000000] [--repeat 5]
+Runs against a temporary database, so bar_audit.db is never touched.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAFF_COUNT = 20
+ITEMS = ['Beer Bottle', 'Wine Glass', 'Soda Can', 'Spirit Shot', 'Heineken Lager', 'Guinness Stout']
+SEARCHES = ['heineken', 'old balance', 'staff7 wine', 'deduct', 'no such thing']
+BATCH_SIZE = 20000
+
+
+def log_rows(rows):
+    start = datetime.now() - timedelta(days=365)
+    step = 365 * 24 * 3600 / max(rows, 1)
+    for i in range(rows):
+        username = f"staff{random.randint(1, STAFF_COUNT)}"
+        kind = random.random()
+        if kind < 0.7:
+            action, old_value, new_value = 'Staff Add Sale', None, f"{random.choice(ITEMS)} x {random.randint(1, 5)}"
+        elif kind < 0.9:
+            balance = random.randint(0, 50) * 1000
+            action, old_value, new_value = ('Deduct Penalty', f"Old Balance: {balance}",
+                                            f"New Balance: {balance + 500}, Reason: Shortage")
+        else:
+            action, old_value, new_value = 'Supply Item', f"{random.choice(ITEMS)} stock: 10", "stock: 34"
+        yield {'username': username, 'user_role': 'Staff', 'action_type': action, 'old_value': old_value,
+               'new_value': new_value, 'timestamp': start + timedelta(seconds=i * step)}
+
+
+def populate(session, rows):
+    from sqlalchemy import insert
+    from models import AuditLog
+
+    batch = []
+    for row in log_rows(rows):
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            session.execute(insert(AuditLog), batch)
+            batch = []
+    if batch:
+        session.execute(insert(AuditLog), batch)
+    session.commit()
+
+
+def timed(func, repeat):
+    """Best wall time of repeat calls, in milliseconds, and the last result."""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5, help="runs per search; the best time is printed")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        # Must be set before the app's modules create the engine
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        from sqlalchemy import text
+        from database import Base, Session, engine
+        from migrations import MIGRATIONS, run_migrations, AUDIT_SEARCH_TABLE
+        from models import AuditLog
+        from audit_writer import audit_writer
+        from audit_queries import search_audit_logs, search_terms, _like_filters
+        import audit_queries
+
+        # Load the logs before the search migration, as on an upgraded database, to time its backfill
+        Base.metadata.create_all(engine)
+        search_version = next(version for version, description, _ in MIGRATIONS if 'search' in description.lower())
+        search_migrations = [m for m in MIGRATIONS if m[0] >= search_version]
+        del MIGRATIONS[-len(search_migrations):]
+        run_migrations(engine)
+        session = Session()
+        random.seed(42)
+        print(f"Generating {args.rows} audit logs...")
+        populate(session, args.rows)
+
+        MIGRATIONS.append(search_migrations[0])
+        started = time.perf_counter()
+        run_migrations(engine)
+        print(f"Search index backfill: {time.perf_counter() - started:.1f} s")
+        MIGRATIONS.extend(search_migrations[1:])
+        run_migrations(engine)
+        with engine.connect() as conn:
+            if not conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"),
+                                {'name': AUDIT_SEARCH_TABLE}).first():
+                print("This SQLite build has no FTS5; only the LIKE fallback can be measured.")
+
+        print(f"{'search':<16} {'matches':>9} {'fts ms':>9} {'like ms':>9}")
+        for search in SEARCHES:
+            terms = search_terms(search)
+            matches = session.query(AuditLog).filter(*_like_filters(terms)).count()
+            fts_ms, _ = timed(lambda: search_audit_logs(session, search), args.repeat)
+            # Same first page through the fallback path the viewer uses on a build without FTS5
+            audit_queries._search_available[session.get_bind()] = False
+            like_ms, _ = timed(lambda: search_audit_logs(session, search), args.repeat)
+            audit_queries._search_available.clear()
+            print(f"{search:<16} {matches:>9} {fts_ms:>9.1f} {like_ms:>9.1f}")
+
+        session.close()
+        audit_writer.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Contention benchmark for balance and stock updates: N processes change the same inventory item (and,
+for the services, the same user's salary balance) at once, in three ways:
+
+  read, then write     the old views' way: the item is read when the screen is shown and its new
+                       quantity written later, in another transaction; concurrent deliveries get lost
+  version-checked      the same, but the write goes through the ORM, which checks the row's version;
+                       a conflicting write raises StaleDataError and is redone from a fresh read
+  atomic services      services.inventory.supply_item / services.payroll via run_in_session,
+                       which add the delta in SQL (x = x + :delta) and write audit logs
+
+Prints the throughput, the conflicts retried and the updates lost (expected minus actual quantity).
+
+Usage: python benchmarks/bench_contention.py [--writers 8] [--operations 200] [--journal-mode WAL]
+Runs against a temporary database, so bar_audit.db is never touched. Exits with status 1 if the
+version-checked or atomic scenario loses an update.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INITIAL_STOCK = 1000
+INITIAL_BALANCE = 100000.0
+START_DELAY = 2.0  # Seconds for every process to import the app before the writers start together
+SCENARIOS = ('read, then write', 'version-checked', 'atomic services')
+
+
+def read_then_write(quantity):
+    from sqlalchemy import update
+    from database import session_scope
+    from models import InventoryItem
+
+    with session_scope(write=False) as session:
+        supply_qty = session.get(InventoryItem, 1).supply_qty
+    time.sleep(0)  # Let another writer in, as the user typing the quantity would
+    with session_scope() as session:
+        table = InventoryItem.__table__
+        session.execute(update(table).where(table.c.id == 1).values(supply_qty=supply_qty + quantity))
+    return 0
+
+
+def version_checked(quantity):
+    from sqlalchemy.orm.exc import StaleDataError
+    from database import session_scope
+    from models import InventoryItem
+
+    conflicts = 0
+    while True:
+        with session_scope(write=False) as session:
+            item = session.get(InventoryItem, 1)
+        time.sleep(0)
+        item.supply_qty += quantity
+        try:
+            with session_scope() as session:
+                session.add(item)  # UPDATE ... WHERE id = 1 AND version = <version read>
+            return conflicts
+        except StaleDataError:
+            conflicts += 1
+            time.sleep(random.uniform(0, 0.005 * conflicts))
+
+
+def writer(scenario, writer_number, operations, start_at):
+    """One writer process. Returns what it changed and how many conflicts it retried."""
+    from database import run_in_session
+    from models import User
+    from audit_writer import audit_writer
+    from services import inventory, payroll
+
+    stats = {'supplied': 0, 'balance_change': 0.0, 'conflicts': 0, 'errors': []}
+    rng = random.Random(writer_number)
+    time.sleep(max(0.0, start_at - time.time()))
+    for number in range(operations):
+        quantity = rng.randint(1, 5)
+        try:
+            if scenario == 'read, then write':
+                stats['conflicts'] += read_then_write(quantity)
+            elif scenario == 'version-checked':
+                stats['conflicts'] += version_checked(quantity)
+            elif number % 2 == 0:
+                run_in_session(lambda session: inventory.supply_item(session, session.get(User, 1), 1, quantity))
+            elif number % 4 == 1:
+                run_in_session(lambda session: payroll.deduct_penalty(session, session.get(User, 1), 1, 10.0, "Bench"))
+                stats['balance_change'] -= 10.0
+                continue
+            else:
+                run_in_session(lambda session: payroll.add_bonus(session, session.get(User, 1), 1, 25.0, "Bench"))
+                stats['balance_change'] += 25.0
+                continue
+            stats['supplied'] += quantity
+        except Exception as e:
+            stats['errors'].append(f"writer {writer_number}: {type(e).__name__}: {e}")
+    audit_writer.close()
+    return stats
+
+
+def reset(session):
+    from models import User, InventoryItem
+
+    item = session.get(InventoryItem, 1)
+    item.supply_qty = item.opening_stock = item.closing_stock = INITIAL_STOCK
+    session.get(User, 1).current_salary_balance = INITIAL_BALANCE
+    session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=8, help="parallel writer processes")
+    parser.add_argument('--operations', type=int, default=200, help="updates made by each writer per scenario")
+    parser.add_argument('--journal-mode', default='WAL', choices=('WAL', 'DELETE'))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    failed = False
+    try:
+        # Must be set before the app's modules create the engine; the writer processes inherit them
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ['BAR_AUDIT_DATABASE_JOURNAL_MODE'] = args.journal_mode
+        os.environ['BAR_AUDIT_AUDIT_CHECKPOINT_KEY_FILE'] = os.path.join(workdir, 'checkpoint.key')
+        from database import Base, Session, engine
+        from migrations import run_migrations
+        from models import User, InventoryItem
+
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        session = Session()
+        session.add(User(username='admin', password_hash='x', role='Admin'))
+        session.add(InventoryItem(name='Beer Bottle', price_per_unit=1000.0))
+        session.commit()
+
+        print(f"{args.writers} writers x {args.operations} updates of one row, journal_mode={args.journal_mode}")
+        print(f"{'scenario':<18} {'seconds':>8} {'updates/s':>10} {'conflicts':>10} {'lost':>6} {'errors':>7}")
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(args.writers) as pool:
+            for scenario in SCENARIOS:
+                reset(session)
+                start_at = time.time() + START_DELAY
+                started = time.perf_counter()
+                results = pool.starmap(writer, [(scenario, number, args.operations, start_at)
+                                                for number in range(1, args.writers + 1)])
+                elapsed = time.perf_counter() - started - START_DELAY
+
+                session.expire_all()
+                lost = INITIAL_STOCK + sum(r['supplied'] for r in results) - session.get(InventoryItem, 1).supply_qty
+                lost_balance = round(INITIAL_BALANCE + sum(r['balance_change'] for r in results)
+                                     - session.get(User, 1).current_salary_balance, 2)
+                errors = [error for r in results for error in r['errors']]
+                print(f"{scenario:<18} {elapsed:>8.2f} {args.writers * args.operations / elapsed:>10.0f} "
+                      f"{sum(r['conflicts'] for r in results):>10} {lost:>6} {len(errors):>7}")
+                if lost_balance:
+                    print(f"  balance off by {lost_balance}")
+                for error in errors[:5]:
+                    print(f"  {error}")
+                if scenario != 'read, then write' and (lost or lost_balance or errors):
+                    failed = True
+        session.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if failed:
+        print("FAILED: an update was lost")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
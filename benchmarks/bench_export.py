@@ -0,0 +1,100 @@
+"""
+Measures the raw data export: generates staff sales and audit logs, then streams them to CSV (and to
+Parquet when pyarrow is installed) and prints rows/s and the peak Python memory used while exporting,
+which should stay flat as the row count grows. Memory tracing slows the export down about threefold,
+so compare rows/s between runs of this script rather than with the app.
+
+Usage: python benchmarks/bench_export.py [--rows 1000000] [--chunk-size 5000]
+Runs against a temporary database, so bar_audit.db is never touched.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAFF_COUNT = 20
+ITEMS = [('Beer Bottle', 1000.0), ('Wine Glass', 2500.0), ('Soda Can', 500.0), ('Spirit Shot', 1500.0)]
+DAYS = 365
+
+
+def populate(session, rows):
+    from sqlalchemy import insert
+    from models import User, StaffSaleEntry, AuditLog
+
+    session.add_all(User(username=f"staff{i}", password_hash='x', role='Staff') for i in range(1, STAFF_COUNT + 1))
+    session.commit()
+    start_date = date.today() - timedelta(days=DAYS)
+    per_day = max(1, rows // DAYS)
+    for offset in range(DAYS):
+        day = start_date + timedelta(days=offset)
+        midnight = datetime.combine(day, datetime.min.time())
+        sales = []
+        for i in range(per_day):
+            item_name, price = random.choice(ITEMS)
+            sales.append({'staff_id': random.randint(1, STAFF_COUNT), 'entry_date': day, 'item_name': item_name,
+                          'quantity': 2, 'price_per_unit': price, 'total_cost': price * 2, 'is_submitted': True,
+                          'timestamp': midnight + timedelta(seconds=i)})
+        session.execute(StaffSaleEntry.__table__.insert(), sales)
+        session.execute(insert(AuditLog), [
+            {'username': f"staff{random.randint(1, STAFF_COUNT)}", 'user_role': 'Staff', 'action_type': 'Staff Add Sale',
+             'new_value': f"{random.choice(ITEMS)[0]} x 2", 'timestamp': midnight + timedelta(seconds=i)}
+            for i in range(per_day)])
+    session.commit()
+    return start_date, start_date + timedelta(days=DAYS - 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000, help="rows generated per dataset")
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        # Must be set before the app's modules create the engine
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        from database import Base, Session, engine
+        from migrations import run_migrations
+        from data_export import export_data
+
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        session = Session()
+        random.seed(42)
+        print(f"Generating {args.rows} sales and audit logs...")
+        start_date, end_date = populate(session, args.rows)
+
+        formats = ['csv']
+        try:
+            import pyarrow  # noqa: F401
+            formats.append('parquet')
+        except ImportError:
+            print("pyarrow is not installed, skipping Parquet.")
+
+        print(f"{'dataset':<8} {'format':<8} {'rows':>9} {'seconds':>8} {'rows/s':>9} {'file MB':>8} {'peak MB':>8}")
+        for dataset in ('sales', 'audit'):
+            for export_format in formats:
+                path = os.path.join(workdir, f"{dataset}.{export_format}")
+                tracemalloc.start()
+                started = time.perf_counter()
+                rows = export_data(session, dataset, path, start_date, end_date, chunk_size=args.chunk_size)
+                elapsed = time.perf_counter() - started
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{dataset:<8} {export_format:<8} {rows:>9} {elapsed:>8.2f} {rows / elapsed:>9.0f} "
+                      f"{os.path.getsize(path) / 1024 / 1024:>8.1f} {peak / 1024 / 1024:>8.1f}")
+        session.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
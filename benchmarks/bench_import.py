@@ -0,0 +1,93 @@
+"""
+Measures the CSV bulk import: generates an inventory catalog, supply deliveries and staff sales
+(with a few bad rows in each), imports them and prints rows/s and how many rows were rejected.
+
+Usage: python benchmarks/bench_import.py [--items 800] [--supplies 20000] [--sales 100000] [--batch-size 5000]
+Runs against a temporary database, so bar_audit.db is never touched.
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAFF_COUNT = 20
+BAD_ROW_EVERY = 1000  # One invalid row per this many rows, so the error report is exercised too
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def generate(workdir, items, supplies, sales):
+    item_names = [f"Item {i}" for i in range(1, items + 1)]
+    write_csv(os.path.join(workdir, 'inventory.csv'), ('Name', 'Price Per Unit', 'Initial Supply Qty'), (
+        (name, random.randint(5, 50) * 100, random.randint(0, 100)) if i % BAD_ROW_EVERY else (name, 'n/a', 0)
+        for i, name in enumerate(item_names, 1)))
+    write_csv(os.path.join(workdir, 'supplies.csv'), ('item', 'quantity'), (
+        (random.choice(item_names), random.randint(1, 48)) if i % BAD_ROW_EVERY else ('Unknown item', 1)
+        for i in range(1, supplies + 1)))
+    start_date = date.today() - timedelta(days=180)
+    write_csv(os.path.join(workdir, 'sales.csv'), ('username', 'date', 'item', 'quantity'), (
+        (f"staff{random.randint(1, STAFF_COUNT)}", start_date + timedelta(days=i % 180), random.choice(item_names),
+         random.randint(1, 5)) if i % BAD_ROW_EVERY else ('staff1', 'yesterday', item_names[0], 1)
+        for i in range(1, sales + 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=800)
+    parser.add_argument('--supplies', type=int, default=20000)
+    parser.add_argument('--sales', type=int, default=100000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        # Must be set before the app's modules create the engine
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        from database import Base, Session, engine
+        from migrations import run_migrations
+        from models import User
+        from audit_writer import audit_writer
+        from services.bulk_import import import_csv
+
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        session = Session()
+        session.add(User(username='admin', password_hash='x', role='Admin'))
+        session.add_all(User(username=f"staff{i}", password_hash='x', role='Staff') for i in range(1, STAFF_COUNT + 1))
+        session.commit()
+        admin = session.query(User).filter_by(username='admin').one()
+
+        random.seed(42)
+        generate(workdir, args.items, args.supplies, args.sales)
+
+        print(f"{'file':<16} {'rows':>8} {'imported':>9} {'rejected':>9} {'seconds':>8} {'rows/s':>9}")
+        for kind in ('inventory', 'supplies', 'sales'):
+            path = os.path.join(workdir, f"{kind}.csv")
+            started = time.perf_counter()
+            result = import_csv(session, admin, kind, path, args.batch_size)
+            elapsed = time.perf_counter() - started
+            rows = result.imported + result.rejected
+            print(f"{kind + '.csv':<16} {rows:>8} {result.imported:>9} {result.rejected:>9} {elapsed:>8.2f} "
+                  f"{rows / elapsed:>9.0f}")
+
+        session.close()
+        audit_writer.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Measures login latency for several password hash settings: a normal login, the first login after the
+setting changed (which rehashes the password), a wrong password, and a throttled attempt.
+
+Usage: python benchmarks/bench_login.py [--logins 10] [--methods scrypt:32768:8:1 pbkdf2:sha256:600000]
+Runs against a temporary database, so bar_audit.db is never touched.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_METHODS = ('pbkdf2:sha256:260000', 'pbkdf2:sha256:600000', 'scrypt:16384:8:1', 'scrypt:32768:8:1')
+PASSWORD = 'correct horse battery staple'
+
+
+def timed_ms(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - started) * 1000, result
+
+
+def use_method(models, method):
+    models.PASSWORD_HASH_METHOD = method
+    models._password_method_prefix = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logins', type=int, default=10, help="timed logins of each kind per setting")
+    parser.add_argument('--methods', nargs='+', default=list(DEFAULT_METHODS), help="werkzeug hash methods")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        # Must be set before the app's modules create the engine
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        import models
+        from database import Base, Session, engine
+        from migrations import run_migrations
+        from auth import LoginThrottle, authenticate
+        from audit_writer import audit_writer
+
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        session = Session()
+        user = models.User(username='bench', role='Staff')
+        use_method(models, args.methods[0])
+        user.set_password(PASSWORD)
+        session.add(user)
+        session.commit()
+        session.close()
+
+        print(f"{'method':<24} {'login p50/max ms':>17} {'rehash login ms':>16} {'wrong pw p50 ms':>16} "
+              f"{'throttled us':>13}")
+        for method in args.methods:
+            use_method(models, method)
+            rehash_ms, _ = timed_ms(authenticate, 'bench', PASSWORD)  # Upgrades the stored hash to this method
+            login_ms = [timed_ms(authenticate, 'bench', PASSWORD)[0] for _ in range(args.logins)]
+            wrong_ms = [timed_ms(authenticate, 'bench', 'wrong')[0] for _ in range(args.logins)]
+
+            # A locked username is turned away before any hashing or logging
+            throttle = LoginThrottle(free_attempts=0, base_seconds=60)
+            throttle.record_failure('bench')
+            started = time.perf_counter()
+            for _ in range(1000):
+                throttle.seconds_locked('bench')
+            throttled_us = (time.perf_counter() - started) * 1000
+
+            print(f"{method:<24} {statistics.median(login_ms):>8.1f} / {max(login_ms):<6.1f} {rehash_ms:>16.1f} "
+                  f"{statistics.median(wrong_ms):>16.1f} {throttled_us:>13.2f}")
+        audit_writer.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Measures how long screen switches take: the first visit to each screen (which builds it) and later
+visits (which only show the cached screen and run its refresh).
+
+Usage: python benchmarks/bench_navigation.py [--rounds 20] [--db bar_audit.db]
+Needs a display. The app runs against a temporary copy of the database, so no real data is changed.
+The manager's daily stock screen is left out because it can stop on a skipped-days warning.
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCREENS_BY_ROLE = {
+    'Admin': ('show_admin_users', 'show_admin_salaries', 'show_admin_audit_logs', 'show_manager_inventory'),
+    'Manager': ('show_manager_inventory', 'show_manager_reports'),
+    'Staff': ('show_staff_sales_entry',),
+}
+VIEW_FOR_SCREEN = {
+    'show_admin_users': 'admin_view', 'show_admin_salaries': 'admin_view', 'show_admin_audit_logs': 'admin_view',
+    'show_manager_inventory': 'manager_view', 'show_manager_reports': 'manager_view',
+    'show_staff_sales_entry': 'staff_view',
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(app, rounds):
+    from database import db_session
+    from models import User
+
+    for role, screens in SCREENS_BY_ROLE.items():
+        user = db_session.query(User).filter_by(role=role, is_active=True).first()
+        if not user:
+            print(f"No active {role} user in the database, skipping {role} screens.")
+            continue
+        app.login_view.reset_screens()
+        app.current_user = user
+        app.show_dashboard()
+        for _ in range(rounds):
+            for screen in screens:
+                getattr(getattr(app, VIEW_FOR_SCREEN[screen]), screen)()
+                app.master.update()
+                app.show_dashboard()
+                app.master.update()
+
+    results = {}
+    for name, elapsed_ms, built in app.navigation_timings:
+        results.setdefault(name, {'built': [], 'cached': []})['built' if built else 'cached'].append(elapsed_ms)
+    print(f"{'screen':<20} {'first visit ms':>15} {'cached p50/p95 ms':>18} {'visits':>7}")
+    for name, timings in results.items():
+        first = f"{timings['built'][0]:.1f}" if timings['built'] else '-'
+        cached = timings['cached']
+        cached_text = f"{statistics.median(cached):.1f} / {percentile(cached, 95):.1f}" if cached else '-'
+        print(f"{name:<20} {first:>15} {cached_text:>18} {len(cached) + len(timings['built']):>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=20, help="visits to each screen per role")
+    parser.add_argument('--db', default=os.path.join(ROOT, 'bar_audit.db'), help="database to copy for the run")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        db_copy = os.path.join(workdir, 'bar_audit.db')
+        if os.path.exists(args.db):
+            shutil.copy(args.db, db_copy)
+        # Must be set before the app's modules create the engine
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{db_copy}"
+        os.environ['BAR_AUDIT_REPORTS_CACHE_DIR'] = os.path.join(workdir, 'report_cache')
+
+        import tkinter as tk
+        from main import BarAuditApp
+        from email_outbox import email_sender
+
+        root = tk.Tk()
+        app = BarAuditApp(root)
+        root.update()
+        try:
+            run(app, args.rounds)
+        finally:
+            app.report_jobs.shutdown()
+            email_sender.close()
+            root.destroy()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+Load test for the handheld sales server: starts sales_server.py on a temporary database, then simulates
+a busy night. Many waiters' handhelds sign in and record sales concurrently over keep-alive connections,
+each with its own Idempotency-Key. A share of the requests are sent twice, as a handheld does when a
+response is lost, and every handheld submits its sales and declares its cash at the end.
+Prints sales per minute and request latencies. Then checks that every sale was saved exactly once,
+that retries got the original sale back, and that the daily totals and audit logs agree.
+
+Usage: python benchmarks/bench_sales_server.py [--handhelds 40] [--sales 150] [--retry-rate 0.05]
+Runs against a temporary database on a free local port, so bar_audit.db is never touched.
+Exits with status 1 on a failed check.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ITEMS = {'Beer Bottle': 1000.0, 'Wine Glass': 2500.0, 'Soda Can': 500.0, 'Spirit Shot': 1500.0}
+PASSWORD = 'password'
+
+
+class Handheld:
+    """One waiter's phone: a keep-alive HTTP/1.1 connection speaking JSON."""
+
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+        self.token = None
+        self.sale_latencies = []
+
+    async def request(self, method, path, body=None, key=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        headers = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(data)}",
+                   "Content-Type: application/json"]
+        if self.token:
+            headers.append(f"Authorization: Bearer {self.token}")
+        if key:
+            headers.append(f"Idempotency-Key: {key}")
+        started = time.perf_counter()
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + data)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        payload = json.loads(await self.reader.readexactly(int(response_headers['content-length'])))
+        if path == '/api/sales':
+            self.sale_latencies.append(time.perf_counter() - started)
+        return status, payload, response_headers.get('idempotent-replayed') == 'true'
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def waiter(number, port, sales_count, retry_rate, stats):
+    rng = random.Random(number)
+    handheld = Handheld(port)
+    try:
+        status, payload, _ = await handheld.request('POST', '/api/login',
+                                                    {'username': f"waiter{number}", 'password': PASSWORD})
+        if status != 200:
+            stats['errors'].append(f"waiter{number} login: {status} {payload}")
+            return
+        handheld.token = payload['token']
+        total = 0.0
+        for _ in range(sales_count):
+            sale, key = {'item': rng.choice(list(ITEMS)), 'quantity': rng.randint(1, 4)}, str(uuid.uuid4())
+            status, payload, _ = await handheld.request('POST', '/api/sales', sale, key)
+            if status != 201:
+                stats['errors'].append(f"waiter{number} sale: {status} {payload}")
+                continue
+            stats['sales'] += 1
+            total += payload['total_cost']
+            if rng.random() < retry_rate:  # The response was "lost": send the same request again
+                retry_status, retry, replayed = await handheld.request('POST', '/api/sales', sale, key)
+                stats['retries'] += 1
+                if retry_status != 201 or retry['sale_id'] != payload['sale_id'] or not replayed:
+                    stats['errors'].append(f"waiter{number} retry: {retry_status} {retry}, first {payload}")
+        status, payload, _ = await handheld.request('POST', '/api/sales/submit', {}, str(uuid.uuid4()))
+        if status != 200:
+            stats['errors'].append(f"waiter{number} submit: {status} {payload}")
+        status, payload, _ = await handheld.request('POST', '/api/cash',
+                                                    {'declared_cash': total, 'declared_pos': 0}, str(uuid.uuid4()))
+        if status != 200 or payload['mismatch'] != 0:
+            stats['errors'].append(f"waiter{number} cash: {status} {payload}")
+        stats['revenue'] += total
+    finally:
+        stats['latencies'].extend(handheld.sale_latencies)
+        handheld.close()
+
+
+async def simulate(port, handhelds, sales_count, retry_rate):
+    stats = {'sales': 0, 'retries': 0, 'revenue': 0.0, 'errors': [], 'latencies': []}
+    started = time.perf_counter()
+    await asyncio.gather(*(waiter(number, port, sales_count, retry_rate, stats)
+                           for number in range(1, handhelds + 1)))
+    return stats, time.perf_counter() - started
+
+
+async def wait_until_up(port, server, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("The sales server exited during start-up")
+        try:
+            handheld = Handheld(port)
+            status, _, _ = await handheld.request('GET', '/api/health')
+            handheld.close()
+            if status == 200:
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("The sales server did not start")
+
+
+def setup(handhelds):
+    from database import Base, Session, engine
+    from migrations import run_migrations
+    from models import User, InventoryItem, hash_password
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    session = Session()
+    password_hash = hash_password(PASSWORD)  # One hash for every waiter, to keep the set-up quick
+    session.add_all(User(username=f"waiter{number}", password_hash=password_hash, role='Staff')
+                    for number in range(1, handhelds + 1))
+    session.add_all(InventoryItem(name=name, price_per_unit=price) for name, price in ITEMS.items())
+    session.commit()
+    session.close()
+
+
+def check(stats, handhelds, server_stopped_cleanly):
+    from sqlalchemy import func
+    from database import Session
+    from models import StaffSaleEntry, StaffDailyTotal, CashRegisterEntry, AuditLog, IdempotencyKey
+
+    session = Session()
+    failures = []
+
+    def expect(name, actual, expected):
+        status = 'ok' if actual == expected else 'FAILED'
+        print(f"  {name:<30} {actual!s:>12} {expected!s:>12}  {status}")
+        if actual != expected:
+            failures.append(name)
+
+    print(f"  {'check':<30} {'database':>12} {'expected':>12}")
+    expect("sales saved", session.query(StaffSaleEntry).count(), stats['sales'])
+    expect("sales submitted", session.query(StaffSaleEntry).filter_by(is_submitted=True).count(), stats['sales'])
+    expect("daily totals (triggers)", round(session.query(func.sum(StaffDailyTotal.total_cost)).scalar() or 0, 2),
+           round(stats['revenue'], 2))
+    expect("cash declarations", session.query(CashRegisterEntry).filter_by(is_finalized=True).count(), handhelds)
+    expect("idempotency keys", session.query(IdempotencyKey).count(), stats['sales'] + 2 * handhelds)
+    if server_stopped_cleanly:  # The audit writer flushes its queue when the server exits normally
+        expect("sale audit logs", session.query(AuditLog).filter_by(action_type='Staff Add Sale').count(),
+               stats['sales'])
+    session.close()
+    return failures
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--handhelds', type=int, default=40)
+    parser.add_argument('--sales', type=int, default=150, help="sales recorded by each handheld")
+    parser.add_argument('--retry-rate', type=float, default=0.05, help="share of sales sent twice")
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    server = None
+    try:
+        # Must be set before the app's modules create the engine; the server process inherits them
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ['BAR_AUDIT_AUDIT_CHECKPOINT_KEY_FILE'] = os.path.join(workdir, 'checkpoint.key')
+        setup(args.handhelds)
+
+        port = free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'sales_server.py'), '--host', '127.0.0.1',
+                                   '--port', str(port), '--batch-size', str(args.batch_size)], cwd=workdir)
+        asyncio.run(wait_until_up(port, server))
+
+        print(f"{args.handhelds} handhelds x {args.sales} sales, {args.retry_rate:.0%} sent twice...")
+        stats, elapsed = asyncio.run(simulate(port, args.handhelds, args.sales, args.retry_rate))
+        latencies = sorted(stats['latencies'])
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+        print(f"{stats['sales']} sales in {elapsed:.1f} s: {stats['sales'] / elapsed * 60:.0f} sales/minute, "
+              f"sale request latency p50 {percentile(0.5):.1f} ms, p95 {percentile(0.95):.1f} ms, "
+              f"p99 {percentile(0.99):.1f} ms")
+        print(f"{stats['retries']} retried requests, {len(stats['errors'])} errors")
+        for error in stats['errors'][:10]:
+            print(f"  {error}")
+
+        # Ctrl+C lets the server flush its audit logs; Windows has no SIGINT for another process
+        server.send_signal(signal.SIGINT if os.name != 'nt' else signal.SIGTERM)
+        stopped_cleanly = server.wait(timeout=30) == 0 and os.name != 'nt'
+        failures = check(stats, args.handhelds, stopped_cleanly)
+        from database import engine
+        engine.dispose()
+    finally:
+        if server is not None and server.poll() is None:
+            server.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+    if stats['errors'] or failures:
+        print("FAILED")
+        sys.exit(1)
+    print("All checks passed.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Measures throughput of the domain services without the UI: recording and submitting sales, cash
+declarations that end in a salary deduction, closing a day (stock count plus the manager's declaration)
+and admin penalties, each against a database that already holds some history.
+
+Usage: python benchmarks/bench_services.py [--staff 20] [--items 200] [--days 90] [--ops 500]
+Runs against a temporary database, so bar_audit.db is never touched.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def populate(session, staff_count, item_count, days):
+    from sqlalchemy import insert
+    from models import User, InventoryItem, StaffSaleEntry, CashRegisterEntry, DailyStockEntry
+
+    session.add(User(username='admin', password_hash='x', role='Admin'))
+    session.add(User(username='manager', password_hash='x', role='Manager', monthly_salary=1e9,
+                     current_salary_balance=1e9))
+    session.add_all(User(username=f"staff{i}", password_hash='x', role='Staff', monthly_salary=1e9,
+                         current_salary_balance=1e9) for i in range(1, staff_count + 1))
+    session.add_all(InventoryItem(name=f"Item {i}", price_per_unit=float(random.randint(5, 50) * 100),
+                                  opening_stock=10 ** 6, closing_stock=10 ** 6) for i in range(1, item_count + 1))
+    session.commit()
+
+    staff_ids = [user_id for user_id, in session.query(User.id).filter_by(role='Staff')]
+    manager_id = session.query(User.id).filter_by(role='Manager').scalar()
+    start_date = date.today() - timedelta(days=days)
+    for offset in range(days):
+        day = start_date + timedelta(days=offset)
+        session.execute(insert(StaffSaleEntry), [
+            {'staff_id': random.choice(staff_ids), 'entry_date': day, 'item_name': f"Item {random.randint(1, item_count)}",
+             'quantity': 1, 'price_per_unit': 1000.0, 'total_cost': 1000.0, 'is_submitted': True,
+             'timestamp': datetime.combine(day, datetime.min.time())}
+            for _ in range(200)])
+        session.execute(insert(CashRegisterEntry), [
+            {'user_id': staff_id, 'entry_date': day, 'declared_cash': 1000.0, 'is_finalized': True}
+            for staff_id in staff_ids])
+        session.execute(insert(DailyStockEntry), [{'manager_id': manager_id, 'entry_date': day, 'is_finalized': True}])
+    session.commit()
+
+
+def timed(name, ops, func):
+    started = time.perf_counter()
+    for i in range(ops):
+        func(i)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<28} {ops:>6} {elapsed * 1000 / ops:>10.2f} {ops / elapsed:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--staff', type=int, default=20)
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--days', type=int, default=90, help="days of history generated before timing")
+    parser.add_argument('--ops', type=int, default=500, help="operations timed per service")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        # Must be set before the app's modules create the engine
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        from database import Base, Session, engine
+        from migrations import run_migrations
+        from models import User, InventoryItem
+        from audit_writer import audit_writer
+        from services import cash, inventory, payroll, sales
+
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        session = Session()
+        random.seed(42)
+        populate(session, args.staff, args.items, args.days)
+
+        admin = session.query(User).filter_by(role='Admin').one()
+        manager = session.query(User).filter_by(role='Manager').one()
+        staff = session.query(User).filter_by(role='Staff').order_by(User.id).all()
+        item_names = [name for name, in session.query(InventoryItem.name)]
+        item_ids = [item_id for item_id, in session.query(InventoryItem.id)]
+        # Timed work goes on future days, so it never collides with the generated history
+        first_day = date.today() + timedelta(days=1)
+
+        print(f"{'operation':<28} {'ops':>6} {'ms/op':>10} {'ops/s':>10}")
+        timed('record_sale', args.ops, lambda i: sales.record_sale(
+            session, staff[i % len(staff)], random.choice(item_names), random.randint(1, 5),
+            entry_date=first_day + timedelta(days=i // len(staff))))
+        sale_days = (args.ops + len(staff) - 1) // len(staff)
+        pairs = [(user, first_day + timedelta(days=d)) for d in range(sale_days) for user in staff]
+        pairs = pairs[:args.ops]
+        timed('submit_sales', len(pairs), lambda i: sales.submit_sales(session, pairs[i][0], entry_date=pairs[i][1]))
+        # Every declaration is 100 short, so each one also records a salary deduction
+        timed('declare_staff_cash', len(pairs), lambda i: cash.declare_staff_cash(
+            session, pairs[i][0], 100.0, 0.0, entry_date=pairs[i][1]))
+
+        def close_day(i):
+            day = first_day + timedelta(days=i)
+            inventory.save_daily_stock(session, manager, {item_id: 10 ** 6 - i - 1 for item_id in item_ids},
+                                       entry_date=day)
+            cash.declare_manager_cash(session, manager, 5000.0, 0.0, entry_date=day)
+        timed('close_day (stock + cash)', max(1, args.ops // 10), close_day)
+        timed('deduct_penalty', args.ops, lambda i: payroll.deduct_penalty(
+            session, admin, staff[i % len(staff)].id, 10.0, "Benchmark penalty"))
+
+        session.close()
+        audit_writer.close()
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Compares insert/commit throughput and query latency across the SQLite pragma profiles in database.py.
+
+Usage: python benchmarks/bench_sqlite_profiles.py [--commits 500] [--rows 50000] [--queries 300]
+Each profile runs against a fresh temporary database file, so bar_audit.db is never touched.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+from database import Base, SQLITE_PROFILES, create_db_engine
+from models import StaffSaleEntry, User
+from migrations import run_migrations
+
+ITEMS = [('Beer Bottle', 1000.0), ('Wine Glass', 2500.0), ('Soda Can', 500.0), ('Spirit Shot', 1500.0)]
+STAFF_COUNT = 10
+DAYS = 365
+
+
+def make_sale(staff_id, entry_date):
+    item_name, price = random.choice(ITEMS)
+    quantity = random.randint(1, 5)
+    return StaffSaleEntry(staff_id=staff_id, entry_date=entry_date, item_name=item_name, quantity=quantity,
+                          price_per_unit=price, total_cost=price * quantity)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_profile(profile, workdir, commits, rows, queries):
+    engine = create_db_engine(f"sqlite:///{os.path.join(workdir, profile + '.db')}",
+                              pragmas=SQLITE_PROFILES[profile])
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    session.add_all(User(username=f"staff{i}", password_hash='x', role='Staff') for i in range(1, STAFF_COUNT + 1))
+    session.commit()
+    start_date = date.today() - timedelta(days=DAYS)
+
+    # One sale per commit, the way StaffViews.add_staff_sale records them
+    started = time.perf_counter()
+    for _ in range(commits):
+        session.add(make_sale(random.randint(1, STAFF_COUNT), date.today()))
+        session.commit()
+    single_rate = commits / (time.perf_counter() - started)
+
+    # A year of history in one transaction
+    started = time.perf_counter()
+    session.bulk_save_objects(make_sale(random.randint(1, STAFF_COUNT),
+                                        start_date + timedelta(days=random.randrange(DAYS)))
+                              for _ in range(rows))
+    session.commit()
+    batch_rate = rows / (time.perf_counter() - started)
+
+    # Per-waiter daily lookups (hot screen query) and month-long item aggregates (report query)
+    lookup_ms, aggregate_ms = [], []
+    for _ in range(queries):
+        day = start_date + timedelta(days=random.randrange(DAYS))
+        started = time.perf_counter()
+        session.query(StaffSaleEntry).filter_by(staff_id=random.randint(1, STAFF_COUNT), entry_date=day).all()
+        lookup_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        session.query(StaffSaleEntry.item_name, func.sum(StaffSaleEntry.quantity)).filter(
+            StaffSaleEntry.entry_date.between(day, day + timedelta(days=30))).group_by(StaffSaleEntry.item_name).all()
+        aggregate_ms.append((time.perf_counter() - started) * 1000)
+
+    session.close()
+    engine.dispose()
+    return {
+        'single': single_rate,
+        'batch': batch_rate,
+        'lookup_p50': statistics.median(lookup_ms),
+        'lookup_p95': percentile(lookup_ms, 95),
+        'aggregate_p50': statistics.median(aggregate_ms),
+        'aggregate_p95': percentile(aggregate_ms, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commits', type=int, default=500, help="single-row transactions per profile")
+    parser.add_argument('--rows', type=int, default=50000, help="rows inserted in one batch transaction")
+    parser.add_argument('--queries', type=int, default=300, help="timed queries of each kind")
+    parser.add_argument('--profiles', nargs='+', default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        print(f"{'profile':<8} {'commits/s':>10} {'batch rows/s':>13} "
+              f"{'lookup p50/p95 ms':>18} {'aggregate p50/p95 ms':>21}")
+        for profile in args.profiles:
+            random.seed(42)
+            r = run_profile(profile, workdir, args.commits, args.rows, args.queries)
+            print(f"{profile:<8} {r['single']:>10.0f} {r['batch']:>13.0f} "
+                  f"{r['lookup_p50']:>8.2f} / {r['lookup_p95']:<7.2f} {r['aggregate_p50']:>10.2f} / {r['aggregate_p95']:.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
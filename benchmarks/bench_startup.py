@@ -0,0 +1,128 @@
+"""
+Measures the database part of start-up on a database holding several years of data: the full path
+(create_all, migrations and the seed checks, as every launch used to run) against the fast path
+(one app_metadata lookup once the schema and initial data are recorded as in place).
+
+Usage: python benchmarks/bench_startup.py [--years 3] [--sales-per-day 300] [--logs-per-day 400] [--runs 20]
+The database is generated in a temporary directory, so bar_audit.db is never touched.
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from database import Base, create_db_engine
+from models import User, InventoryItem, StaffSaleEntry, CashRegisterEntry, DailyStockEntry, AuditLog
+from migrations import (run_migrations, prepare_database, write_app_metadata, read_app_metadata,
+                        SCHEMA_FINGERPRINT_KEY, INITIAL_DATA_KEY)
+
+ITEMS = [('Beer Bottle', 1000.0), ('Wine Glass', 2500.0), ('Soda Can', 500.0), ('Spirit Shot', 1500.0)]
+STAFF_COUNT = 10
+ACTIONS = ('User Login', 'User Logout', 'Staff Add Sale', 'Staff Submit Sales', 'Update Inventory Item')
+
+
+def populate(engine, years, sales_per_day, logs_per_day):
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(username='manager', password_hash='x', role='Manager'))
+    session.add_all(User(username=f"staff{i}", password_hash='x', role='Staff') for i in range(1, STAFF_COUNT + 1))
+    session.add_all(InventoryItem(name=name, price_per_unit=price) for name, price in ITEMS)
+    session.commit()
+
+    start_date = date.today() - timedelta(days=365 * years)
+    for offset in range(365 * years):
+        day = start_date + timedelta(days=offset)
+        sales = []
+        for _ in range(sales_per_day):
+            item_name, price = random.choice(ITEMS)
+            quantity = random.randint(1, 5)
+            sales.append({'staff_id': random.randint(2, STAFF_COUNT + 1), 'entry_date': day, 'item_name': item_name,
+                          'quantity': quantity, 'price_per_unit': price, 'total_cost': price * quantity,
+                          'is_submitted': True, 'timestamp': datetime.combine(day, datetime.min.time())})
+        session.execute(insert(StaffSaleEntry), sales)
+        session.execute(insert(CashRegisterEntry), [
+            {'user_id': staff_id, 'entry_date': day, 'declared_cash': 1000.0, 'is_finalized': True}
+            for staff_id in range(2, STAFF_COUNT + 2)])
+        session.execute(insert(DailyStockEntry), [{'manager_id': 1, 'entry_date': day, 'is_finalized': True}])
+        session.execute(insert(AuditLog), [
+            {'username': f"staff{random.randint(1, STAFF_COUNT)}", 'user_role': 'Staff',
+             'action_type': random.choice(ACTIONS), 'new_value': 'x',
+             'timestamp': datetime.combine(day, datetime.min.time()) + timedelta(seconds=i)}
+            for i in range(logs_per_day)])
+        if offset % 30 == 29:
+            session.commit()
+    session.commit()
+    session.close()
+
+
+def full_path(engine, session):
+    """What every launch used to do."""
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    session.query(User).count()
+    session.query(InventoryItem).count()
+
+
+def fast_path(engine, session):
+    state = prepare_database(session, engine)
+    assert state.get(INITIAL_DATA_KEY) == '1', "the fast path should not need the seed checks"
+
+
+def time_runs(db_path, step, runs):
+    samples = []
+    for _ in range(runs):
+        # A fresh engine per run, like a new process: nothing is cached between launches
+        engine = create_db_engine(f"sqlite:///{db_path}")
+        session = sessionmaker(bind=engine)()
+        started = time.perf_counter()
+        step(engine, session)
+        samples.append((time.perf_counter() - started) * 1000)
+        session.close()
+        engine.dispose()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--sales-per-day', type=int, default=300)
+    parser.add_argument('--logs-per-day', type=int, default=400)
+    parser.add_argument('--runs', type=int, default=20, help="timed start-ups per path")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        db_path = os.path.join(workdir, 'bench.db')
+        random.seed(42)
+        engine = create_db_engine(f"sqlite:///{db_path}")
+        print(f"Generating {args.years} years of data...")
+        started = time.perf_counter()
+        populate(engine, args.years, args.sales_per_day, args.logs_per_day)
+        session = sessionmaker(bind=engine)()
+        prepare_database(session, engine, force=True)
+        write_app_metadata(session, {INITIAL_DATA_KEY: '1'})
+        assert SCHEMA_FINGERPRINT_KEY in read_app_metadata(session, (SCHEMA_FINGERPRINT_KEY,))
+        session.close()
+        engine.dispose()
+        print(f"Generated {os.path.getsize(db_path) / 1024 / 1024:.0f} MB in {time.perf_counter() - started:.0f} s")
+
+        print(f"{'path':<10} {'p50 ms':>8} {'max ms':>8}")
+        for name, step in (('full', full_path), ('fast', fast_path)):
+            samples = time_runs(db_path, step, args.runs)
+            print(f"{name:<10} {statistics.median(samples):>8.2f} {max(samples):>8.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Stress test for several terminals sharing one database: starts N processes, each acting as a till
+that records and submits sales, receives supply deliveries of the same item and deducts penalties
+from the same manager, all at once. Afterwards it checks that nothing was lost: every sale and its
+daily totals, the item's stock, the manager's balance and the hash-chained audit log.
+Prints the throughput and how many units of work had to be retried because the database was locked.
+
+Usage: python benchmarks/stress_terminals.py [--terminals 4] [--sales 200] [--journal-mode WAL]
+Runs against a temporary database, so bar_audit.db is never touched. Exits with status 1 on a failed check.
+Use --journal-mode DELETE to test a database on a network drive, where WAL cannot be used.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ITEM_NAME = 'Beer Bottle'
+ITEM_PRICE = 1000.0
+INITIAL_STOCK = 1000
+MANAGER_BALANCE = 1000000.0
+SUBMIT_EVERY = 10  # Each till submits its pending sales after this many
+SUPPLY_EVERY = 7  # ...receives a delivery of ITEM_NAME after this many
+PENALTY_EVERY = 9  # ...and deducts a penalty from the shared manager after this many
+
+
+def terminal(terminal_number, sales_count, start_at):
+    """One till, in its own process. Returns its counts of operations, retries and errors."""
+    from database import Session, run_in_session
+    from models import User
+    from audit_writer import audit_writer
+    from services import sales, inventory, payroll
+
+    stats = {'sales': 0, 'quantity': 0, 'supplied': 0, 'penalties': 0, 'penalty_total': 0.0, 'submits': 0,
+             'operations': 0, 'retries': 0, 'errors': []}
+
+    def operation(func, username, *args):
+        attempts = [0]
+
+        def session_factory(**kwargs):
+            attempts[0] += 1  # One session per attempt, including those that could not take the write lock
+            return Session(**kwargs)
+
+        def unit(session):
+            actor = session.query(User).filter_by(username=username).one()
+            return func(session, actor, *args)
+        try:
+            return run_in_session(unit, session_factory=session_factory)
+        finally:
+            stats['retries'] += attempts[0] - 1
+
+    username = f"till{terminal_number}"
+    rng = random.Random(terminal_number)
+    time.sleep(max(0.0, start_at - time.time()))  # Start every till together
+    for number in range(1, sales_count + 1):
+        try:
+            quantity = rng.randint(1, 5)
+            operation(sales.record_sale, username, ITEM_NAME, quantity)
+            stats['sales'] += 1
+            stats['quantity'] += quantity
+            stats['operations'] += 1
+            if number % SUBMIT_EVERY == 0 or number == sales_count:
+                operation(sales.submit_sales, username)
+                stats['submits'] += 1
+                stats['operations'] += 1
+            if number % SUPPLY_EVERY == 0:
+                operation(inventory.supply_item, 'manager', 1, 3)
+                stats['supplied'] += 3
+                stats['operations'] += 1
+            if number % PENALTY_EVERY == 0:
+                operation(payroll.deduct_penalty, 'admin', 2, 10.0, f"Stress test {username}")
+                stats['penalties'] += 1
+                stats['penalty_total'] += 10.0
+                stats['operations'] += 1
+        except Exception as e:
+            stats['errors'].append(f"{username}: {type(e).__name__}: {e}")
+    audit_writer.close()
+    return stats
+
+
+def setup(terminals):
+    from database import Base, Session, engine
+    from migrations import run_migrations
+    from models import User, InventoryItem
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    session = Session()
+    session.add(User(username='admin', password_hash='x', role='Admin'))  # id 1
+    session.add(User(username='manager', password_hash='x', role='Manager',  # id 2
+                     monthly_salary=MANAGER_BALANCE, current_salary_balance=MANAGER_BALANCE))
+    session.add_all(User(username=f"till{i}", password_hash='x', role='Staff') for i in range(1, terminals + 1))
+    session.add(InventoryItem(name=ITEM_NAME, price_per_unit=ITEM_PRICE, supply_qty=INITIAL_STOCK,  # id 1
+                              opening_stock=INITIAL_STOCK, closing_stock=INITIAL_STOCK))
+    session.commit()
+    session.close()
+
+
+def check(results):
+    """Compares the database with what the tills did. Returns a list of failed checks."""
+    from sqlalchemy import func
+    from database import Session
+    from models import User, InventoryItem, StaffSaleEntry, StaffDailyTotal, SalaryDeduction, AuditLog
+    from audit_chain import verify_audit_chain
+
+    session = Session()
+    failures = []
+
+    def expect(name, actual, expected):
+        status = 'ok' if actual == expected else 'FAILED'
+        print(f"  {name:<34} {actual!s:>14} {expected!s:>14}  {status}")
+        if actual != expected:
+            failures.append(name)
+
+    sales_count = sum(r['sales'] for r in results)
+    quantity = sum(r['quantity'] for r in results)
+    print(f"  {'check':<34} {'database':>14} {'expected':>14}")
+    expect("sales recorded", session.query(StaffSaleEntry).count(), sales_count)
+    expect("sales left pending", session.query(StaffSaleEntry).filter_by(is_submitted=False).count(), 0)
+    expect("quantity sold", session.query(func.sum(StaffSaleEntry.quantity)).scalar() or 0, quantity)
+    expect("daily totals (triggers)",
+           session.query(func.sum(StaffDailyTotal.quantity)).filter_by(is_submitted=True).scalar() or 0, quantity)
+    item = session.query(InventoryItem).filter_by(name=ITEM_NAME).one()
+    expect("item supply_qty", item.supply_qty, INITIAL_STOCK + sum(r['supplied'] for r in results))
+    manager = session.query(User).filter_by(username='manager').one()
+    expect("manager balance", round(manager.current_salary_balance, 2),
+           round(MANAGER_BALANCE - sum(r['penalty_total'] for r in results), 2))
+    expect("salary deductions", session.query(SalaryDeduction).count(), sum(r['penalties'] for r in results))
+    expect("audit logs", session.query(AuditLog).count(), sum(r['operations'] for r in results))
+    verification = verify_audit_chain(session, full=True, write_checkpoint=False)
+    expect("audit hash chain intact", verification.ok, True)
+    session.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--terminals', type=int, default=4)
+    parser.add_argument('--sales', type=int, default=200, help="sales recorded by each terminal")
+    parser.add_argument('--journal-mode', default='WAL', choices=('WAL', 'DELETE'))
+    parser.add_argument('--busy-timeout', type=int, default=5000,
+                        help="milliseconds; 0 leaves all the waiting to the retries, which may then run out")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bar_audit_bench_')
+    try:
+        # Must be set before the app's modules create the engine; the terminal processes inherit them
+        os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        os.environ['BAR_AUDIT_DATABASE_JOURNAL_MODE'] = args.journal_mode
+        os.environ['BAR_AUDIT_DATABASE_BUSY_TIMEOUT'] = str(args.busy_timeout)
+        os.environ['BAR_AUDIT_AUDIT_CHECKPOINT_KEY_FILE'] = os.path.join(workdir, 'checkpoint.key')
+        setup(args.terminals)
+
+        print(f"{args.terminals} terminals x {args.sales} sales, journal_mode={args.journal_mode}...")
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(args.terminals) as pool:
+            start_at = time.time() + 2.0  # Time for every process to import the app
+            started = time.perf_counter()
+            results = pool.starmap(terminal, [(number, args.sales, start_at)
+                                              for number in range(1, args.terminals + 1)])
+            elapsed = time.perf_counter() - started - 2.0
+
+        operations = sum(r['operations'] for r in results)
+        errors = [error for r in results for error in r['errors']]
+        print(f"{operations} units of work in {elapsed:.1f} s ({operations / elapsed:.0f}/s), "
+              f"{sum(r['retries'] for r in results)} retried after a lock, {len(errors)} failed")
+        for error in errors[:10]:
+            print(f"  {error}")
+        failures = check(results)
+        from database import engine
+        engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if errors or failures:
+        print("FAILED")
+        sys.exit(1)
+    print("All checks passed.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import configparser
+import os
+
+# --- Application Configuration ---
+# Settings are read from bar_audit.ini (or the file named by BAR_AUDIT_CONFIG) next to the app.
+# Any setting can also be overridden with an environment variable named BAR_AUDIT_<SECTION>_<KEY>,
+# e.g. BAR_AUDIT_DATABASE_URL=sqlite:///other.db. See config.example.ini for every option.
+CONFIG_FILE = os.environ.get('BAR_AUDIT_CONFIG', 'bar_audit.ini')
+
+DEFAULTS = {
+    'database': {
+        'url': 'sqlite:///bar_audit.db',
+        # SQLite pragma profile from database.SQLITE_PROFILES; individual pragmas below override it
+        'profile': 'safe',
+        'journal_mode': '',
+        'synchronous': '',
+        'cache_size': '',
+        'mmap_size': '',
+        'temp_store': '',
+        'busy_timeout': '',
+        # Times a write is retried, after a short random pause, when another terminal still holds the lock
+        'busy_retries': '5',
+    },
+    'reports': {
+        # Rendered PDFs of finalized date ranges are kept here and reused until their data changes
+        'cache_dir': 'report_cache',
+        'cache_max_mb': '200',  # Least recently used reports are deleted beyond this size; 0 disables the cache
+    },
+    'smtp': {
+        'host': 'smtp.gmail.com',
+        'port': '465',
+        'security': 'ssl',  # ssl, starttls or none (none is for a local debugging server)
+        'username': '',  # Leave empty for servers that do not require a login
+        'password': '',
+        'sender': '',  # Email sending is disabled until this is set
+        'recipient': 'paulwillie27@gmail.com',  # Where reports are sent
+        'timeout': '30',
+        # Failed sends are retried after retry_base_seconds, doubling up to retry_max_seconds
+        'max_attempts': '10',
+        'retry_base_seconds': '30',
+        'retry_max_seconds': '3600',
+        'idle_disconnect_seconds': '60',  # Keep the connection this long after the outbox empties
+    },
+    'security': {
+        # werkzeug method for password hashes, e.g. scrypt:32768:8:1 or pbkdf2:sha256:600000 (empty: werkzeug default).
+        # Changing it upgrades each user's hash the next time they log in.
+        'password_hash_method': '',
+        # After login_free_attempts failures for a username, each further attempt waits
+        # login_backoff_base_seconds, doubling up to login_backoff_max_seconds
+        'login_free_attempts': '3',
+        'login_backoff_base_seconds': '2',
+        'login_backoff_max_seconds': '300',
+    },
+    'audit': {
+        # Logs older than retention_months are moved to compressed monthly files in archive_dir; 0 keeps them all
+        'archive_dir': 'audit_archive',
+        'retention_months': '12',
+        # HMAC key for audit log checkpoints, created on first use. Keep it off any copy of the database.
+        'checkpoint_key_file': 'audit_checkpoint.key',
+    },
+    'server': {
+        # HTTP/JSON API for waiters' handhelds on the LAN (see sales_server.py); plain HTTP, so trusted networks only
+        'enabled': 'false',
+        'host': '0.0.0.0',
+        'port': '8765',
+        'batch_size': '200',  # Most queued sales written in one transaction
+        'token_idle_minutes': '720',  # A handheld must sign in again after this long unused
+        'idempotency_retention_days': '7',  # How long a retried request is still recognised
+    },
+    'ui': {
+        'log_navigation_timing': 'false',  # Print how long each screen switch takes
+        'startup_timing': 'false',  # Print an import and initialization timeline up to the login window
+    },
+}
+
+_parser = configparser.ConfigParser()
+_parser.read_dict(DEFAULTS)
+_parser.read(CONFIG_FILE, encoding='utf-8')
+
+
+def get_setting(section, key, fallback=None):
+    """Returns a setting as a string, preferring the environment over the config file."""
+    env_value = os.environ.get(f"BAR_AUDIT_{section}_{key}".upper())
+    if env_value is not None:
+        return env_value
+    return _parser.get(section, key, fallback=fallback)
+
+
+def get_int_setting(section, key, fallback=None):
+    value = get_setting(section, key)
+    return int(value) if value not in (None, '') else fallback
+
+
+def get_float_setting(section, key, fallback=None):
+    value = get_setting(section, key)
+    return float(value) if value not in (None, '') else fallback
+
+
+def get_bool_setting(section, key, fallback=False):
+    value = get_setting(section, key)
+    if value in (None, ''):
+        return fallback
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
@@ -0,0 +1,204 @@
+import argparse
+import csv
+import os
+from datetime import datetime
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, func
+from database import Session
+from models import User, StaffSaleEntry, CashRegisterEntry, SalaryDeduction, AuditLog, DailyItemMovement
+from helpers import log_action
+from report_data import iter_chunks, UNKNOWN_USER
+from audit_archive import audit_archive, first_database_id
+from audit_queries import filter_audit_logs, search_log_ids, search_terms
+
+EXPORT_CHUNK_SIZE = 5000  # Rows fetched from SQLite and written out per round trip
+
+
+def _username():
+    return func.coalesce(User.username, UNKNOWN_USER).label('username')
+
+
+# Each query selects plain columns, so rows stream through iter_chunks without touching the identity map.
+# The labels become the column names of the exported file.
+def staff_sales_export_query(session, start_date, end_date):
+    return session.query(
+        StaffSaleEntry.id, StaffSaleEntry.entry_date, StaffSaleEntry.staff_id, _username(),
+        StaffSaleEntry.item_name, StaffSaleEntry.quantity, StaffSaleEntry.price_per_unit, StaffSaleEntry.total_cost,
+        StaffSaleEntry.is_submitted, StaffSaleEntry.timestamp
+    ).outerjoin(User, User.id == StaffSaleEntry.staff_id).filter(
+        StaffSaleEntry.entry_date.between(start_date, end_date)
+    ).order_by(StaffSaleEntry.entry_date, StaffSaleEntry.id)
+
+
+def cash_entries_export_query(session, start_date, end_date):
+    return session.query(
+        CashRegisterEntry.id, CashRegisterEntry.entry_date, CashRegisterEntry.user_id, _username(),
+        CashRegisterEntry.declared_cash, CashRegisterEntry.declared_pos, CashRegisterEntry.system_total_sales,
+        CashRegisterEntry.mismatch_amount, CashRegisterEntry.deduction_amount, CashRegisterEntry.is_finalized,
+        CashRegisterEntry.timestamp
+    ).outerjoin(User, User.id == CashRegisterEntry.user_id).filter(
+        CashRegisterEntry.entry_date.between(start_date, end_date)
+    ).order_by(CashRegisterEntry.entry_date, CashRegisterEntry.id)
+
+
+def salary_deductions_export_query(session, start_date, end_date):
+    return session.query(
+        SalaryDeduction.id, SalaryDeduction.deduction_date, SalaryDeduction.user_id, _username(),
+        SalaryDeduction.amount, SalaryDeduction.reason, SalaryDeduction.timestamp
+    ).outerjoin(User, User.id == SalaryDeduction.user_id).filter(
+        SalaryDeduction.deduction_date.between(start_date, end_date)
+    ).order_by(SalaryDeduction.deduction_date, SalaryDeduction.id)
+
+
+def item_movements_export_query(session, start_date, end_date):
+    return session.query(
+        DailyItemMovement.id, DailyItemMovement.entry_date, DailyItemMovement.item_id, DailyItemMovement.item_name,
+        DailyItemMovement.opening_stock, DailyItemMovement.supply_qty, DailyItemMovement.closing_stock,
+        DailyItemMovement.quantity_sold, DailyItemMovement.price_per_unit, DailyItemMovement.total_sales
+    ).filter(DailyItemMovement.entry_date.between(start_date, end_date)).order_by(
+        DailyItemMovement.entry_date, DailyItemMovement.item_name)
+
+
+def audit_logs_export_query(session, start_date, end_date, username=None, user_role=None, action_type=None,
+                            search=None):
+    """
+    Same filters and search as the audit log viewer; either date may be None for an open-ended range.
+    Search matches are exported in time order, not by relevance.
+    """
+    query = filter_audit_logs(session.query(AuditLog.id, AuditLog.timestamp, AuditLog.username, AuditLog.user_role,
+                                            AuditLog.action_type, AuditLog.old_value, AuditLog.new_value,
+                                            AuditLog.row_hash),
+                              username, user_role, action_type, start_date, end_date)
+    terms = search_terms(search)
+    if terms:
+        query = query.filter(AuditLog.id.in_(search_log_ids(session, terms)))
+    return query.order_by(AuditLog.timestamp, AuditLog.id)
+
+
+# Dataset key -> (name shown in the UI, query function)
+EXPORT_DATASETS = {
+    'sales': ("Staff Sales", staff_sales_export_query),
+    'cash': ("Cash Declarations", cash_entries_export_query),
+    'deductions': ("Salary Deductions", salary_deductions_export_query),
+    'movements': ("Item Movements", item_movements_export_query),
+    'audit': ("Audit Logs", audit_logs_export_query),
+}
+
+
+def export_format_for(path):
+    """'parquet' for a .parquet file name, 'csv' for anything else."""
+    return 'parquet' if path.lower().endswith('.parquet') else 'csv'
+
+
+def _write_csv(path, columns, chunks):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow([name for name, _ in columns])
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+
+def _arrow_type(pa, column_type):
+    if isinstance(column_type, Boolean):
+        return pa.bool_()
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _write_parquet(path, columns, chunks):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet export needs the pyarrow package (pip install pyarrow). Choose CSV instead.")
+
+    schema = pa.schema([(name, _arrow_type(pa, column_type)) for name, column_type in columns])
+    # Each chunk becomes one row group, so memory use stays at one chunk however long the export is
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for chunk in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def export_data(session, dataset, path, start_date, end_date, filters=None, chunk_size=EXPORT_CHUNK_SIZE, job=None):
+    """
+    Streams one dataset over an inclusive date range into a CSV or Parquet file (chosen by the file
+    extension), chunk_size rows at a time, so memory use does not grow with the size of the export.
+    The file is written under a temporary name and only moved into place once complete.
+    When run as a background job, reports progress and stops at the next chunk once cancelled.
+    Returns the number of rows written.
+    """
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown export dataset '{dataset}'.")
+    query = EXPORT_DATASETS[dataset][1](session, start_date, end_date, **(filters or {}))
+    columns = [(column['name'], column['type']) for column in query.column_descriptions]
+    total_rows = query.order_by(None).count() if job else 0
+    archive_filters = dict(filters or {})
+    terms = search_terms(archive_filters.pop('search', None))
+    if job and dataset == 'audit':
+        total_rows += audit_archive.estimate_rows(start_date, end_date, **archive_filters)
+    written = [0]
+
+    def source_chunks():
+        if dataset == 'audit':
+            # Archived months come first: they are older than every log still in the database
+            yield from audit_archive.iter_chunks(start_date, end_date, chunk_size=chunk_size, terms=terms,
+                                                 below_id=first_database_id(session), **archive_filters)
+        yield from iter_chunks(query, chunk_size)
+
+    def chunks():
+        for chunk in source_chunks():
+            if job:
+                job.check_cancelled()
+            yield chunk
+            written[0] += len(chunk)
+            if job:
+                job.report_progress(written[0] / max(total_rows, 1), f"{written[0]} of {total_rows} rows written")
+
+    partial_path = f"{path}.part"
+    try:
+        if export_format_for(path) == 'parquet':
+            _write_parquet(partial_path, columns, chunks())
+        else:
+            _write_csv(partial_path, columns, chunks())
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return written[0]
+
+
+def run_export_job(job, dataset, path, start_date, end_date, filters, username, user_role):
+    """Background job behind the "Export" buttons on the reports and audit log screens."""
+    session = Session()  # db_session belongs to the Tk thread
+    try:
+        rows = export_data(session, dataset, path, start_date, end_date, filters, job=job)
+        log_action(username, user_role, 'Exported Data',
+                   new_value=f"{EXPORT_DATASETS[dataset][0]} {start_date or 'start'} to {end_date or 'now'}: "
+                             f"{rows} rows to {os.path.basename(path)}")
+        return f"Exported {rows} rows to {path}"
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export raw data to CSV or Parquet (chosen by the file extension).")
+    parser.add_argument('dataset', choices=sorted(EXPORT_DATASETS))
+    parser.add_argument('path')
+    parser.add_argument('--start', required=True, help="first day, YYYY-MM-DD")
+    parser.add_argument('--end', required=True, help="last day, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    cli_session = Session()
+    started = datetime.now()
+    cli_rows = export_data(cli_session, args.dataset, args.path, datetime.strptime(args.start, '%Y-%m-%d').date(),
+                           datetime.strptime(args.end, '%Y-%m-%d').date())
+    print(f"Exported {cli_rows} rows to {args.path} in {(datetime.now() - started).total_seconds():.1f} s")
+    cli_session.close()
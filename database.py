@@ -1,12 +1,156 @@
-from sqlalchemy import create_engine
+import os
+import random
+import time
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.orm.exc import StaleDataError
+from config import get_setting, get_int_setting
+
+# --- SQLite Pragma Profiles ---
+# Applied to every new connection. 'safe' is the default: WAL lets the views read while a commit
+# is in progress, and synchronous=NORMAL only fsyncs at checkpoints, which cannot corrupt the
+# database but may lose the last commits on power loss. 'fast' also skips those fsyncs.
+# WAL needs shared memory, so set journal_mode = DELETE when bar_audit.db lives on a network drive.
+SQLITE_PROFILES = {
+    'stock': {},  # SQLite's own defaults (rollback journal, synchronous=FULL, 2 MB cache)
+    'safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,  # Negative values are KiB: 16 MB page cache
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,  # Milliseconds to wait for another writer before "database is locked"
+    },
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+}
+PRAGMA_NAMES = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store', 'busy_timeout')
+
+
+def get_sqlite_pragmas(profile=None):
+    """Returns the pragmas for a profile, with any individual pragmas set in the [database] config applied."""
+    profile = profile or get_setting('database', 'profile', 'safe')
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile '{profile}'. Choose one of: {', '.join(SQLITE_PROFILES)}")
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in PRAGMA_NAMES:
+        value = get_setting('database', name)
+        if value:
+            pragmas[name] = value
+    return pragmas
+
+
+def create_db_engine(url=None, pragmas=None):
+    """Creates an engine that applies the configured SQLite pragmas to each new connection."""
+    url = url or get_setting('database', 'url')
+    new_engine = create_engine(url)
+    if new_engine.dialect.name == 'sqlite':
+        pragmas = get_sqlite_pragmas() if pragmas is None else pragmas
+
+        @event.listens_for(new_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+            cursor.close()
+    return new_engine
+
 
 # --- Database Setup ---
-DATABASE_URL = 'sqlite:///bar_audit.db'
-engine = create_engine(DATABASE_URL)
+DATABASE_URL = get_setting('database', 'url')
+engine = create_db_engine(DATABASE_URL)
 Session = sessionmaker(bind=engine)
 db_session = Session()
 Base = declarative_base()
 
+
+def data_path(path):
+    """
+    Resolves a relative data path from the config (e.g. the audit archive directory) against the directory
+    of the SQLite database file, so the files stay beside bar_audit.db whatever directory the app starts in.
+    """
+    database = engine.url.database if engine.dialect.name == 'sqlite' else None
+    if not database or database == ':memory:':
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(database)), path)
+
+
+# --- Units of Work ---
+# Several terminals can share one bar_audit.db, and SQLite lets one connection write at a time.
+# Every write runs in its own short session that takes the write lock up front (BEGIN IMMEDIATE),
+# so the rows it reads cannot change before it commits; busy_timeout makes it wait for another
+# terminal's lock, and run_in_session retries the whole unit if SQLite still reports it locked.
+# db_session stays the views' read session: refresh_session() makes it re-read other terminals' changes.
+BUSY_RETRIES = get_int_setting('database', 'busy_retries', 5)
+BUSY_RETRY_BASE_SECONDS = 0.05  # Longest pause before the first retry; doubles with each attempt...
+BUSY_RETRY_MAX_SECONDS = 2.0  # ...up to this
+
+
+def is_busy_error(error):
+    """True for SQLite's "database is locked" / "database is busy" errors, which are worth retrying."""
+    message = str(getattr(error, 'orig', error)).lower()
+    return isinstance(error, OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def begin_immediate(session):
+    """Starts the session's transaction holding SQLite's write lock, instead of at its first write."""
+    if session.get_bind().dialect.name == 'sqlite':
+        session.execute(text("BEGIN IMMEDIATE"))
+
+
+@contextmanager
+def session_scope(write=True, session_factory=None):
+    """
+    One unit of work: a new session that is committed when the block ends, rolled back if it raises,
+    and closed either way. Objects loaded in it stay readable afterwards (expire_on_commit=False).
+    With write=True the transaction starts with the write lock held (begin_immediate).
+    """
+    session = (session_factory or Session)(expire_on_commit=False)
+    try:
+        if write:
+            begin_immediate(session)
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def run_in_session(func, *args, retries=None, session_factory=None, **kwargs):
+    """
+    Runs func(session, *args, **kwargs) as one unit of work (session_scope) and returns its result.
+    While SQLite reports the database locked, or a versioned row was changed by someone else since it
+    was read (StaleDataError), the whole unit is run again in a fresh session after a random pause
+    (exponential backoff with full jitter, so terminals do not retry in lockstep), at most `retries`
+    times (BUSY_RETRIES by default).
+    """
+    retries = BUSY_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            with session_scope(session_factory=session_factory) as session:
+                return func(session, *args, **kwargs)
+        except (OperationalError, StaleDataError) as e:
+            if not (isinstance(e, StaleDataError) or is_busy_error(e)) or attempt == retries:
+                raise
+            time.sleep(random.uniform(0, min(BUSY_RETRY_MAX_SECONDS, BUSY_RETRY_BASE_SECONDS * 2 ** attempt)))
+
+
+def refresh_session(session=None):
+    """
+    Explicit refresh: ends the session's transaction and expires every object it has loaded (db_session
+    by default), so the next access re-reads rows that other terminals or units of work have changed.
+    """
+    (session or db_session).rollback()
+
 # This module provides the database connection and base for models.
 # Other modules will import db_session and Base from here.
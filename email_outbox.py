@@ -0,0 +1,313 @@
+import argparse
+import atexit
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from config import get_setting, get_int_setting
+from database import engine, run_in_session, session_scope
+from models import EmailOutbox
+from helpers import log_action
+
+# --- Email Outbox Settings ---
+# Report emails are written to the email_outbox table and sent by a background thread, so a dropped
+# connection only delays them. Settings come from the [smtp] config section (see config.example.ini).
+OUTBOX_BATCH_SIZE = 20  # Messages loaded per pass; each is sent over the same connection
+OUTBOX_POLL_SECONDS = 300  # Longest the sender sleeps without being woken by a new message
+
+
+def smtp_settings():
+    return {
+        'host': get_setting('smtp', 'host'),
+        'port': get_int_setting('smtp', 'port', 465),
+        'security': get_setting('smtp', 'security', 'ssl').lower(),
+        'username': get_setting('smtp', 'username'),
+        'password': get_setting('smtp', 'password'),
+        'sender': get_setting('smtp', 'sender'),
+        'timeout': get_int_setting('smtp', 'timeout', 30),
+        'max_attempts': get_int_setting('smtp', 'max_attempts', 10),
+        'retry_base_seconds': get_int_setting('smtp', 'retry_base_seconds', 30),
+        'retry_max_seconds': get_int_setting('smtp', 'retry_max_seconds', 3600),
+        'idle_disconnect_seconds': get_int_setting('smtp', 'idle_disconnect_seconds', 60),
+    }
+
+
+def email_is_configured():
+    settings = smtp_settings()
+    return bool(settings['host'] and settings['sender'])
+
+
+def retry_delay(attempts, settings):
+    """Exponential backoff with jitter, so several tills coming back online do not retry in lockstep."""
+    delay = min(settings['retry_base_seconds'] * 2 ** max(attempts - 1, 0), settings['retry_max_seconds'])
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def queue_email(recipient, subject, body, attachment_path=None, requested_by='System', requested_role='System'):
+    """
+    Stores a message (and a copy of its attachment) in the outbox as a unit of work (run_in_session),
+    and wakes the sender. Returns the new outbox row id.
+    """
+    values = {'recipient': recipient, 'subject': subject, 'body': body, 'requested_by': requested_by,
+              'requested_role': requested_role}
+    if attachment_path:
+        with open(attachment_path, 'rb') as f:
+            values['attachment'] = f.read()
+        values['attachment_name'] = os.path.basename(attachment_path)
+    message_id = run_in_session(_add_message, values)
+    email_sender.wake()
+    return message_id
+
+
+def _add_message(session, values):
+    message = EmailOutbox(**values)
+    session.add(message)
+    session.flush()
+    return message.id
+
+
+def build_message(message, sender):
+    # smtplib and the email package are only imported once there is something to send,
+    # which keeps them off the app's start-up path
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+    from email.mime.application import MIMEApplication
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = message.recipient
+    msg['Subject'] = message.subject
+    msg.attach(MIMEText(message.body, 'plain'))
+    if message.attachment is not None:
+        attach = MIMEApplication(message.attachment, _subtype="pdf")
+        attach.add_header('Content-Disposition', 'attachment', filename=message.attachment_name)
+        msg.attach(attach)
+    return msg
+
+
+class EmailSender:
+    """
+    Sends pending outbox messages on a background thread over one authenticated SMTP connection,
+    which is kept open while messages keep coming and closed after idle_disconnect_seconds.
+    A failed send is retried with exponential backoff; until then the whole outbox waits, since
+    failures here are nearly always the connection rather than the message.
+    Each message is read, and its outcome saved, in short units of work of its own, so no transaction
+    stays open while the SMTP server is talked to.
+    """
+
+    def __init__(self, bind, settings=None):
+        self.Session = sessionmaker(bind=bind)
+        self._settings = settings
+        self._wake_event = threading.Event()
+        self._start_lock = threading.Lock()
+        self._send_lock = threading.Lock()  # The sender thread and send_pending() callers share the connection
+        self._thread = None
+        self._stopping = False
+        self._connection = None
+        self._last_used = 0.0
+        self._paused_until = None
+
+    @property
+    def settings(self):
+        return self._settings or smtp_settings()
+
+    def start(self):
+        """Starts the sender thread, which first sends anything left in the outbox by a previous run."""
+        with self._start_lock:
+            if self._thread is None and not self._stopping:
+                self._thread = threading.Thread(target=self._run, name="EmailSender", daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        """Tells the sender that a new message is waiting."""
+        self._paused_until = None  # A fresh message is worth one attempt even during a backoff
+        self.start()
+        self._wake_event.set()
+
+    def close(self, timeout=5.0):
+        """Stops the sender thread. Unsent messages stay in the outbox for the next run."""
+        with self._start_lock:
+            self._stopping = True
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)  # Do not hold up exit on a hung connection; the thread is a daemon
+        if self._send_lock.acquire(timeout=timeout):
+            try:
+                self._disconnect()
+            finally:
+                self._send_lock.release()
+
+    def send_pending(self):
+        """Sends every due message once. Returns (sent, failed) counts for this pass."""
+        sent = failed = 0
+        with self._send_lock:
+            if not email_is_configured():
+                return sent, failed
+            while not self._stopping:
+                with session_scope(write=False, session_factory=self.Session) as session:
+                    due_ids = [row.id for row in session.query(EmailOutbox.id).filter(
+                        EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= datetime.utcnow()
+                    ).order_by(EmailOutbox.id).limit(OUTBOX_BATCH_SIZE)]
+                if not due_ids:
+                    break
+                for message_id in due_ids:
+                    with session_scope(write=False, session_factory=self.Session) as session:
+                        message = session.query(EmailOutbox).get(message_id)
+                    if self._send(message):
+                        sent += 1
+                    else:
+                        failed += 1
+                        return sent, failed
+        return sent, failed
+
+    def _send(self, message):
+        import smtplib
+        settings = self.settings
+        try:
+            if self._connection is None:
+                self._connect(settings)
+            self._connection.sendmail(settings['sender'], [message.recipient],
+                                      build_message(message, settings['sender']).as_string())
+        except (smtplib.SMTPException, OSError) as e:
+            self._disconnect()
+            message = run_in_session(_record_failure, message.id, str(e), settings, session_factory=self.Session)
+            if message.status == 'failed':
+                log_action(message.requested_by, message.requested_role, 'Failed to Email Report',
+                           new_value=f"{message.subject}: {e} (gave up after {message.attempts} attempts)")
+            else:
+                self._paused_until = message.next_attempt_at
+            print(f"Error sending email '{message.subject}' (attempt {message.attempts}): {e}")
+            return False
+
+        self._last_used = time.monotonic()
+        run_in_session(_record_sent, message.id, session_factory=self.Session)
+        log_action(message.requested_by, message.requested_role, 'Emailed Report',
+                   new_value=f"{message.subject} to {message.recipient}")
+        return True
+
+    def _connect(self, settings):
+        import smtplib
+        if settings['security'] == 'ssl':
+            connection = smtplib.SMTP_SSL(settings['host'], settings['port'], timeout=settings['timeout'])
+        else:
+            connection = smtplib.SMTP(settings['host'], settings['port'], timeout=settings['timeout'])
+            if settings['security'] == 'starttls':
+                connection.starttls()
+        try:
+            if settings['username']:
+                connection.login(settings['username'], settings['password'])
+        except Exception:
+            connection.close()
+            raise
+        self._connection = connection
+        self._last_used = time.monotonic()
+
+    def _disconnect(self):
+        if self._connection is not None:
+            import smtplib
+            try:
+                self._connection.quit()
+            except (smtplib.SMTPException, OSError):
+                self._connection.close()
+            self._connection = None
+
+    def _seconds_until_next_attempt(self):
+        if self._paused_until is not None:
+            return max((self._paused_until - datetime.utcnow()).total_seconds(), 0.0)
+        session = self.Session()
+        try:
+            next_attempt = session.query(func.min(EmailOutbox.next_attempt_at)).filter(
+                EmailOutbox.status == 'pending').scalar()
+        finally:
+            session.close()
+        if next_attempt is None:
+            return OUTBOX_POLL_SECONDS
+        return min(max((next_attempt - datetime.utcnow()).total_seconds(), 0.0), OUTBOX_POLL_SECONDS)
+
+    def _run(self):
+        while not self._stopping:
+            if self._paused_until is None or self._paused_until <= datetime.utcnow():
+                self._paused_until = None
+                try:
+                    self.send_pending()
+                except Exception as e:
+                    print(f"Error in email sender: {e}")
+            try:
+                wait = self._seconds_until_next_attempt()
+            except Exception as e:
+                print(f"Error in email sender: {e}")
+                wait = OUTBOX_POLL_SECONDS
+
+            idle_limit = self.settings['idle_disconnect_seconds']
+            if self._connection is not None:
+                idle_for = time.monotonic() - self._last_used
+                if idle_for >= idle_limit:
+                    with self._send_lock:
+                        self._disconnect()
+                else:
+                    wait = min(wait, idle_limit - idle_for)
+            self._wake_event.wait(wait)
+            self._wake_event.clear()
+
+
+def _record_sent(session, message_id):
+    message = session.query(EmailOutbox).get(message_id)
+    message.status = 'sent'
+    message.attempts += 1
+    message.sent_at = datetime.utcnow()
+    message.attachment = None  # Delivered; no need to keep the PDF in the database
+
+
+def _record_failure(session, message_id, error, settings):
+    """Counts a failed attempt and schedules the next one, or gives up after max_attempts. Returns the message."""
+    message = session.query(EmailOutbox).get(message_id)
+    message.attempts += 1
+    message.last_error = error
+    if message.attempts >= settings['max_attempts']:
+        message.status = 'failed'
+    else:
+        message.next_attempt_at = datetime.utcnow() + retry_delay(message.attempts, settings)
+    return message
+
+
+email_sender = EmailSender(engine)
+atexit.register(email_sender.close)
+
+
+def outbox_status(session):
+    """Returns {status: message count} for the outbox."""
+    return dict(session.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all())
+
+
+if __name__ == '__main__':
+    # To try the outbox without a real mail account, run a local debugging server, e.g.
+    #   python -m aiosmtpd -n -l localhost:1025
+    # and set host = localhost, port = 1025, security = none and a sender in the [smtp] config section.
+    from database import Base, db_session
+    from migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Inspect or flush the email outbox.")
+    parser.add_argument('--send', action='store_true', help="send every due message now, then exit")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="move messages that ran out of attempts back to pending")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    if args.retry_failed:
+        retried = db_session.query(EmailOutbox).filter_by(status='failed').update(
+            {'status': 'pending', 'attempts': 0, 'next_attempt_at': datetime.utcnow()})
+        db_session.commit()
+        print(f"Requeued {retried} failed message(s).")
+    if args.send:
+        if not email_is_configured():
+            print("Email is not configured: set host and sender in the [smtp] config section.")
+        else:
+            sent, failed = email_sender.send_pending()
+            print(f"Sent {sent} message(s), {failed} failed.")
+        email_sender.close()
+    print(f"Outbox: {outbox_status(db_session) or 'empty'}")
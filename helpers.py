@@ -1,19 +1,19 @@
-from datetime import datetime
-from models import AuditLog
-from database import db_session
+from audit_writer import audit_writer
 
-def log_action(username, user_role, action_type, old_value=None, new_value=None):
-    """Logs an action to the AuditLog table."""
+def log_action(username, user_role, action_type, old_value=None, new_value=None, durable=False):
+    """
+    Logs an action to the AuditLog table.
+    Records are queued and written in batches by the background audit writer; pass durable=True
+    for money-affecting actions to block until the record has been committed.
+    """
     try:
-        log = AuditLog(
-            username=username,
-            user_role=user_role,
-            action_type=action_type,
-            old_value=str(old_value) if old_value is not None else None,
-            new_value=str(new_value) if new_value is not None else None
-        )
-        db_session.add(log)
-        db_session.commit()
+        return audit_writer.submit({
+            'username': username,
+            'user_role': user_role,
+            'action_type': action_type,
+            'old_value': str(old_value) if old_value is not None else None,
+            'new_value': str(new_value) if new_value is not None else None
+        }, durable=durable)
     except Exception as e:
         print(f"Error logging action: {e}")
-        db_session.rollback()
+        return False
@@ -1,12 +1,23 @@
+import startup_timing # Imported first so the start-up timeline covers every import below
 import tkinter as tk
 from tkinter import messagebox
 import traceback
+from collections import deque
 from datetime import date
+startup_timing.mark("import tkinter")
 
 # Import modules
-from database import engine, db_session, Base
+from config import get_bool_setting
+from database import engine, db_session
 from models import User, InventoryItem # Import models for initial data
+startup_timing.mark("import database and models")
 from helpers import log_action
+from migrations import prepare_database, write_app_metadata, INITIAL_DATA_KEY
+from report_jobs import ReportJobRunner
+from email_outbox import email_sender
+from audit_archive import start_background_archival
+from audit_chain import start_background_verification
+startup_timing.mark("import services")
 
 # Import view classes
 from views.login_view import LoginView
@@ -14,6 +25,7 @@ from views.dashboard_view import DashboardView
 from views.admin_views import AdminViews
 from views.manager_views import ManagerViews
 from views.staff_views import StaffViews
+startup_timing.mark("import views")
 
 class BarAuditApp:
     def __init__(self, master):
@@ -24,6 +36,13 @@ class BarAuditApp:
         master.resizable(True, True)
 
         self.current_user = None
+        # Screens are built once and then shown/hidden by BaseUI.show_screen
+        self.screens = {}
+        self.current_screen = None
+        self.navigation_timings = deque(maxlen=200)  # (screen name, milliseconds, built) per navigation
+        # Reports render and email on worker threads; views watch their progress through this runner
+        self.report_jobs = ReportJobRunner(master)
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # Initialize view instances
         self.login_view = LoginView(master, self)
@@ -32,20 +51,39 @@ class BarAuditApp:
         self.manager_view = ManagerViews(master, self)
         self.staff_view = StaffViews(master, self)
 
-        # Call setup_styles from one of the view instances (they share BaseUI)
-        # or directly from a common utility if preferred. Keeping it here for initial setup.
+        # Styles are global to the Tk app, so they are configured once here for every view
         self.login_view.setup_styles() # Any view object derived from BaseUI can call this
+        startup_timing.mark("views created and styles set up")
 
         # Create initial data and display login UI
         self.create_initial_data()
+        startup_timing.mark("database schema and initial data checked")
+        # Sends report emails left in the outbox by a previous run, then waits for new ones
+        email_sender.start()
+        # Moves audit logs past the retention period to the archive files while the user logs in
+        archiver = start_background_archival()
+        # Then checks the audit log hash chain from the last checkpoint, at most once a day
+        start_background_verification(after=archiver)
+        # Serves the handheld sales API on the LAN when [server] enabled is set. The server module (and
+        # asyncio with it) is only imported then, so it stays off the start-up path otherwise
+        if get_bool_setting('server', 'enabled', False):
+            from sales_server import start_background_server
+            start_background_server()
         self.login_view.create_login_ui()
+        startup_timing.mark("login screen built")
 
     def create_initial_data(self):
-        """Creates initial admin, manager, staff users and inventory items if DB is empty."""
+        """
+        Creates initial admin, manager, staff users and inventory items if DB is empty.
+        On a database that app_metadata records as set up, this is a single lookup.
+        """
         try:
-            Base.metadata.create_all(engine)
+            # Creates missing tables and brings older databases up to the current schema when needed
+            state = prepare_database(db_session, engine)
+            if state.get(INITIAL_DATA_KEY) == '1':
+                return
 
-            if db_session.query(User).count() == 0:
+            if db_session.query(User.id).first() is None:
                 admin_user = User(username='admin', role='Admin', monthly_salary=500000.0,
                                   current_salary_balance=500000.0)
                 admin_user.set_password('admin123')
@@ -73,7 +111,7 @@ class BarAuditApp:
 
                 db_session.commit()
 
-            if db_session.query(InventoryItem).count() == 0:
+            if db_session.query(InventoryItem.id).first() is None:
                 item1 = InventoryItem(name='Beer Bottle', price_per_unit=1000.0, opening_stock=50, closing_stock=50, supply_qty=0)
                 item2 = InventoryItem(name='Wine Glass', price_per_unit=2500.0, opening_stock=30, closing_stock=30, supply_qty=0)
                 item3 = InventoryItem(name='Soda Can', price_per_unit=500.0, opening_stock=100, closing_stock=100, supply_qty=0)
@@ -81,6 +119,8 @@ class BarAuditApp:
                 db_session.commit()
                 log_action('System', 'System', 'Initial Inventory Items Created')
 
+            write_app_metadata(db_session, {INITIAL_DATA_KEY: '1'})
+
         except Exception as e:
             messagebox.showerror("Database Error", f"Failed to initialize database: {e}", icon="error")
             traceback.print_exc()
@@ -89,8 +129,21 @@ class BarAuditApp:
         """Delegates to the dashboard view to display the main dashboard."""
         self.dashboard_view.show_dashboard()
 
+    def on_close(self):
+        """Warns about unfinished reports, then stops the report workers and closes the window."""
+        active = self.report_jobs.active_jobs()
+        if active and not messagebox.askyesno(
+                "Reports Running", f"{len(active)} report(s) are still being generated or sent. Cancel them and exit?"):
+            return
+        self.report_jobs.shutdown()
+        email_sender.close()
+        self.master.destroy()
+
 # Entry point of the application
 if __name__ == '__main__':
     root = tk.Tk()
+    startup_timing.mark("Tk root window created")
     app = BarAuditApp(root)
+    if get_bool_setting('ui', 'startup_timing'):
+        startup_timing.report_when_shown(root)
     root.mainloop()
@@ -0,0 +1,489 @@
+import hashlib
+import json
+import sys
+from datetime import date, datetime
+from sqlalchemy import func, text
+from sqlalchemy.exc import OperationalError
+
+from database import engine, db_session, Base
+from models import (AuditLog, CashRegisterEntry, DailyItemMovement, DailyStockEntry, SalaryDeduction, StaffSaleEntry,
+                    StaffDailyTotal, AppMetadata)
+from staff_totals import REBUILD_STAFF_DAILY_TOTALS_SQL
+from audit_chain import GENESIS_HASH, log_hash
+
+# --- Schema Migrations ---
+# Base.metadata.create_all only creates missing tables, so every change to an existing table
+# (new index, column, trigger, backfill) must also be added here as a new, higher-numbered migration.
+# Applied migrations are never edited: existing databases have already run them.
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Registers a function taking a SQLAlchemy connection as schema migration `version`."""
+    def decorator(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return decorator
+
+
+@migration(1, "Audit log indexes for the paginated log viewer")
+def _add_audit_log_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_logs_timestamp_id ON audit_logs (timestamp, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_logs_username_timestamp_id "
+                      "ON audit_logs (username, timestamp, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_logs_user_role_timestamp_id "
+                      "ON audit_logs (user_role, timestamp, id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_logs_action_type_timestamp_id "
+                      "ON audit_logs (action_type, timestamp, id)"))
+
+
+@migration(2, "Composite indexes for the daily sales, cash and deduction filters")
+def _add_daily_entry_indexes(conn):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_staff_sale_entries_staff_date_submitted "
+                      "ON staff_sale_entries (staff_id, entry_date, is_submitted)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_staff_sale_entries_date_submitted "
+                      "ON staff_sale_entries (entry_date, is_submitted)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cash_register_entries_user_date "
+                      "ON cash_register_entries (user_id, entry_date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_cash_register_entries_date "
+                      "ON cash_register_entries (entry_date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_salary_deductions_user_date "
+                      "ON salary_deductions (user_id, deduction_date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_salary_deductions_timestamp "
+                      "ON salary_deductions (timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_daily_stock_entries_manager_date "
+                      "ON daily_stock_entries (manager_id, entry_date)"))
+
+
+@migration(3, "Per-item daily movement table backfilled from item_sales_snapshot")
+def _add_daily_item_movements(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS daily_item_movements (
+            id INTEGER NOT NULL PRIMARY KEY,
+            daily_stock_entry_id INTEGER NOT NULL REFERENCES daily_stock_entries (id),
+            entry_date DATE NOT NULL,
+            item_id INTEGER REFERENCES inventory_items (id),
+            item_name VARCHAR(100) NOT NULL,
+            opening_stock INTEGER,
+            supply_qty INTEGER,
+            closing_stock INTEGER,
+            quantity_sold INTEGER,
+            price_per_unit FLOAT,
+            total_sales FLOAT,
+            CONSTRAINT uq_daily_item_movements_date_item UNIQUE (entry_date, item_name)
+        )"""))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_daily_item_movements_item_date "
+                      "ON daily_item_movements (item_name, entry_date)"))
+
+    item_ids = dict(conn.execute(text("SELECT name, id FROM inventory_items")).fetchall())
+    entries = conn.execute(text("SELECT id, entry_date, item_sales_snapshot FROM daily_stock_entries "
+                                "WHERE item_sales_snapshot IS NOT NULL")).fetchall()
+    rows = []
+    for entry_id, entry_date, snapshot in entries:
+        try:
+            item_sales_details = json.loads(snapshot)
+        except json.JSONDecodeError:
+            print(f"Skipping unreadable item_sales_snapshot for daily stock entry {entry_id}")
+            continue
+        for item_name, details in item_sales_details.items():
+            rows.append({
+                'daily_stock_entry_id': entry_id,
+                'entry_date': entry_date,
+                'item_id': item_ids.get(item_name),
+                'item_name': item_name,
+                'opening_stock': details.get('opening_stock', 0),
+                'supply_qty': details.get('supply_qty', 0),
+                'closing_stock': details.get('closing_stock', 0),
+                'quantity_sold': details.get('quantity_sold', 0),
+                'price_per_unit': details.get('price_per_unit', 0.0),
+                'total_sales': details.get('profit', 0.0),  # The snapshot calls quantity_sold * price 'profit'
+            })
+    if rows:
+        conn.execute(text("""
+            INSERT OR IGNORE INTO daily_item_movements
+                (daily_stock_entry_id, entry_date, item_id, item_name, opening_stock, supply_qty,
+                 closing_stock, quantity_sold, price_per_unit, total_sales)
+            VALUES (:daily_stock_entry_id, :entry_date, :item_id, :item_name, :opening_stock, :supply_qty,
+                    :closing_stock, :quantity_sold, :price_per_unit, :total_sales)"""), rows)
+
+
+# Tables whose rows appear in reports, with the column holding the day each row belongs to
+REPORT_SOURCE_TABLES = (
+    ('daily_stock_entries', 'entry_date'),
+    ('daily_item_movements', 'entry_date'),
+    ('staff_sale_entries', 'entry_date'),
+    ('cash_register_entries', 'entry_date'),
+    ('salary_deductions', 'deduction_date'),
+)
+
+
+def _bump_report_version(day_expression):
+    return (f"INSERT INTO report_data_versions (day, version) VALUES ({day_expression}, 1) "
+            f"ON CONFLICT (day) DO UPDATE SET version = version + 1;")
+
+
+@migration(4, "Report data version table and triggers for the report cache")
+def _add_report_data_versions(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS report_data_versions ("
+                      "day VARCHAR(10) NOT NULL PRIMARY KEY, version INTEGER NOT NULL)"))
+    for table, date_column in REPORT_SOURCE_TABLES:
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_report_version_insert AFTER INSERT ON {table}
+            BEGIN {_bump_report_version(f"NEW.{date_column}")} END"""))
+        # An update can move a row to another day, which changes both days' reports
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_report_version_update AFTER UPDATE ON {table}
+            BEGIN {_bump_report_version(f"OLD.{date_column}")} {_bump_report_version(f"NEW.{date_column}")} END"""))
+        conn.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_report_version_delete AFTER DELETE ON {table}
+            BEGIN {_bump_report_version(f"OLD.{date_column}")} END"""))
+    # Reports print usernames, so renaming or deleting a user changes every report
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_users_report_version_update AFTER UPDATE OF username ON users
+        BEGIN {_bump_report_version("'*'")} END"""))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_users_report_version_delete AFTER DELETE ON users
+        BEGIN {_bump_report_version("'*'")} END"""))
+
+
+@migration(5, "Email outbox for queued report emails")
+def _add_email_outbox(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER NOT NULL PRIMARY KEY,
+            recipient VARCHAR(255) NOT NULL,
+            subject VARCHAR(255) NOT NULL,
+            body VARCHAR NOT NULL,
+            attachment_name VARCHAR(255),
+            attachment BLOB,
+            status VARCHAR(20) NOT NULL,
+            attempts INTEGER NOT NULL,
+            next_attempt_at DATETIME NOT NULL,
+            last_error VARCHAR,
+            requested_by VARCHAR(80) NOT NULL,
+            requested_role VARCHAR(20) NOT NULL,
+            created_at DATETIME,
+            sent_at DATETIME
+        )"""))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_email_outbox_status_next_attempt "
+                      "ON email_outbox (status, next_attempt_at)"))
+
+
+def _add_to_staff_daily_totals(row, sign):
+    """Trigger statements adding (sign '+') or removing (sign '-') one sale row in staff_daily_totals."""
+    if sign == '+':
+        return (f"INSERT INTO staff_daily_totals (staff_id, entry_date, is_submitted, sale_count, quantity, total_cost) "
+                f"VALUES ({row}.staff_id, {row}.entry_date, COALESCE({row}.is_submitted, 0), 1, {row}.quantity, "
+                f"{row}.total_cost) ON CONFLICT (staff_id, entry_date, is_submitted) DO UPDATE SET "
+                f"sale_count = sale_count + 1, quantity = quantity + excluded.quantity, "
+                f"total_cost = total_cost + excluded.total_cost;")
+    return (f"UPDATE staff_daily_totals SET sale_count = sale_count - 1, quantity = quantity - {row}.quantity, "
+            f"total_cost = total_cost - {row}.total_cost WHERE staff_id = {row}.staff_id "
+            f"AND entry_date = {row}.entry_date AND is_submitted = COALESCE({row}.is_submitted, 0); "
+            f"DELETE FROM staff_daily_totals WHERE staff_id = {row}.staff_id AND entry_date = {row}.entry_date "
+            f"AND is_submitted = COALESCE({row}.is_submitted, 0) AND sale_count <= 0;")
+
+
+@migration(6, "Staff daily sales totals maintained by triggers")
+def _add_staff_daily_totals(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS staff_daily_totals (
+            staff_id INTEGER NOT NULL REFERENCES users (id),
+            entry_date DATE NOT NULL,
+            is_submitted BOOLEAN NOT NULL,
+            sale_count INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            total_cost FLOAT NOT NULL,
+            PRIMARY KEY (staff_id, entry_date, is_submitted)
+        )"""))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_staff_daily_totals_date_submitted "
+                      "ON staff_daily_totals (entry_date, is_submitted)"))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_staff_sale_entries_totals_insert AFTER INSERT ON staff_sale_entries
+        BEGIN {_add_to_staff_daily_totals('NEW', '+')} END"""))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_staff_sale_entries_totals_update
+        AFTER UPDATE OF staff_id, entry_date, is_submitted, quantity, total_cost ON staff_sale_entries
+        BEGIN {_add_to_staff_daily_totals('OLD', '-')} {_add_to_staff_daily_totals('NEW', '+')} END"""))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_staff_sale_entries_totals_delete AFTER DELETE ON staff_sale_entries
+        BEGIN {_add_to_staff_daily_totals('OLD', '-')} END"""))
+    for statement in REBUILD_STAFF_DAILY_TOTALS_SQL:
+        conn.execute(text(statement))
+
+
+@migration(7, "App metadata table for the start-up fast path")
+def _add_app_metadata(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS app_metadata (
+            key VARCHAR(50) NOT NULL PRIMARY KEY,
+            value VARCHAR(255) NOT NULL,
+            updated_at DATETIME NOT NULL
+        )"""))
+
+
+# Full-text index over the audit log's free-text columns, kept in step with audit_logs by triggers
+AUDIT_SEARCH_TABLE = 'audit_logs_fts'
+AUDIT_SEARCH_COLUMNS = ('action_type', 'username', 'old_value', 'new_value')
+
+
+def _audit_search_row(row, command=None):
+    columns = ', '.join(AUDIT_SEARCH_COLUMNS)
+    values = ', '.join(f"{row}.{column}" for column in AUDIT_SEARCH_COLUMNS)
+    if command:
+        return (f"INSERT INTO {AUDIT_SEARCH_TABLE} ({AUDIT_SEARCH_TABLE}, rowid, {columns}) "
+                f"VALUES ('{command}', {row}.id, {values});")
+    return f"INSERT INTO {AUDIT_SEARCH_TABLE} (rowid, {columns}) VALUES ({row}.id, {values});"
+
+
+@migration(8, "Full-text search index over audit log values")
+def _add_audit_log_search(conn):
+    try:
+        # External content table: the index stores tokens only and reads the text back from audit_logs
+        conn.execute(text(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {AUDIT_SEARCH_TABLE} USING fts5(
+                {', '.join(AUDIT_SEARCH_COLUMNS)}, content='audit_logs', content_rowid='id')"""))
+    except OperationalError as e:
+        # SQLite built without FTS5: the log viewer falls back to LIKE searches
+        print(f"Audit log search index not created: {e}")
+        return
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_audit_logs_search_insert AFTER INSERT ON audit_logs
+        BEGIN {_audit_search_row('NEW')} END"""))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_audit_logs_search_delete AFTER DELETE ON audit_logs
+        BEGIN {_audit_search_row('OLD', 'delete')} END"""))
+    conn.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_audit_logs_search_update AFTER UPDATE ON audit_logs
+        BEGIN {_audit_search_row('OLD', 'delete')} {_audit_search_row('NEW')} END"""))
+    # Backfill: index every log already in the table
+    conn.execute(text(f"INSERT INTO {AUDIT_SEARCH_TABLE} ({AUDIT_SEARCH_TABLE}) VALUES ('rebuild')"))
+
+
+@migration(9, "Hash chain and signed checkpoints for audit logs")
+def _add_audit_log_hash_chain(conn):
+    columns = [row[1] for row in conn.execute(text("PRAGMA table_info(audit_logs)"))]
+    if 'row_hash' not in columns:
+        conn.execute(text("ALTER TABLE audit_logs ADD COLUMN row_hash VARCHAR(64)"))
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS audit_checkpoints (
+            id INTEGER NOT NULL PRIMARY KEY,
+            last_log_id INTEGER NOT NULL,
+            chain_hash VARCHAR(64) NOT NULL,
+            rows_verified INTEGER NOT NULL,
+            created_at DATETIME NOT NULL,
+            signature VARCHAR(64) NOT NULL
+        )"""))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_checkpoints_last_log_id "
+                      "ON audit_checkpoints (last_log_id)"))
+    # The search index only changes with the text columns, so the backfill below does not re-index every log
+    conn.execute(text("DROP TRIGGER IF EXISTS trg_audit_logs_search_update"))
+    if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = :name"), {'name': AUDIT_SEARCH_TABLE}).first():
+        conn.execute(text(f"""
+            CREATE TRIGGER trg_audit_logs_search_update
+            AFTER UPDATE OF {', '.join(AUDIT_SEARCH_COLUMNS)} ON audit_logs
+            BEGIN {_audit_search_row('OLD', 'delete')} {_audit_search_row('NEW')} END"""))
+
+    # Backfill: chain the existing logs in id order, starting from the genesis hash
+    previous_hash, last_id = GENESIS_HASH, 0
+    while True:
+        logs = conn.execute(text("SELECT id, timestamp, username, user_role, action_type, old_value, new_value "
+                                 "FROM audit_logs WHERE id > :last_id ORDER BY id LIMIT 5000"),
+                            {'last_id': last_id}).fetchall()
+        if not logs:
+            break
+        hashes = []
+        for log in logs:
+            timestamp = datetime.fromisoformat(log.timestamp) if log.timestamp else None
+            previous_hash = log_hash(previous_hash, log.id, timestamp, log.username, log.user_role,
+                                     log.action_type, log.old_value, log.new_value)
+            hashes.append({'id': log.id, 'row_hash': previous_hash})
+        conn.execute(text("UPDATE audit_logs SET row_hash = :row_hash WHERE id = :id"), hashes)
+        last_id = logs[-1].id
+
+    # Logs are only ever added (or moved to the archive): refuse edits, including by other SQLite tools
+    conn.execute(text("""
+        CREATE TRIGGER IF NOT EXISTS trg_audit_logs_append_only BEFORE UPDATE ON audit_logs
+        BEGIN SELECT RAISE(ABORT, 'audit logs cannot be changed'); END"""))
+
+
+@migration(10, "Version columns for optimistic concurrency on users and inventory items")
+def _add_version_columns(conn):
+    for table in ('users', 'inventory_items'):
+        columns = [row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+        if 'version' not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+@migration(11, "Idempotency keys for the handheld sales server")
+def _add_idempotency_keys(conn):
+    conn.execute(text("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            id INTEGER NOT NULL PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            key VARCHAR(100) NOT NULL,
+            request_hash VARCHAR(64) NOT NULL,
+            response VARCHAR,
+            created_at DATETIME NOT NULL,
+            CONSTRAINT uq_idempotency_keys_user_key UNIQUE (user_id, key)
+        )"""))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_idempotency_keys_created_at ON idempotency_keys (created_at)"))
+
+
+def get_schema_version(conn):
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations ("
+                      "version INTEGER PRIMARY KEY, description VARCHAR(255) NOT NULL, applied_at DATETIME NOT NULL)"))
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+
+def run_migrations(bind=engine):
+    """Upgrades the database in place by applying every migration newer than its recorded version."""
+    with bind.begin() as conn:
+        current_version = get_schema_version(conn)
+
+    applied = []
+    for version, description, func in MIGRATIONS:
+        if version <= current_version:
+            continue
+        # One transaction per migration: a failure leaves the database at the previous version
+        with bind.begin() as conn:
+            func(conn)
+            conn.execute(text("INSERT INTO schema_migrations (version, description, applied_at) "
+                              "VALUES (:version, :description, :applied_at)"),
+                         {'version': version, 'description': description, 'applied_at': datetime.utcnow()})
+        print(f"Applied migration {version}: {description}")
+        applied.append(version)
+    return applied
+
+
+# --- Start-up Fast Path ---
+# Once the schema and the initial data are known to be in place, start-up only reads these keys
+# from app_metadata instead of running create_all (which inspects every table) and the seed checks.
+SCHEMA_FINGERPRINT_KEY = 'schema_fingerprint'
+INITIAL_DATA_KEY = 'initial_data_seeded'
+
+
+def schema_fingerprint():
+    """
+    Identifies the schema this code expects: every model table, column and index, plus the latest
+    migration. Adding a model or a migration changes it, which sends the next start-up down the full path.
+    """
+    parts = [f"migration {MIGRATIONS[-1][0]}"]
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        columns = ','.join(sorted(column.name for column in table.columns))
+        indexes = ','.join(sorted(index.name for index in table.indexes))
+        parts.append(f"{table.name}({columns})[{indexes}]")
+    return hashlib.sha1('\n'.join(parts).encode('utf-8')).hexdigest()
+
+
+def read_app_metadata(session, keys):
+    """Returns {key: value} for the given app_metadata keys, or {} on a database without the table."""
+    try:
+        return dict(session.query(AppMetadata.key, AppMetadata.value).filter(AppMetadata.key.in_(keys)).all())
+    except OperationalError:
+        session.rollback()
+        return {}
+
+
+def write_app_metadata(session, values):
+    """Stores app_metadata values and commits."""
+    for key, value in values.items():
+        session.merge(AppMetadata(key=key, value=str(value), updated_at=datetime.utcnow()))
+    session.commit()
+
+
+def prepare_database(session, bind=engine, force=False):
+    """
+    Creates missing tables and applies migrations, unless app_metadata records that this schema is
+    already in place. Returns the app_metadata start-up state so the caller can skip the seed checks too.
+    """
+    state = {} if force else read_app_metadata(session, (SCHEMA_FINGERPRINT_KEY, INITIAL_DATA_KEY))
+    fingerprint = schema_fingerprint()
+    if state.get(SCHEMA_FINGERPRINT_KEY) != fingerprint:
+        session.rollback()  # Do not hold a read transaction open while the schema changes
+        Base.metadata.create_all(bind)
+        run_migrations(bind)
+        write_app_metadata(session, {SCHEMA_FINGERPRINT_KEY: fingerprint})
+        state[SCHEMA_FINGERPRINT_KEY] = fingerprint
+    return state
+
+
+# --- Query Plan Check ---
+def hot_queries(session):
+    """The filters the views run on every screen load, as (name, query) pairs."""
+    today = date.today()
+    now = datetime.utcnow()
+    return [
+        ("Staff sales for today", session.query(StaffSaleEntry).filter_by(staff_id=1, entry_date=today)),
+        ("Staff pending sales for today",
+         session.query(StaffSaleEntry).filter_by(staff_id=1, entry_date=today, is_submitted=False)),
+        ("Submitted sales for today",
+         session.query(StaffSaleEntry).filter(StaffSaleEntry.entry_date == today,
+                                              StaffSaleEntry.is_submitted == True)),
+        ("Sales for report date", session.query(StaffSaleEntry).filter_by(entry_date=today)),
+        ("Cash entry for user and date", session.query(CashRegisterEntry).filter_by(user_id=1, entry_date=today)),
+        ("Cash entries for report date", session.query(CashRegisterEntry).filter_by(entry_date=today)),
+        ("Deductions for user and date",
+         session.query(SalaryDeduction).filter(SalaryDeduction.deduction_date == today,
+                                               SalaryDeduction.user_id == 1)),
+        ("Deduction history", session.query(SalaryDeduction).order_by(SalaryDeduction.timestamp.desc()).limit(100)),
+        ("Daily stock entry for manager and date",
+         session.query(DailyStockEntry).filter_by(manager_id=1, entry_date=today)),
+        ("Last daily stock entry for manager",
+         session.query(DailyStockEntry).filter_by(manager_id=1).order_by(DailyStockEntry.entry_date.desc()).limit(1)),
+        ("Staff totals for a day",
+         session.query(StaffDailyTotal).filter_by(staff_id=1, entry_date=today)),
+        ("Submitted sales total for a day",
+         session.query(func.sum(StaffDailyTotal.total_cost)).filter(StaffDailyTotal.entry_date == today,
+                                                                    StaffDailyTotal.is_submitted == True)),
+        ("Item movements for report date",
+         session.query(DailyItemMovement).filter_by(entry_date=today).order_by(DailyItemMovement.item_name)),
+        ("Item totals for a quarter",
+         session.query(DailyItemMovement.item_name, func.sum(DailyItemMovement.quantity_sold))
+         .filter(DailyItemMovement.entry_date.between(today, today)).group_by(DailyItemMovement.item_name)),
+        ("Audit log first page",
+         session.query(AuditLog).order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(101)),
+        ("Audit log page for user",
+         session.query(AuditLog).filter(AuditLog.username == 'admin', AuditLog.timestamp < now)
+         .order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(101)),
+        ("Audit log page for action type",
+         session.query(AuditLog).filter(AuditLog.action_type == 'User Login', AuditLog.timestamp < now)
+         .order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(101)),
+    ]
+
+
+def explain_query_plan(session, query):
+    """Returns the EXPLAIN QUERY PLAN detail lines for an ORM query."""
+    compiled = query.statement.compile(dialect=session.get_bind().dialect)
+    # SQLite plans do not depend on parameter values, so every placeholder can be bound to NULL
+    params = tuple(None for _ in compiled.positiontup or ())
+    rows = session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).fetchall()
+    return [row[-1] for row in rows]
+
+
+def find_full_table_scans(session):
+    """Returns {query name: plan lines} for every hot query that scans a whole table."""
+    offenders = {}
+    for name, query in hot_queries(session):
+        plan = explain_query_plan(session, query)
+        # "SCAN table" without "USING ... INDEX" reads every row of the table
+        if any(line.startswith("SCAN ") and " USING " not in line for line in plan):
+            offenders[name] = plan
+    return offenders
+
+
+if __name__ == '__main__':
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+
+    if '--check-plans' in sys.argv:
+        for name, query in hot_queries(db_session):
+            print(f"{name}:")
+            for line in explain_query_plan(db_session, query):
+                print(f"    {line}")
+        offenders = find_full_table_scans(db_session)
+        if offenders:
+            print(f"\nFull table scans found in: {', '.join(offenders)}")
+            sys.exit(1)
+        print("\nNo hot query does a full table scan.")
@@ -1,10 +1,34 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey
+from sqlalchemy import (Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Index, UniqueConstraint,
+                        LargeBinary)
 from sqlalchemy.orm import relationship
 from datetime import date, datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 
 # Import Base from your database module
 from database import Base
+from config import get_setting
+
+# werkzeug hash method for new passwords, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'.
+# Empty uses werkzeug's default. Existing hashes are upgraded the next time their user logs in.
+PASSWORD_HASH_METHOD = get_setting('security', 'password_hash_method') or None
+_password_method_prefix = None
+
+
+def password_method_prefix():
+    """The method part ('scrypt:32768:8:1') of hashes made with the configured settings."""
+    global _password_method_prefix
+    if _password_method_prefix is None:
+        _password_method_prefix = hash_password('').split('$', 1)[0]
+    return _password_method_prefix
+
+
+def hash_password(password):
+    # werkzeug is imported on first use; the package pulls in its whole HTTP stack,
+    # which the login window does not need in order to appear
+    from werkzeug.security import generate_password_hash
+    if PASSWORD_HASH_METHOD:
+        return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+    return generate_password_hash(password)
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -15,6 +39,7 @@ class User(Base):
     monthly_salary = Column(Float, default=0.0)
     current_salary_balance = Column(Float, default=0.0)
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, nullable=False, default=1, server_default='1')  # Optimistic concurrency, see below
 
     # Relationships (for SQLAlchemy: backref creates a reverse relationship on the other side)
     stock_entries = relationship('DailyStockEntry', backref='manager', lazy=True, cascade="all, delete-orphan")
@@ -22,12 +47,21 @@ class User(Base):
     cash_registers = relationship('CashRegisterEntry', backref='user', lazy=True, cascade="all, delete-orphan")
     salary_deductions = relationship('SalaryDeduction', backref='user_rel', lazy=True, cascade="all, delete-orphan")
 
+    # ORM updates check and bump the version, so an edit based on a stale read raises StaleDataError
+    # instead of overwriting another terminal's change (database.run_in_session retries it)
+    __mapper_args__ = {'version_id_col': version}
+
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
+        from werkzeug.security import check_password_hash
         return check_password_hash(self.password_hash, password)
 
+    def password_needs_rehash(self):
+        """True if the stored hash was made with different settings than PASSWORD_HASH_METHOD."""
+        return self.password_hash.split('$', 1)[0] != password_method_prefix()
+
     def __repr__(self):
         return f"<User {self.username} ({self.role})>"
 
@@ -41,6 +75,9 @@ class InventoryItem(Base):
     closing_stock = Column(Integer, default=0)
     price_per_unit = Column(Float, default=0.0)
     date_recorded = Column(Date, nullable=False, default=date.today)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+
+    __mapper_args__ = {'version_id_col': version}  # As on User
 
     def __repr__(self):
         return f"<InventoryItem {self.name}>"
@@ -58,11 +95,39 @@ class DailyStockEntry(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     is_finalized = Column(Boolean, default=False)
     item_sales_snapshot = Column(String)  # Storing JSON string of item sales details
+    item_movements = relationship('DailyItemMovement', backref='daily_entry', lazy=True, cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index('ix_daily_stock_entries_manager_date', 'manager_id', 'entry_date'),
+    )
 
     def __repr__(self):
         return f"<DailyStockEntry {self.entry_date} by {self.manager_id}>"
 
 
+class DailyItemMovement(Base):
+    __tablename__ = 'daily_item_movements'
+    id = Column(Integer, primary_key=True)
+    daily_stock_entry_id = Column(Integer, ForeignKey('daily_stock_entries.id'), nullable=False)
+    entry_date = Column(Date, nullable=False)
+    item_id = Column(Integer, ForeignKey('inventory_items.id'))  # May outlive the item; item_name keeps the history readable
+    item_name = Column(String(100), nullable=False)
+    opening_stock = Column(Integer, default=0)
+    supply_qty = Column(Integer, default=0)
+    closing_stock = Column(Integer, default=0)
+    quantity_sold = Column(Integer, default=0)
+    price_per_unit = Column(Float, default=0.0)
+    total_sales = Column(Float, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint('entry_date', 'item_name', name='uq_daily_item_movements_date_item'),
+        Index('ix_daily_item_movements_item_date', 'item_name', 'entry_date'),
+    )
+
+    def __repr__(self):
+        return f"<DailyItemMovement {self.item_name} sold {self.quantity_sold} on {self.entry_date}>"
+
+
 class StaffSaleEntry(Base):
     __tablename__ = 'staff_sale_entries'
     id = Column(Integer, primary_key=True)
@@ -75,10 +140,34 @@ class StaffSaleEntry(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     is_submitted = Column(Boolean, default=False)
 
+    __table_args__ = (
+        Index('ix_staff_sale_entries_staff_date_submitted', 'staff_id', 'entry_date', 'is_submitted'),
+        Index('ix_staff_sale_entries_date_submitted', 'entry_date', 'is_submitted'),
+    )
+
     def __repr__(self):
         return f"<StaffSaleEntry {self.item_name} x{self.quantity} by {self.staff_id} on {self.entry_date}>"
 
 
+# Running totals of StaffSaleEntry per waiter, day and submitted flag, maintained by SQLite triggers
+# (migration 6) in the same transaction as the sale rows. staff_totals.py reads, checks and rebuilds it.
+class StaffDailyTotal(Base):
+    __tablename__ = 'staff_daily_totals'
+    staff_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    entry_date = Column(Date, primary_key=True)
+    is_submitted = Column(Boolean, primary_key=True)
+    sale_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    total_cost = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        Index('ix_staff_daily_totals_date_submitted', 'entry_date', 'is_submitted'),
+    )
+
+    def __repr__(self):
+        return f"<StaffDailyTotal {self.staff_id} on {self.entry_date}: {self.total_cost}>"
+
+
 class CashRegisterEntry(Base):
     __tablename__ = 'cash_register_entries'
     id = Column(Integer, primary_key=True)
@@ -92,6 +181,11 @@ class CashRegisterEntry(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     is_finalized = Column(Boolean, default=False)
 
+    __table_args__ = (
+        Index('ix_cash_register_entries_user_date', 'user_id', 'entry_date'),
+        Index('ix_cash_register_entries_date', 'entry_date'),
+    )
+
     def __repr__(self):
         return f"<CashRegisterEntry {self.user_id} on {self.entry_date}>"
 
@@ -105,6 +199,11 @@ class SalaryDeduction(Base):
     reason = Column(String(255), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index('ix_salary_deductions_user_date', 'user_id', 'deduction_date'),
+        Index('ix_salary_deductions_timestamp', 'timestamp'),
+    )
+
     user = relationship('User', backref='user_deductions_rel', lazy=True) # Renamed backref for clarity, backref='user_rel' already exists on User side.
 
     def __repr__(self):
@@ -120,6 +219,103 @@ class AuditLog(Base):
     old_value = Column(String)
     new_value = Column(String)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # SHA-256 of the previous row's hash and this row's values (see audit_chain.py), set by the audit writer
+    row_hash = Column(String(64))
+
+    # The log viewer pages newest-first over (timestamp, id), optionally narrowed by one filter column
+    __table_args__ = (
+        Index('ix_audit_logs_timestamp_id', 'timestamp', 'id'),
+        Index('ix_audit_logs_username_timestamp_id', 'username', 'timestamp', 'id'),
+        Index('ix_audit_logs_user_role_timestamp_id', 'user_role', 'timestamp', 'id'),
+        Index('ix_audit_logs_action_type_timestamp_id', 'action_type', 'timestamp', 'id'),
+    )
 
     def __repr__(self):
         return f"<AuditLog {self.action_type} by {self.username} at {self.timestamp}>"
+
+
+# Change counter per day of report data, bumped by SQLite triggers (migration 4) whenever a row that
+# appears in that day's report is inserted, updated or deleted. Cached reports are keyed by it.
+# The day ALL_DAYS counts changes that affect every report, such as a renamed user.
+class ReportDataVersion(Base):
+    __tablename__ = 'report_data_versions'
+    ALL_DAYS = '*'
+    day = Column(String(10), primary_key=True)  # 'YYYY-MM-DD', as SQLite stores Date columns
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ReportDataVersion {self.day} v{self.version}>"
+
+
+class EmailOutbox(Base):
+    __tablename__ = 'email_outbox'
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    body = Column(String, nullable=False)
+    attachment_name = Column(String(255))
+    attachment = Column(LargeBinary)  # The file itself, so the message survives the temporary PDF being deleted
+    status = Column(String(20), nullable=False, default='pending')  # 'pending', 'sent', 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String)
+    requested_by = Column(String(80), nullable=False, default='System')
+    requested_role = Column(String(20), nullable=False, default='System')
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+    # The sender polls for pending messages that are due
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f"<EmailOutbox {self.subject} to {self.recipient} ({self.status})>"
+
+
+# A verified point in the audit log hash chain: every log up to last_log_id hashed to chain_hash.
+# The signature is an HMAC under a key kept outside the database, so checkpoints cannot be forged
+# by someone who only has bar_audit.db. Verification starts from the newest checkpoint.
+class AuditCheckpoint(Base):
+    __tablename__ = 'audit_checkpoints'
+    id = Column(Integer, primary_key=True)
+    last_log_id = Column(Integer, nullable=False, index=True)
+    chain_hash = Column(String(64), nullable=False)
+    rows_verified = Column(Integer, nullable=False, default=0)  # Logs re-hashed since the previous checkpoint
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    signature = Column(String(64), nullable=False)
+
+    def __repr__(self):
+        return f"<AuditCheckpoint log {self.last_log_id} at {self.created_at}>"
+
+
+# Small key/value facts about the database itself, read in one query at start-up (see migrations.py)
+class AppMetadata(Base):
+    __tablename__ = 'app_metadata'
+    key = Column(String(50), primary_key=True)
+    value = Column(String(255), nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<AppMetadata {self.key}={self.value}>"
+
+
+# Requests from handhelds sent with an Idempotency-Key header (see sales_server.py) and the response they got,
+# so a request retried after a dropped connection gets the same answer instead of recording the sale twice.
+class IdempotencyKey(Base):
+    __tablename__ = 'idempotency_keys'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String(100), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the method, path and body
+    response = Column(String)  # JSON [status, body]; NULL if the server stopped before storing it
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('user_id', 'key', name='uq_idempotency_keys_user_key'),
+        Index('ix_idempotency_keys_created_at', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f"<IdempotencyKey {self.key} of user {self.user_id}>"
+
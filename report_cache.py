@@ -0,0 +1,80 @@
+import os
+import shutil
+import threading
+
+from config import get_setting, get_int_setting
+from database import data_path
+
+# --- Report Cache Settings ---
+REPORT_CACHE_DIR = data_path(get_setting('reports', 'cache_dir', 'report_cache'))  # Relative: beside the database
+REPORT_CACHE_MAX_BYTES = get_int_setting('reports', 'cache_max_mb', 200) * 1024 * 1024
+
+
+class ReportCache:
+    """
+    Rendered report PDFs on disk, one file per (report type, date range, user, data version).
+    A newer data version gets a new file name, so edited data is never served from the cache.
+    Files are evicted least recently used first (by modification time, which a hit refreshes)
+    once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # Report jobs run on several worker threads
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def entry_prefix(report_type, start_date, end_date, user_id=None):
+        return f"{report_type}_{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}_u{user_id or 0}_"
+
+    def entry_name(self, report_type, start_date, end_date, data_version, user_id=None):
+        return f"{self.entry_prefix(report_type, start_date, end_date, user_id)}v{data_version}.pdf"
+
+    def fetch(self, name, destination):
+        """Copies a cached report to destination. Returns False on a cache miss."""
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            if not os.path.exists(path):
+                return False
+            shutil.copyfile(path, destination)
+            os.utime(path)  # Mark as recently used
+        return True
+
+    def store(self, name, source):
+        """Adds a rendered report, replacing older versions of the same report, then evicts down to max_bytes."""
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = name[:name.rindex('_v') + 1]
+        with self._lock:
+            for entry in os.listdir(self.directory):
+                if entry.startswith(prefix) and entry != name:
+                    os.remove(os.path.join(self.directory, entry))
+            temp_path = os.path.join(self.directory, name + '.tmp')
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, os.path.join(self.directory, name))  # Readers never see a half-written file
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            if os.path.isdir(self.directory):
+                for entry in os.listdir(self.directory):
+                    os.remove(os.path.join(self.directory, entry))
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+report_cache = ReportCache()
@@ -0,0 +1,198 @@
+from contextlib import contextmanager
+from datetime import date
+from itertools import islice
+
+from sqlalchemy import event, func
+from models import (User, DailyStockEntry, DailyItemMovement, StaffSaleEntry, CashRegisterEntry, SalaryDeduction,
+                    ReportDataVersion)
+
+# Rows whose user has been deleted still show up in reports under this name
+UNKNOWN_USER = 'Unknown'
+REPORT_CHUNK_SIZE = 500  # Rows fetched from SQLite per round trip when streaming range reports
+
+
+def item_movements_for_date(session, entry_date):
+    """Returns the DailyItemMovement rows saved for one day, sorted by item name."""
+    return session.query(DailyItemMovement).filter_by(entry_date=entry_date).order_by(
+        DailyItemMovement.item_name).all()
+
+
+def item_movement_totals(session, start_date, end_date, item_name=None):
+    """
+    Aggregates item movement over an inclusive date range in a single GROUP BY query.
+    Returns rows of (item_name, quantity_sold, total_sales, supply_qty, days_recorded) sorted by item name.
+    """
+    query = session.query(
+        DailyItemMovement.item_name,
+        func.sum(DailyItemMovement.quantity_sold),
+        func.sum(DailyItemMovement.total_sales),
+        func.sum(DailyItemMovement.supply_qty),
+        func.count(DailyItemMovement.id)
+    ).filter(DailyItemMovement.entry_date.between(start_date, end_date))
+    if item_name:
+        query = query.filter(DailyItemMovement.item_name == item_name)
+    return query.group_by(DailyItemMovement.item_name).order_by(DailyItemMovement.item_name).all()
+
+
+def _username_column():
+    return func.coalesce(User.username, UNKNOWN_USER).label('username')
+
+
+def staff_sales_with_usernames(session, start_date, end_date=None):
+    """
+    Staff sales for an inclusive date range (one day if end_date is omitted) in a single joined query.
+    Returns (StaffSaleEntry, username) pairs sorted by username, then item name.
+    """
+    username = _username_column()
+    return session.query(StaffSaleEntry, username).outerjoin(User, User.id == StaffSaleEntry.staff_id).filter(
+        StaffSaleEntry.entry_date.between(start_date, end_date or start_date)
+    ).order_by(username, StaffSaleEntry.item_name, StaffSaleEntry.id).all()
+
+
+def cash_entries_with_usernames(session, start_date, end_date=None):
+    """Cash register declarations for a date range as (CashRegisterEntry, username) pairs sorted by username."""
+    username = _username_column()
+    return session.query(CashRegisterEntry, username).outerjoin(User, User.id == CashRegisterEntry.user_id).filter(
+        CashRegisterEntry.entry_date.between(start_date, end_date or start_date)
+    ).order_by(username, CashRegisterEntry.entry_date, CashRegisterEntry.id).all()
+
+
+def iter_chunks(query, chunk_size=REPORT_CHUNK_SIZE):
+    """Yields the query's rows in lists of up to chunk_size, fetching them from the database as it goes."""
+    rows = iter(query.yield_per(chunk_size))
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# The *_query functions below select plain columns rather than ORM objects so a year of rows can be
+# streamed through iter_chunks without filling the session's identity map.
+def daily_summaries_query(session, start_date, end_date):
+    """One row per day with a stock entry: (entry_date, expected, declared, mismatch, deduction)."""
+    return session.query(
+        DailyStockEntry.entry_date,
+        DailyStockEntry.total_sales_expected,
+        DailyStockEntry.total_pos_cash_declared,
+        DailyStockEntry.mismatch_amount,
+        DailyStockEntry.deduction_amount
+    ).filter(DailyStockEntry.entry_date.between(start_date, end_date)).order_by(DailyStockEntry.entry_date)
+
+
+def daily_summary_totals(session, start_date, end_date):
+    """(days, expected, declared, mismatch, deduction) summed over the range in one query."""
+    return session.query(
+        func.count(DailyStockEntry.id),
+        func.coalesce(func.sum(DailyStockEntry.total_sales_expected), 0.0),
+        func.coalesce(func.sum(DailyStockEntry.total_pos_cash_declared), 0.0),
+        func.coalesce(func.sum(DailyStockEntry.mismatch_amount), 0.0),
+        func.coalesce(func.sum(DailyStockEntry.deduction_amount), 0.0)
+    ).filter(DailyStockEntry.entry_date.between(start_date, end_date)).one()
+
+
+def staff_sale_lines_query(session, start_date, end_date):
+    """(entry_date, username, item_name, quantity, price_per_unit, total_cost) ordered by day, then staff."""
+    username = _username_column()
+    return session.query(
+        StaffSaleEntry.entry_date, username, StaffSaleEntry.item_name, StaffSaleEntry.quantity,
+        StaffSaleEntry.price_per_unit, StaffSaleEntry.total_cost
+    ).outerjoin(User, User.id == StaffSaleEntry.staff_id).filter(
+        StaffSaleEntry.entry_date.between(start_date, end_date)
+    ).order_by(StaffSaleEntry.entry_date, username, StaffSaleEntry.item_name, StaffSaleEntry.id)
+
+
+def staff_sales_totals(session, start_date, end_date):
+    """(username, sale lines, quantity, total_cost) per staff member over the range, sorted by username."""
+    username = _username_column()
+    return session.query(
+        username, func.count(StaffSaleEntry.id), func.sum(StaffSaleEntry.quantity), func.sum(StaffSaleEntry.total_cost)
+    ).outerjoin(User, User.id == StaffSaleEntry.staff_id).filter(
+        StaffSaleEntry.entry_date.between(start_date, end_date)
+    ).group_by(StaffSaleEntry.staff_id).order_by(username).all()
+
+
+def cash_declaration_lines_query(session, start_date, end_date):
+    """(entry_date, username, cash, pos, system_total, mismatch, deduction) ordered by day, then user."""
+    username = _username_column()
+    return session.query(
+        CashRegisterEntry.entry_date, username, CashRegisterEntry.declared_cash, CashRegisterEntry.declared_pos,
+        CashRegisterEntry.system_total_sales, CashRegisterEntry.mismatch_amount, CashRegisterEntry.deduction_amount
+    ).outerjoin(User, User.id == CashRegisterEntry.user_id).filter(
+        CashRegisterEntry.entry_date.between(start_date, end_date)
+    ).order_by(CashRegisterEntry.entry_date, username, CashRegisterEntry.id)
+
+
+def salary_deductions_with_usernames(session, user_id=None, start_date=None, end_date=None):
+    """
+    Salary deductions, optionally for one user and/or an inclusive date range, newest first,
+    as (SalaryDeduction, username) pairs.
+    """
+    query = session.query(SalaryDeduction, _username_column()).outerjoin(User, User.id == SalaryDeduction.user_id)
+    if user_id is not None:
+        query = query.filter(SalaryDeduction.user_id == user_id)
+    if start_date is not None:
+        query = query.filter(SalaryDeduction.deduction_date.between(start_date, end_date or start_date))
+    return query.order_by(SalaryDeduction.timestamp.desc(), SalaryDeduction.id.desc()).all()
+
+
+def daily_report_data(session, report_date, user_id):
+    """
+    Everything the daily PDF report needs, one query per section no matter how many rows or users:
+    the day's stock entry, item movements, staff sales and cash declarations (with usernames)
+    and the reporting user's own salary deductions.
+    """
+    return {
+        'daily_entry': session.query(DailyStockEntry).filter_by(entry_date=report_date).first(),
+        'item_movements': item_movements_for_date(session, report_date),
+        'staff_sales': staff_sales_with_usernames(session, report_date),
+        'cash_entries': cash_entries_with_usernames(session, report_date),
+        'salary_deductions': [ded for ded, _ in salary_deductions_with_usernames(session, user_id, report_date)],
+    }
+
+
+def report_data_version(session, start_date, end_date):
+    """
+    A number that grows whenever any row shown in a report for the range changes (see ReportDataVersion),
+    so it can key a cache of rendered reports.
+    """
+    return session.query(func.coalesce(func.sum(ReportDataVersion.version), 0)).filter(
+        ReportDataVersion.day.between(start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')) |
+        (ReportDataVersion.day == ReportDataVersion.ALL_DAYS)
+    ).scalar()
+
+
+def is_range_finalized(session, start_date, end_date):
+    """
+    True once every day in the range is over and its stock entry and cash declarations are finalized,
+    i.e. the range's reports will not change in normal use.
+    """
+    if end_date >= date.today():
+        return False
+    open_stock_entries = session.query(DailyStockEntry.id).filter(
+        DailyStockEntry.entry_date.between(start_date, end_date), DailyStockEntry.is_finalized == False)
+    open_cash_entries = session.query(CashRegisterEntry.id).filter(
+        CashRegisterEntry.entry_date.between(start_date, end_date), CashRegisterEntry.is_finalized == False)
+    return not session.query(open_stock_entries.exists() | open_cash_entries.exists()).scalar()
+
+
+@contextmanager
+def count_queries(bind):
+    """
+    Counts the SQL statements executed on an engine inside the block:
+
+        with count_queries(engine) as counter:
+            daily_report_data(session, day, user_id)
+        print(counter['count'])
+    """
+    counter = {'count': 0, 'statements': []}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['count'] += 1
+        counter['statements'].append(statement)
+
+    event.listen(bind, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(bind, "before_cursor_execute", before_cursor_execute)
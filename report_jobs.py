@@ -0,0 +1,131 @@
+import itertools
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Report Job Settings ---
+REPORT_WORKERS = 2  # Reports rendered/sent at the same time; further jobs wait in the queue
+REPORT_POLL_INTERVAL_MS = 100  # How often the Tk thread picks up progress from the workers
+
+
+class ReportCancelled(Exception):
+    """Raised inside a report job when the user has cancelled it."""
+
+
+class ReportJob:
+    """One background report task. Workers update it; the Tk thread only reads it."""
+    _ids = itertools.count(1)
+
+    def __init__(self, title, runner):
+        self.id = next(self._ids)
+        self.title = title
+        self.status = "Queued"
+        self.progress = 0.0
+        self.state = 'queued'  # queued, running, done, failed, cancelled
+        self.future = None
+        self._runner = runner
+        self._cancel_event = threading.Event()
+
+    @property
+    def is_finished(self):
+        return self.state in ('done', 'failed', 'cancelled')
+
+    def cancel(self):
+        """Requests cancellation. Queued jobs never start; running jobs stop at their next checkpoint."""
+        self._cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self._runner._post(self, 'cancelled', "Cancelled", self.progress)
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Called by job code between steps; raises ReportCancelled once cancel() has been requested."""
+        if self._cancel_event.is_set():
+            raise ReportCancelled()
+
+    def report_progress(self, fraction, status):
+        """Called by job code to publish progress (0.0 - 1.0) and a short status message."""
+        self._runner._post(self, 'running', status, fraction)
+
+
+class ReportJobRunner:
+    """
+    Runs report jobs on a worker thread pool so rendering and emailing never block the Tk main loop.
+    Workers push updates onto a queue which the Tk thread drains with after(); listeners are
+    therefore always called on the Tk thread and may touch widgets.
+    """
+
+    def __init__(self, master, max_workers=REPORT_WORKERS):
+        self.master = master
+        self.jobs = []
+        self._listeners = []
+        self._updates = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ReportJob")
+        self._poll_id = self.master.after(REPORT_POLL_INTERVAL_MS, self._poll)
+
+    def submit(self, title, func, *args):
+        """Queues func(job, *args). Its return value becomes the job's final status message."""
+        job = ReportJob(title, self)
+        self.jobs.append(job)
+        job.future = self._executor.submit(self._run, job, func, args)
+        self._notify(job)
+        return job
+
+    def add_listener(self, callback):
+        """Registers callback(job), called on the Tk thread whenever a job changes."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def active_jobs(self):
+        return [job for job in self.jobs if not job.is_finished]
+
+    def shutdown(self):
+        """Cancels every job and stops the worker threads without waiting for running jobs to finish."""
+        for job in self.active_jobs():
+            job.cancel()
+        self._executor.shutdown(wait=False)
+        if self._poll_id is not None:
+            self.master.after_cancel(self._poll_id)
+            self._poll_id = None
+
+    def _run(self, job, func, args):
+        if job.is_cancelled():
+            self._post(job, 'cancelled', "Cancelled", job.progress)
+            return
+        self._post(job, 'running', "Starting", 0.0)
+        try:
+            result = func(job, *args)
+            self._post(job, 'done', result or "Done", 1.0)
+        except ReportCancelled:
+            self._post(job, 'cancelled', "Cancelled", job.progress)
+        except Exception as e:
+            print(f"Error in report job '{job.title}': {traceback.format_exc()}")
+            self._post(job, 'failed', f"Failed: {e}", job.progress)
+
+    def _post(self, job, state, status, progress):
+        self._updates.put((job, state, status, progress))
+
+    def _poll(self):
+        try:
+            while True:
+                job, state, status, progress = self._updates.get_nowait()
+                if job.is_finished:
+                    continue  # A late progress message must not overwrite a final state
+                job.state, job.status, job.progress = state, status, progress
+                self._notify(job)
+        except queue.Empty:
+            pass
+        self._poll_id = self.master.after(REPORT_POLL_INTERVAL_MS, self._poll)
+
+    def _notify(self, job):
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception:
+                print(f"Error in report job listener: {traceback.format_exc()}")
@@ -0,0 +1,494 @@
+import calendar
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from config import get_setting
+from database import Session
+from helpers import log_action
+from report_data import (daily_report_data, iter_chunks, item_movement_totals, daily_summaries_query,
+                         daily_summary_totals, staff_sale_lines_query, staff_sales_totals,
+                         cash_declaration_lines_query, report_data_version, is_range_finalized)
+from report_jobs import ReportCancelled
+from report_cache import report_cache
+from email_outbox import queue_email, email_is_configured
+
+# ReportLab is imported inside the functions that render PDFs (on the report worker threads),
+# so starting the app and opening the reports screen do not load it
+
+# --- Email Settings ---
+# Server, credentials and sender live in the [smtp] config section; see email_outbox.py
+REPORT_RECIPIENT_EMAIL = get_setting('smtp', 'recipient')
+
+# --- Range Report Settings ---
+REPORT_PERIODS = ('Daily', 'Weekly', 'Monthly', 'Custom Range')
+TABLE_ROWS_PER_CHUNK = 40  # Rows per Table flowable: about one page, so no single table holds a year of lines
+FLOWABLE_LOOKAHEAD = 8  # Flowables pulled ahead of the layout engine (enough for keepWithNext headings)
+
+_range_table_style = None
+
+
+def range_table_style():
+    """The TableStyle shared by every range report table, created on first use."""
+    global _range_table_style
+    if _range_table_style is None:
+        from reportlab.platypus import TableStyle
+        from reportlab.lib import colors
+        _range_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+        ])
+    return _range_table_style
+
+
+def build_daily_report(session, report_date_obj, user_id, job=None, report_filename=None):
+    """
+    Queries one day's data and renders it to a PDF (report_filename, or a file in the working directory).
+    Returns the filename.
+    When run as a background job, reports progress and stops at the next checkpoint once cancelled.
+    """
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    report_date_str = report_date_obj.strftime('%Y-%m-%d')
+    data = daily_report_data(session, report_date_obj, user_id)
+    daily_entry = data['daily_entry']
+    staff_sales_for_day = data['staff_sales']
+    cash_register_entries_for_day = data['cash_entries']
+    salary_deductions_for_day = data['salary_deductions']
+    if job:
+        job.check_cancelled()
+        job.report_progress(0.2, "Laying out report")
+
+    report_filename = report_filename or report_file_name(report_date_obj, report_date_obj)
+    doc = SimpleDocTemplate(report_filename, pagesize=letter)
+    styles = getSampleStyleSheet()
+    story = []
+
+    story.append(Paragraph(f"<h2>Bar Audit Daily Report - {report_date_str}</h2>", styles['h2']))
+    story.append(Spacer(1, 0.2 * 10))
+
+    if daily_entry:
+        story.append(Paragraph("<h3>Daily Stock Summary:</h3>", styles['h3']))
+        summary_rows = [['Metric', 'Value']]
+        summary_rows.append(['Expected Sales from Stock Movement', f"₦{daily_entry.total_sales_expected:.2f}"])
+        summary_rows.append(['Declared POS + Cash', f"₦{daily_entry.total_pos_cash_declared:.2f}"])
+        summary_rows.append(['Mismatch Amount', f"₦{daily_entry.mismatch_amount:.2f}"])
+        summary_rows.append(['Deduction Amount', f"₦{daily_entry.deduction_amount:.2f}"])
+
+        table = Table(summary_rows, colWidths=[200, 200])
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.append(table)
+        story.append(Spacer(1, 0.2 * 10))
+
+        item_movements = data['item_movements']
+        if item_movements:
+            story.append(Paragraph("<h3>Inventory Movement:</h3>", styles['h3']))
+            item_data = [
+                ['Item Name', 'Opening Stock', 'Closing Stock', 'Qty Sold', 'Price/Unit', 'Total Sales']]
+            for movement in item_movements:
+                item_data.append([
+                    movement.item_name,
+                    movement.opening_stock,
+                    movement.closing_stock,
+                    movement.quantity_sold,
+                    f"₦{movement.price_per_unit:.2f}",
+                    f"₦{movement.total_sales:.2f}"
+                ])
+            item_table = Table(item_data, colWidths=[100, 80, 80, 60, 60, 80])
+            item_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+                ('GRID', (0, 0), (-1, -1), 1, colors.black)
+            ]))
+            story.append(item_table)
+            story.append(Spacer(1, 0.2 * 10))
+    else:
+        story.append(Paragraph(f"No Daily Stock Entry found for {report_date_str}.", styles['Normal']))
+        story.append(Spacer(1, 0.2 * 10))
+
+    if staff_sales_for_day:
+        story.append(Paragraph("<h3>Staff Sales Entries:</h3>", styles['h3']))
+        sales_data = [['Staff', 'Item', 'Quantity', 'Price/Unit', 'Total Cost']]
+        for sale, staff_name in staff_sales_for_day:
+            sales_data.append([
+                staff_name,
+                sale.item_name,
+                sale.quantity,
+                f"₦{sale.price_per_unit:.2f}",
+                f"₦{sale.total_cost:.2f}"
+            ])
+        sales_table = Table(sales_data, colWidths=[100, 100, 60, 80, 80])
+        sales_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.append(sales_table)
+        story.append(Spacer(1, 0.2 * 10))
+    else:
+        story.append(Paragraph(f"No Staff Sales Entries found for {report_date_str}.", styles['Normal']))
+        story.append(Spacer(1, 0.2 * 10))
+
+    if cash_register_entries_for_day:
+        story.append(Paragraph("<h3>Cash Register Declarations:</h3>", styles['h3']))
+        cash_data = [['User', 'Declared Cash', 'Declared POS', 'System Total', 'Mismatch', 'Deduction']]
+        for entry, user_name in cash_register_entries_for_day:
+            cash_data.append([
+                user_name,
+                f"₦{entry.declared_cash:.2f}",
+                f"₦{entry.declared_pos:.2f}",
+                f"₦{entry.system_total_sales:.2f}",
+                f"₦{entry.mismatch_amount:.2f}",
+                f"₦{entry.deduction_amount:.2f}"
+            ])
+        cash_table = Table(cash_data, colWidths=[80, 80, 80, 80, 80, 80])
+        cash_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.append(cash_table)
+        story.append(Spacer(1, 0.2 * 10))
+    else:
+        story.append(Paragraph(f"No Cash Register Declarations found for {report_date_str}.", styles['Normal']))
+        story.append(Spacer(1, 0.2 * 10))
+
+    if salary_deductions_for_day:
+        story.append(Paragraph("<h3>Salary Deductions (for Manager):</h3>", styles['h3']))
+        deduction_data = [['Date', 'Amount', 'Reason']]
+        for ded in salary_deductions_for_day:
+            deduction_data.append([
+                ded.deduction_date.strftime('%Y-%m-%d'),
+                f"₦{ded.amount:.2f}",
+                ded.reason
+            ])
+        deduction_table = Table(deduction_data, colWidths=[80, 80, 200])
+        deduction_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        story.append(deduction_table)
+        story.append(Spacer(1, 0.2 * 10))
+    else:
+        story.append(Paragraph(f"No Salary Deductions for you on {report_date_str}.", styles['Normal']))
+        story.append(Spacer(1, 0.2 * 10))
+
+
+    render_story(doc, story, job, start=0.3, end=0.8)
+    return report_filename
+
+
+def report_file_name(start_date, end_date):
+    if start_date == end_date:
+        return f"Bar_Audit_Report_{start_date.strftime('%Y-%m-%d')}.pdf"
+    return f"Bar_Audit_Report_{start_date.strftime('%Y-%m-%d')}_to_{end_date.strftime('%Y-%m-%d')}.pdf"
+
+
+def report_period(period, anchor_date, end_date=None):
+    """
+    Returns the inclusive (start, end) dates for a period in REPORT_PERIODS: weeks run Monday to Sunday,
+    months are calendar months containing anchor_date, and 'Custom Range' runs from anchor_date to end_date.
+    """
+    if period == 'Daily':
+        return anchor_date, anchor_date
+    if period == 'Weekly':
+        start = anchor_date - timedelta(days=anchor_date.weekday())
+        return start, start + timedelta(days=6)
+    if period == 'Monthly':
+        last_day = calendar.monthrange(anchor_date.year, anchor_date.month)[1]
+        return anchor_date.replace(day=1), anchor_date.replace(day=last_day)
+    if period == 'Custom Range':
+        if end_date is None or end_date < anchor_date:
+            raise ValueError("The end date must be on or after the start date.")
+        return anchor_date, end_date
+    raise ValueError(f"Unknown report period '{period}'.")
+
+
+class FlowableStream(list):
+    """
+    A story that pulls flowables from an iterator as the layout engine consumes them.
+    doc.build() only ever looks at the front of the story, so keeping a few flowables buffered is
+    enough, and tables for a year of data are created, drawn and released one chunk at a time.
+    """
+
+    def __init__(self, flowables, lookahead=FLOWABLE_LOOKAHEAD):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+
+    def __len__(self):
+        # build() checks len() before taking each flowable, which is when the buffer is topped up
+        while list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                break
+        return list.__len__(self)
+
+
+def chunked_tables(header, row_chunks, col_widths):
+    """Yields page-sized Tables (header repeated on each) for the rows produced by row_chunks."""
+    from reportlab.platypus import Table
+    style = range_table_style()
+    pending = []
+    for chunk in row_chunks:
+        pending.extend(chunk)
+        while len(pending) >= TABLE_ROWS_PER_CHUNK:
+            yield Table([header] + pending[:TABLE_ROWS_PER_CHUNK], colWidths=col_widths, repeatRows=1,
+                        style=style)
+            del pending[:TABLE_ROWS_PER_CHUNK]
+    if pending:
+        yield Table([header] + pending, colWidths=col_widths, repeatRows=1, style=style)
+
+
+def _formatted_chunks(query, format_row):
+    for chunk in iter_chunks(query):
+        yield [format_row(row) for row in chunk]
+
+
+def range_report_story(session, start_date, end_date, job=None):
+    """
+    Generates the flowables of a range report section by section. Summary tables come from GROUP BY
+    queries; the per-day and per-line tables stream from the database in REPORT_CHUNK_SIZE batches.
+    """
+    from reportlab.platypus import Paragraph, Spacer, Table
+    from reportlab.lib.styles import getSampleStyleSheet
+    styles = getSampleStyleSheet()
+    period_str = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+    sections = 5
+
+    def section(index, status):
+        if job:
+            job.check_cancelled()
+            job.report_progress(0.05 + 0.8 * index / sections, status)
+
+    yield Paragraph(f"<h2>Bar Audit Report - {period_str}</h2>", styles['h2'])
+    yield Spacer(1, 0.2 * 10)
+
+    section(0, "Daily stock summaries")
+    days, expected, declared, mismatch, deduction = daily_summary_totals(session, start_date, end_date)
+    yield Paragraph("<h3>Daily Stock Summaries:</h3>", styles['h3'])
+    if days:
+        yield Table([['Days Recorded', 'Expected Sales', 'Declared POS + Cash', 'Mismatch', 'Deductions'],
+                     [days, f"₦{expected:.2f}", f"₦{declared:.2f}", f"₦{mismatch:.2f}", f"₦{deduction:.2f}"]],
+                    colWidths=[80, 100, 110, 90, 90], style=range_table_style())
+        yield Spacer(1, 0.2 * 10)
+        yield from chunked_tables(
+            ['Date', 'Expected Sales', 'Declared POS + Cash', 'Mismatch', 'Deduction'],
+            _formatted_chunks(daily_summaries_query(session, start_date, end_date), lambda r: [
+                r.entry_date.strftime('%Y-%m-%d'), f"₦{r[1]:.2f}", f"₦{r[2]:.2f}", f"₦{r[3]:.2f}", f"₦{r[4]:.2f}"]),
+            [80, 100, 110, 90, 90])
+    else:
+        yield Paragraph(f"No Daily Stock Entries found for {period_str}.", styles['Normal'])
+    yield Spacer(1, 0.2 * 10)
+
+    section(1, "Inventory movement")
+    movement_totals = item_movement_totals(session, start_date, end_date)
+    yield Paragraph("<h3>Inventory Movement:</h3>", styles['h3'])
+    if movement_totals:
+        yield from chunked_tables(
+            ['Item Name', 'Supplied', 'Qty Sold', 'Total Sales', 'Days Recorded'],
+            [[[item_name, supply_qty, quantity_sold, f"₦{total_sales:.2f}", days_recorded]
+              for item_name, quantity_sold, total_sales, supply_qty, days_recorded in movement_totals]],
+            [130, 70, 70, 100, 80])
+    else:
+        yield Paragraph(f"No Inventory Movement recorded for {period_str}.", styles['Normal'])
+    yield Spacer(1, 0.2 * 10)
+
+    section(2, "Staff sales")
+    sales_totals = staff_sales_totals(session, start_date, end_date)
+    yield Paragraph("<h3>Staff Sales:</h3>", styles['h3'])
+    if sales_totals:
+        yield from chunked_tables(
+            ['Staff', 'Sale Lines', 'Quantity', 'Total Cost'],
+            [[[username, lines, quantity, f"₦{total_cost:.2f}"] for username, lines, quantity, total_cost in sales_totals]],
+            [120, 80, 80, 100])
+        yield Spacer(1, 0.2 * 10)
+        section(3, "Staff sale lines")
+        yield Paragraph("<h3>Staff Sales Entries:</h3>", styles['h3'])
+        yield from chunked_tables(
+            ['Date', 'Staff', 'Item', 'Quantity', 'Price/Unit', 'Total Cost'],
+            _formatted_chunks(staff_sale_lines_query(session, start_date, end_date), lambda r: [
+                r.entry_date.strftime('%Y-%m-%d'), r.username, r.item_name, r.quantity,
+                f"₦{r.price_per_unit:.2f}", f"₦{r.total_cost:.2f}"]),
+            [70, 90, 100, 60, 70, 80])
+    else:
+        yield Paragraph(f"No Staff Sales Entries found for {period_str}.", styles['Normal'])
+    yield Spacer(1, 0.2 * 10)
+
+    section(4, "Cash register declarations")
+    yield Paragraph("<h3>Cash Register Declarations:</h3>", styles['h3'])
+    has_declarations = False
+    for table in chunked_tables(
+            ['Date', 'User', 'Declared Cash', 'Declared POS', 'System Total', 'Mismatch', 'Deduction'],
+            _formatted_chunks(cash_declaration_lines_query(session, start_date, end_date), lambda r: [
+                r.entry_date.strftime('%Y-%m-%d'), r.username, f"₦{r.declared_cash:.2f}", f"₦{r.declared_pos:.2f}",
+                f"₦{r.system_total_sales:.2f}", f"₦{r.mismatch_amount:.2f}", f"₦{r.deduction_amount:.2f}"]),
+            [65, 75, 75, 75, 75, 70, 70]):
+        has_declarations = True
+        yield table
+    if not has_declarations:
+        yield Paragraph(f"No Cash Register Declarations found for {period_str}.", styles['Normal'])
+    section(5, "Finishing PDF")
+
+
+def build_range_report(session, start_date, end_date, job=None, report_filename=None):
+    """Streams a multi-day report for an inclusive date range into a PDF. Returns the filename."""
+    from reportlab.platypus import SimpleDocTemplate
+    from reportlab.lib.pagesizes import letter
+    report_filename = report_filename or report_file_name(start_date, end_date)
+    doc = SimpleDocTemplate(report_filename, pagesize=letter, pageCompression=1)
+    render_story(doc, FlowableStream(range_report_story(session, start_date, end_date, job)), job)
+    return report_filename
+
+
+def render_story(doc, story, job=None, start=0.0, end=1.0):
+    """
+    Builds the PDF, checking for cancellation after every flowable. For a plain list, progress is
+    reported from start to end as flowables are drawn; a FlowableStream reports its own progress.
+    """
+    if job is None:
+        doc.build(story)
+        return
+
+    streaming = isinstance(story, FlowableStream)
+    total = 1 if streaming else max(len(story), 1)
+    rendered = [0]
+
+    def after_flowable(flowable):
+        rendered[0] += 1
+        job.check_cancelled()
+        if not streaming:
+            job.report_progress(start + (end - start) * min(rendered[0] / total, 1.0), "Rendering PDF")
+
+    doc.afterFlowable = after_flowable
+    if not streaming:
+        job.report_progress(start, "Rendering PDF")
+    try:
+        doc.build(story)
+    except ReportCancelled:
+        if os.path.exists(doc.filename):
+            os.remove(doc.filename)
+        raise
+
+
+def run_daily_report_job(job, report_date_obj, user_id, username, user_role):
+    """Background job behind "Generate & Email Report" for a single day."""
+    report_date_str = report_date_obj.strftime('%Y-%m-%d')
+    # The daily report lists the requesting user's own deductions, so its cache entry is per user
+    return _run_report_job(
+        job, lambda session, report_filename: build_daily_report(session, report_date_obj, user_id, job,
+                                                                 report_filename),
+        ('daily', report_date_obj, report_date_obj, user_id),
+        f"Bar Audit Daily Report - {report_date_str}", f"the daily bar audit report for {report_date_str}",
+        username, user_role)
+
+
+def run_range_report_job(job, start_date, end_date, username, user_role):
+    """Background job behind "Generate & Email Report" for weekly, monthly and custom ranges."""
+    period_str = f"{start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}"
+    return _run_report_job(
+        job, lambda session, report_filename: build_range_report(session, start_date, end_date, job,
+                                                                 report_filename),
+        ('range', start_date, end_date, None),
+        f"Bar Audit Report - {period_str}", f"the bar audit report for {period_str}", username, user_role)
+
+
+def _build_or_fetch_cached(session, job, build, cache_request, report_filename):
+    """
+    Writes the report to report_filename and returns (report_filename, from_cache). Reports of finalized
+    ranges are copied from the report cache while their data version is unchanged, and stored there after
+    rendering otherwise.
+    """
+    report_type, start_date, end_date, user_id = cache_request
+    cache_name = None
+    if report_cache.enabled and is_range_finalized(session, start_date, end_date):
+        data_version = report_data_version(session, start_date, end_date)
+        cache_name = report_cache.entry_name(report_type, start_date, end_date, data_version, user_id)
+        if report_cache.fetch(cache_name, report_filename):
+            job.report_progress(0.8, "Using cached report")
+            return report_filename, True
+
+    report_filename = build(session, report_filename)
+    # Only cache if nothing changed while rendering, or the entry could hold newer data than its version
+    if cache_name and report_data_version(session, start_date, end_date) == data_version:
+        try:
+            report_cache.store(cache_name, report_filename)
+        except OSError as e:
+            print(f"Could not cache report {report_filename}: {e}")
+    return report_filename, False
+
+
+def _run_report_job(job, build, cache_request, subject, description, username, user_role):
+    """
+    Renders a PDF with build(session, report_filename) on its own database session (or takes it from the
+    report cache), queues it in the email outbox, then deletes the local file. Returns the final status message.
+    Each job renders into its own temporary directory, so two jobs for the same range cannot share a file.
+    """
+    session = Session()  # db_session belongs to the Tk thread
+    report_dir = tempfile.mkdtemp(prefix='bar_audit_report_')
+    _, start_date, end_date, _ = cache_request
+    report_filename = os.path.join(report_dir, report_file_name(start_date, end_date))
+    report_name = os.path.basename(report_filename)
+    try:
+        job.report_progress(0.0, "Querying data")
+        try:
+            report_filename, from_cache = _build_or_fetch_cached(session, job, build, cache_request,
+                                                                 report_filename)
+        except ReportCancelled:
+            raise
+        except Exception as e:
+            log_action(username, user_role, 'Report Generation Failed', new_value=f"Error:{e}")
+            raise
+        log_action(username, user_role, 'Generated Report',
+                   new_value=f"{report_name} (cached)" if from_cache else report_name)
+
+        if not email_is_configured():
+            return "Report generated, but email sending is not configured. Set a sender in the [smtp] config section."
+
+        job.check_cancelled()
+        job.report_progress(0.9, "Adding report to the email outbox")
+        session.rollback()  # Ends the read transaction, which would otherwise hold up the outbox write
+        # The outbox keeps a copy of the PDF and retries until the internet is back, even across restarts
+        queue_email(REPORT_RECIPIENT_EMAIL, subject,
+                    f"Dear recipient,\n\nPlease find attached {description}.\n\nRegards,\nYour Bar Audit System",
+                    report_filename, requested_by=username, requested_role=user_role)
+        log_action(username, user_role, 'Queued Report Email', new_value=report_name)
+        return f"Report queued for emailing to {REPORT_RECIPIENT_EMAIL}"
+    finally:
+        session.close()
+        shutil.rmtree(report_dir, ignore_errors=True)
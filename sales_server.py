@@ -0,0 +1,469 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import secrets
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from http import HTTPStatus
+
+from config import get_setting, get_int_setting, get_bool_setting
+from database import Session, run_in_session
+from models import User, InventoryItem, IdempotencyKey
+from helpers import log_action
+from auth import authenticate, login_throttle
+from services import ServiceError, sales, cash
+
+# --- Sales Server Settings ---
+# Optional HTTP/JSON service for waiters' phones and tablets on the bar's LAN, so they can record sales,
+# submit them and declare cash at the same time instead of queueing at the till. It is plain HTTP:
+# only enable it on a network you trust. Settings come from the [server] config section.
+SERVER_ENABLED = get_bool_setting('server', 'enabled', False)
+SERVER_HOST = get_setting('server', 'host', '0.0.0.0')
+SERVER_PORT = get_int_setting('server', 'port', 8765)
+BATCH_SIZE = get_int_setting('server', 'batch_size', 200)  # Most sales written in one transaction
+TOKEN_IDLE_SECONDS = get_int_setting('server', 'token_idle_minutes', 720) * 60  # Sign-ins expire when unused
+IDEMPOTENCY_RETENTION_DAYS = get_int_setting('server', 'idempotency_retention_days', 7)
+HANDHELD_ROLES = ('Staff',)  # The handheld endpoints are the waiter screen's
+QUEUE_MAX_SIZE = 10000  # Requests waiting for the writer before new ones wait for room
+MAX_BODY_BYTES = 16 * 1024
+MAX_KEY_LENGTH = 100
+IDLE_CONNECTION_SECONDS = 60  # Keep-alive connections without a request are closed after this
+PRUNE_INTERVAL_SECONDS = 24 * 3600
+
+
+class HttpError(Exception):
+    """Answers the request with status and {"error": message}."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _SignIn:
+    __slots__ = ('user_id', 'username', 'role', 'last_used')
+
+    def __init__(self, user_id, username, role):
+        self.user_id, self.username, self.role = user_id, username, role
+        self.last_used = time.monotonic()
+
+
+class _WriteRequest:
+    """A sale, submission or cash declaration waiting for the writer thread."""
+    __slots__ = ('kind', 'user_id', 'key', 'request_hash', 'payload', 'future')
+
+    def __init__(self, kind, user_id, key, request_hash, payload, future):
+        self.kind, self.user_id, self.key, self.request_hash = kind, user_id, key, request_hash
+        self.payload, self.future = payload, future
+
+
+def _replay(session, request):
+    """The stored (status, body, replayed) for a request whose Idempotency-Key was already used, else None."""
+    if request.key is None:
+        return None
+    record = session.query(IdempotencyKey).filter_by(user_id=request.user_id, key=request.key).first()
+    if record is None:
+        return None
+    if record.request_hash != request.request_hash:
+        return 422, {'error': "This Idempotency-Key was already used for a different request."}, False
+    if record.response is None:
+        return 200, {'message': "Already processed."}, True
+    status, body = json.loads(record.response)
+    return status, body, True
+
+
+def _remember(session, request, status=None, body=None):
+    """Stores the response under the request's Idempotency-Key, in the caller's transaction."""
+    if request.key is None:
+        return None
+    record = IdempotencyKey(user_id=request.user_id, key=request.key, request_hash=request.request_hash,
+                            response=json.dumps([status, body]) if status else None)
+    session.add(record)
+    return record
+
+
+def prune_idempotency_keys(retention_days=IDEMPOTENCY_RETENTION_DAYS):
+    """Deletes idempotency keys older than retention_days; no handheld retries a request that late."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    return run_in_session(lambda session: session.query(IdempotencyKey).filter(
+        IdempotencyKey.created_at < cutoff).delete(synchronize_session=False))
+
+
+def _runs(batch):
+    """Splits a batch, in order, into runs of consecutive sales and single other requests."""
+    sales_run = []
+    for request in batch:
+        if request.kind == 'sale':
+            sales_run.append(request)
+            continue
+        if sales_run:
+            yield sales_run
+            sales_run = []
+        yield [request]
+    if sales_run:
+        yield sales_run
+
+
+class SalesServer:
+    """
+    Serves the handheld API over HTTP/1.1 with keep-alive, on asyncio. Requests that write are queued
+    for a single writer thread: each pass takes everything queued so far (up to batch_size) and writes
+    the consecutive sales in one transaction, so a busy night costs one commit per batch instead of one
+    per sale. Submissions and cash declarations are written one by one, in the order they arrived.
+
+    Endpoints (JSON bodies; all but /api/login and /api/health need "Authorization: Bearer <token>"):
+      POST /api/login          {"username", "password"} -> {"token", "username", "role"}
+      GET  /api/items          -> {"items": [{"name", "price_per_unit"}]}
+      POST /api/sales          {"item", "quantity"} -> 201 {"sale_id", "item", "quantity", "total_cost"}
+      POST /api/sales/submit   -> {"submitted"}
+      POST /api/cash           {"declared_cash", "declared_pos"} -> {"system_total_sales", "mismatch", "deduction"}
+      GET  /api/health         -> {"status", "queued"}
+    Send an Idempotency-Key header with POSTs to /api/sales, /api/sales/submit and /api/cash: a retry with
+    the same key gets the first response again (with "Idempotent-Replayed: true") instead of a second write.
+    """
+
+    ROUTES = {
+        '/api/login': ('POST', '_login'),
+        '/api/items': ('GET', '_items'),
+        '/api/sales': ('POST', '_record_sale'),
+        '/api/sales/submit': ('POST', '_submit_sales'),
+        '/api/cash': ('POST', '_declare_cash'),
+        '/api/health': ('GET', '_health'),
+    }
+
+    def __init__(self, host=SERVER_HOST, port=SERVER_PORT, batch_size=BATCH_SIZE):
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self._sign_ins = {}  # token -> _SignIn; kept in memory, so handhelds sign in again after a restart
+        self._pending = {}  # (user id, Idempotency-Key) -> _WriteRequest queued or being written
+        self._queue = None
+        # One writer thread: SQLite takes one write at a time anyway, and batches keep their arrival order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SalesServerWriter")
+        self._readers = ThreadPoolExecutor(max_workers=4, thread_name_prefix="SalesServerReader")
+
+    async def serve(self):
+        """Runs the server until cancelled."""
+        self._queue = asyncio.Queue(QUEUE_MAX_SIZE)
+        tasks = [asyncio.create_task(self._write_loop()), asyncio.create_task(self._prune_loop())]
+        server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"Sales server listening on http://{self.host}:{self.port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # --- HTTP ---
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), IDLE_CONNECTION_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = len(parts) == 3 and parts[2] == 'HTTP/1.1' and \
+                    headers.get('connection', '').lower() != 'close'
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if len(parts) != 3 or not 0 <= length <= MAX_BODY_BYTES:
+                    writer.write(_response(400 if length <= MAX_BODY_BYTES else 413,
+                                           {'error': "Malformed or oversized request."}, False))
+                    break
+                body = await reader.readexactly(length) if length else b''
+                status, payload, replayed = await self._dispatch(parts[0], parts[1], headers, body)
+                writer.write(_response(status, payload, keep_alive, replayed))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # The handheld went away; any queued write still completes and can be replayed
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, target, headers, body):
+        path = target.split('?', 1)[0]
+        try:
+            route = self.ROUTES.get(path)
+            if route is None:
+                raise HttpError(404, "Not found.")
+            if method != route[0]:
+                raise HttpError(405, f"Use {route[0]} for {path}.")
+            data = {}
+            if method == 'POST' and body:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise HttpError(400, "The body must be JSON.")
+                if not isinstance(data, dict):
+                    raise HttpError(400, "The body must be a JSON object.")
+            return await getattr(self, route[1])(headers, data, method, path, body)
+        except HttpError as e:
+            return e.status, {'error': str(e)}, False
+        except Exception:
+            print(f"Error handling handheld request {method} {path}: {traceback.format_exc()}")
+            return 500, {'error': "Internal error."}, False
+
+    def _signed_in(self, headers):
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        sign_in = self._sign_ins.get(token) if scheme.lower() == 'bearer' else None
+        if sign_in is None:
+            raise HttpError(401, "Please sign in.")
+        now = time.monotonic()
+        if now - sign_in.last_used > TOKEN_IDLE_SECONDS:
+            del self._sign_ins[token]
+            raise HttpError(401, "Your sign-in has expired. Please sign in again.")
+        sign_in.last_used = now
+        return sign_in
+
+    # --- Endpoints ---
+
+    async def _login(self, headers, data, *_):
+        username, password = data.get('username'), data.get('password')
+        if not isinstance(username, str) or not isinstance(password, str) or not username or not password:
+            raise HttpError(400, "Username and password are required.")
+        seconds_locked = login_throttle.seconds_locked(username)
+        if seconds_locked:
+            raise HttpError(429, f"Too many failed sign-ins. Try again in {math.ceil(seconds_locked)} seconds.")
+        user = await asyncio.get_running_loop().run_in_executor(self._readers, _sign_in, username, password)
+        if user is None:
+            login_throttle.record_failure(username)
+            log_action(username, "Unknown", 'Login Failed', new_value="Handheld")
+            raise HttpError(401, "Invalid username or password.")
+        login_throttle.record_success(username)
+        if user.role not in HANDHELD_ROLES:
+            raise HttpError(403, "Handhelds are for waiters' accounts only.")
+        token = secrets.token_urlsafe(32)
+        self._sign_ins[token] = user
+        log_action(user.username, user.role, 'User Login', new_value="Handheld")
+        return 200, {'token': token, 'username': user.username, 'role': user.role}, False
+
+    async def _items(self, headers, *_):
+        self._signed_in(headers)
+        items = await asyncio.get_running_loop().run_in_executor(self._readers, _item_list)
+        return 200, {'items': items}, False
+
+    async def _health(self, *_):
+        return 200, {'status': 'ok', 'queued': self._queue.qsize()}, False
+
+    async def _record_sale(self, headers, data, method, path, body):
+        item, quantity = data.get('item'), data.get('quantity')
+        if not isinstance(item, str) or not item:
+            raise HttpError(400, "item must be an item name.")
+        if not isinstance(quantity, int) or isinstance(quantity, bool):
+            raise HttpError(400, "quantity must be a whole number.")
+        return await self._write('sale', headers, {'item': item, 'quantity': quantity}, method, path, body)
+
+    async def _submit_sales(self, headers, data, method, path, body):
+        return await self._write('submit', headers, {}, method, path, body)
+
+    async def _declare_cash(self, headers, data, method, path, body):
+        payload = {}
+        for name in ('declared_cash', 'declared_pos'):
+            value = data.get(name)
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise HttpError(400, f"{name} must be a number.")
+            payload[name] = float(value)
+        return await self._write('cash', headers, payload, method, path, body)
+
+    async def _write(self, kind, headers, payload, method, path, body):
+        """Queues a write for the writer thread and waits for its (status, body, replayed)."""
+        sign_in = self._signed_in(headers)
+        key = headers.get('idempotency-key') or None
+        if key is not None and len(key) > MAX_KEY_LENGTH:
+            raise HttpError(400, f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters.")
+        request_hash = hashlib.sha256(f"{method} {path}\n".encode('utf-8') + body).hexdigest()
+        if key is not None:
+            pending = self._pending.get((sign_in.user_id, key))
+            if pending is not None:  # A retry of a request that is still queued: share its outcome
+                if pending.request_hash != request_hash:
+                    raise HttpError(422, "This Idempotency-Key was already used for a different request.")
+                status, result, _ = await asyncio.shield(pending.future)
+                return status, result, True
+        future = asyncio.get_running_loop().create_future()
+        request = _WriteRequest(kind, sign_in.user_id, key, request_hash, payload, future)
+        if key is not None:
+            # Forgotten only once written, so a retry can never be queued next to the original
+            self._pending[(sign_in.user_id, key)] = request
+            future.add_done_callback(lambda _: self._pending.pop((sign_in.user_id, key), None))
+        await self._queue.put(request)
+        return await asyncio.shield(future)  # A dropped connection must not cancel the write
+
+    # --- Writer ---
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for run in _runs(batch):
+                write = self._write_sales if run[0].kind == 'sale' else self._write_one
+                try:
+                    results = await loop.run_in_executor(self._writer, write, run)
+                except Exception:
+                    print(f"Error writing handheld requests: {traceback.format_exc()}")
+                    results = [(503, {'error': "The database is unavailable. Please retry."}, False)] * len(run)
+                for request, result in zip(run, results):
+                    if not request.future.done():
+                        request.future.set_result(result)
+
+    def _write_sales(self, requests):
+        """Records a run of sales in one transaction. Returns (status, body, replayed) per request."""
+        logged = []
+
+        def unit(session):
+            logged.clear()  # A retried unit starts over
+            results, added, actors = [], [], {}
+            for request in requests:
+                replay = _replay(session, request)
+                if replay is not None:
+                    results.append(replay)
+                    continue
+                if request.user_id not in actors:
+                    actors[request.user_id] = session.get(User, request.user_id)
+                actor = actors[request.user_id]
+                try:
+                    if actor is None or not actor.is_active:
+                        raise ServiceError("This account no longer exists or is inactive.")
+                    sale = sales.add_sale(session, actor, request.payload['item'], request.payload['quantity'])
+                except ServiceError as e:
+                    results.append((422, {'error': str(e)}, False))
+                    continue
+                added.append((len(results), request, actor, sale))
+                results.append(None)
+            session.flush()  # Assigns the sale ids
+            for index, request, actor, sale in added:
+                body = {'sale_id': sale.id, 'item': sale.item_name, 'quantity': sale.quantity,
+                        'total_cost': sale.total_cost}
+                _remember(session, request, 201, body)
+                results[index] = (201, body, False)
+                logged.append((actor.username, actor.role, f"{sale.item_name} x {sale.quantity}"))
+            return results
+
+        results = run_in_session(unit)
+        for username, role, sale in logged:
+            log_action(username, role, 'Staff Add Sale', new_value=sale)
+        return results
+
+    def _write_one(self, requests):
+        """Writes a sale submission or cash declaration through its service. Returns [(status, body, replayed)]."""
+        request, = requests
+
+        def unit(session):
+            replay = _replay(session, request)
+            if replay is not None:
+                return replay
+            actor = session.get(User, request.user_id)
+            if actor is None or not actor.is_active:
+                raise ServiceError("This account no longer exists or is inactive.")
+            # Added first, so the service's own commit stores the key together with its change
+            record = _remember(session, request)
+            if request.kind == 'submit':
+                status, body = 200, {'submitted': sales.submit_sales(session, actor)}
+            else:
+                entry = cash.declare_staff_cash(session, actor, request.payload['declared_cash'],
+                                                request.payload['declared_pos'])
+                status, body = 200, {'system_total_sales': entry.system_total_sales,
+                                     'mismatch': entry.mismatch_amount or 0.0,
+                                     'deduction': entry.deduction_amount or 0.0}
+            if record is not None:
+                record.response = json.dumps([status, body])
+            return status, body, False
+
+        try:
+            return [run_in_session(unit)]
+        except ServiceError as e:
+            return [(422, {'error': str(e)}, False)]
+
+    async def _prune_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await loop.run_in_executor(self._writer, prune_idempotency_keys)
+            except Exception:
+                print(f"Error pruning idempotency keys: {traceback.format_exc()}")
+            await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+
+
+def _sign_in(username, password):
+    """Checks the password (slow by design, so off the event loop). Returns a _SignIn or None."""
+    user_id = authenticate(username, password)
+    if user_id is None:
+        return None
+    session = Session()
+    try:
+        user = session.get(User, user_id)
+        return _SignIn(user.id, user.username, user.role)
+    finally:
+        session.close()
+
+
+def _item_list():
+    session = Session()
+    try:
+        return [{'name': name, 'price_per_unit': price} for name, price in
+                session.query(InventoryItem.name, InventoryItem.price_per_unit).order_by(InventoryItem.name)]
+    finally:
+        session.close()
+
+
+def _response(status, body, keep_alive, replayed=False):
+    data = json.dumps(body).encode('utf-8')
+    head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", "Content-Type: application/json",
+            f"Content-Length: {len(data)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if replayed:
+        head.append("Idempotent-Replayed: true")
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data
+
+
+def start_background_server():
+    """Runs the sales server on a daemon thread with its own event loop, if [server] enabled is set."""
+    if not SERVER_ENABLED:
+        return None
+
+    def run():
+        try:
+            asyncio.run(SalesServer().serve())
+        except Exception:
+            print(f"Error running the sales server: {traceback.format_exc()}")
+
+    thread = threading.Thread(target=run, name="SalesServer", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    from database import Base, engine
+    from migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Serve the handheld sales API on the LAN (see SalesServer).")
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    try:
+        asyncio.run(SalesServer(args.host, args.port, args.batch_size).serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,38 @@
+# Headless business operations used by the views, scripts and benchmarks.
+# Every operation takes a SQLAlchemy session and the acting User, validates its input, commits one
+# transaction and writes the audit log. Rule violations raise ServiceError with a message for the user.
+# Balances and stock quantities change through increment() (x = x + :delta in SQL), so changes made by
+# several terminals at once add up. Other edits go through the ORM, which checks the row's version column.
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+
+
+class ServiceError(ValueError):
+    """An operation was refused; the message explains why and can be shown as is."""
+
+
+def to_number(value, message, cast=float):
+    """Returns value converted with cast (float or int), or raises ServiceError(message) if it is not a number."""
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        raise ServiceError(message) from None
+
+
+def increment(session, obj, **deltas):
+    """
+    Adds each delta to the named column of obj's row in one UPDATE and bumps its version, without
+    reading the row first. obj is then given the new values as committed state.
+    Returns the old values, as a dict of column name to value.
+    """
+    model = type(obj)
+    values = {name: getattr(model, name) + delta for name, delta in deltas.items()}
+    session.execute(update(model).where(model.id == obj.id).values(version=model.version + 1, **values),
+                    execution_options={'synchronize_session': False})
+    row = session.query(model.version, *(getattr(model, name) for name in deltas)).filter(model.id == obj.id).one()
+    old_values = {}
+    for name, delta in deltas.items():
+        set_committed_value(obj, name, getattr(row, name))
+        old_values[name] = getattr(row, name) - delta
+    set_committed_value(obj, 'version', row.version)
+    return old_values
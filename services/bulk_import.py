@@ -0,0 +1,281 @@
+import argparse
+import csv
+import os
+from datetime import datetime
+
+from sqlalchemy import insert, update, bindparam
+from database import Session, run_in_session
+from models import User, InventoryItem, StaffSaleEntry
+from helpers import log_action
+from services import ServiceError
+
+# --- Bulk Import Settings ---
+IMPORT_BATCH_SIZE = 5000  # Valid rows written per transaction
+TRUE_VALUES = ('1', 'yes', 'y', 'true')
+FALSE_VALUES = ('0', 'no', 'n', 'false')
+
+
+class ImportResult:
+    """What an import did: rows written, rows rejected and where the rejected rows were written."""
+
+    def __init__(self, kind, path):
+        self.kind = kind
+        self.path = path
+        self.imported = 0
+        self.rejected = 0
+        self.error_report = None  # Path of the error report, only created once a row is rejected
+
+    def summary(self):
+        text = f"Imported {self.imported} {IMPORT_KINDS[self.kind].label}, {self.rejected} row(s) rejected."
+        if self.error_report:
+            text += f" Rejected rows are listed in {self.error_report}."
+        return text
+
+
+def _int(value, column, minimum):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ServiceError(f"{column} must be a whole number.")
+    if number < minimum:
+        raise ServiceError(f"{column} must be at least {minimum}.")
+    return number
+
+
+def _price(value, column='price_per_unit'):
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        raise ServiceError(f"{column} must be a number.")
+    if price < 0:
+        raise ServiceError(f"{column} cannot be negative.")
+    return price
+
+
+class _InventoryImport:
+    """New catalog items: name, price_per_unit and an optional initial_supply_qty."""
+    label = "inventory item(s)"
+    required = ('name', 'price_per_unit')
+    optional = ('initial_supply_qty',)
+
+    def __init__(self, session):
+        self.names = {name for name, in session.query(InventoryItem.name)}
+
+    def parse(self, row):
+        name = (row.get('name') or '').strip()
+        if not name:
+            raise ServiceError("Item Name cannot be empty.")
+        if name in self.names:
+            raise ServiceError(f"Item '{name}' already exists.")
+        price = _price(row.get('price_per_unit'))
+        supply_qty = _int(row.get('initial_supply_qty') or 0, 'initial_supply_qty', 0)
+        self.names.add(name)
+        return {'name': name, 'price_per_unit': price, 'supply_qty': supply_qty,
+                'opening_stock': supply_qty, 'closing_stock': supply_qty}
+
+    def write(self, session, rows):
+        session.execute(insert(InventoryItem), rows)  # Bulk INSERT that still applies the model's defaults
+
+
+class _SupplyImport:
+    """Deliveries for existing items: item and quantity. Several rows for one item add up."""
+    label = "supply delivery row(s)"
+    required = ('item', 'quantity')
+    optional = ()
+
+    def __init__(self, session):
+        self.item_ids = dict(session.query(InventoryItem.name, InventoryItem.id))
+
+    def parse(self, row):
+        name = (row.get('item') or '').strip()
+        if name not in self.item_ids:
+            raise ServiceError(f"Item '{name}' not found in inventory.")
+        return {'item_id': self.item_ids[name], 'quantity': _int(row.get('quantity'), 'quantity', 1)}
+
+    def write(self, session, rows):
+        totals = {}
+        for row in rows:
+            totals[row['item_id']] = totals.get(row['item_id'], 0) + row['quantity']
+        # Same effect as supply_item for each delivery, as one executemany UPDATE per batch
+        table = InventoryItem.__table__
+        session.execute(
+            update(table).where(table.c.id == bindparam('b_id')).values(
+                supply_qty=table.c.supply_qty + bindparam('b_qty'),
+                opening_stock=table.c.opening_stock + bindparam('b_qty'),
+                closing_stock=table.c.closing_stock + bindparam('b_qty'),
+                version=table.c.version + 1),
+            [{'b_id': item_id, 'b_qty': quantity} for item_id, quantity in totals.items()])
+
+
+class _SalesImport:
+    """
+    Historical staff sales: username, date (YYYY-MM-DD), item and quantity, plus an optional
+    price_per_unit (defaults to the item's current price) and submitted (defaults to yes).
+    """
+    label = "staff sale(s)"
+    required = ('username', 'date', 'item', 'quantity')
+    optional = ('price_per_unit', 'submitted')
+
+    def __init__(self, session):
+        self.user_ids = dict(session.query(User.username, User.id))
+        self.prices = dict(session.query(InventoryItem.name, InventoryItem.price_per_unit))
+        self.days = {}
+
+    def parse(self, row):
+        username = (row.get('username') or '').strip()
+        if username not in self.user_ids:
+            raise ServiceError(f"User '{username}' not found.")
+        entry_date, timestamp = self._day((row.get('date') or '').strip())
+        item_name = (row.get('item') or '').strip()
+        if item_name not in self.prices:
+            raise ServiceError(f"Item '{item_name}' not found in inventory.")
+        quantity = _int(row.get('quantity'), 'quantity', 1)
+        price = _price(row['price_per_unit']) if row.get('price_per_unit') else self.prices[item_name]
+        submitted = (row.get('submitted') or 'yes').strip().lower()
+        if submitted not in TRUE_VALUES + FALSE_VALUES:
+            raise ServiceError("submitted must be yes or no.")
+        return {'staff_id': self.user_ids[username], 'entry_date': entry_date, 'item_name': item_name,
+                'quantity': quantity, 'price_per_unit': price, 'total_cost': price * quantity,
+                'is_submitted': submitted in TRUE_VALUES,
+                'timestamp': timestamp}
+
+    def _day(self, text):
+        # A file covers a few hundred days at most, so each date string is parsed once
+        if text not in self.days:
+            try:
+                entry_date = datetime.strptime(text, '%Y-%m-%d').date()
+            except ValueError:
+                raise ServiceError("date must be in YYYY-MM-DD format.")
+            self.days[text] = (entry_date, datetime.combine(entry_date, datetime.min.time()))
+        return self.days[text]
+
+    def write(self, session, rows):
+        # Core executemany; the staff_daily_totals and report version triggers still run for every row
+        session.execute(StaffSaleEntry.__table__.insert(), rows)
+
+
+IMPORT_KINDS = {'inventory': _InventoryImport, 'supplies': _SupplyImport, 'sales': _SalesImport}
+
+
+def error_report_path(path):
+    root, _ = os.path.splitext(path)
+    return f"{root}.errors.csv"
+
+
+def _normalize_header(name):
+    return (name or '').strip().lower().replace(' ', '_')
+
+
+def import_csv(session, actor, kind, path, batch_size=IMPORT_BATCH_SIZE, job=None):
+    """
+    Imports a CSV file of the given kind ('inventory', 'supplies' or 'sales'). The file is read
+    row by row; valid rows are written with bulk statements in units of work (run_in_session) of batch_size
+    rows, and rejected rows go to <file>.errors.csv with their line number and the reason. session is only
+    used for the lookups the rows are checked against. Returns an ImportResult.
+    When run as a background job, reports progress and stops at the next batch once cancelled;
+    batches already committed stay imported.
+    """
+    if kind not in IMPORT_KINDS:
+        raise ServiceError(f"Unknown import type '{kind}'.")
+    result = ImportResult(kind, path)
+    importer = IMPORT_KINDS[kind](session)
+    session.rollback()  # Ends the lookups' read transaction, which would otherwise hold up the batches' writes
+    total_size = max(os.path.getsize(path), 1)
+    read_size = [0]
+
+    def counted(lines):
+        for line in lines:
+            read_size[0] += len(line)
+            yield line
+
+    error_file = error_writer = None
+    try:
+        with open(path, newline='', encoding='utf-8-sig') as csv_file:
+            reader = csv.reader(counted(csv_file))
+            header = [_normalize_header(name) for name in next(reader, [])]
+            missing = [column for column in importer.required if column not in header]
+            if missing:
+                raise ServiceError(f"The file is missing the column(s): {', '.join(missing)}.")
+
+            def reject(line_number, values, reason):
+                nonlocal error_file, error_writer
+                if error_writer is None:
+                    result.error_report = error_report_path(path)
+                    error_file = open(result.error_report, 'w', newline='', encoding='utf-8')
+                    error_writer = csv.writer(error_file)
+                    error_writer.writerow(['line', 'error'] + header)
+                error_writer.writerow([line_number, reason] + values)
+                result.rejected += 1
+
+            def flush(batch):
+                try:
+                    run_in_session(importer.write, [row for _, _, row in batch])
+                    result.imported += len(batch)
+                except Exception as e:
+                    for line_number, values, _ in batch:
+                        reject(line_number, values, f"Batch not saved: {e}")
+
+            batch = []
+            for values in reader:
+                if not any(value.strip() for value in values):
+                    continue  # Blank line
+                line_number = reader.line_num
+                try:
+                    batch.append((line_number, values, importer.parse(dict(zip(header, values)))))
+                except ServiceError as e:
+                    reject(line_number, values, str(e))
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    batch = []
+                    if job:
+                        job.check_cancelled()
+                        job.report_progress(min(read_size[0] / total_size, 0.99),
+                                            f"{result.imported} imported, {result.rejected} rejected")
+            if batch:
+                flush(batch)
+    finally:
+        if error_file:
+            error_file.close()
+        if result.imported or result.rejected:
+            log_action(actor.username, actor.role, 'Bulk Import',
+                       new_value=f"{kind} from {os.path.basename(path)}: "
+                                 f"{result.imported} imported, {result.rejected} rejected", durable=True)
+    return result
+
+
+def run_import_job(job, kind, path, user_id):
+    """Background job behind "Import CSV" on the inventory screen."""
+    session = Session()  # db_session belongs to the Tk thread
+    try:
+        actor = session.query(User).get(user_id)
+        return import_csv(session, actor, kind, path, job=job).summary()
+    finally:
+        session.close()
+
+
+if __name__ == '__main__':
+    from database import Base, engine
+    from migrations import run_migrations
+    from audit_writer import audit_writer
+
+    parser = argparse.ArgumentParser(description="Import inventory items, supply deliveries or staff sales from CSV.")
+    parser.add_argument('kind', choices=sorted(IMPORT_KINDS))
+    parser.add_argument('path')
+    parser.add_argument('--user', default='admin', help="username recorded in the audit log")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    cli_session = Session()
+    cli_actor = cli_session.query(User).filter_by(username=args.user).first()
+    if not cli_actor:
+        parser.error(f"No user named '{args.user}'.")
+    started = datetime.now()
+    try:
+        print(import_csv(cli_session, cli_actor, args.kind, args.path, args.batch_size).summary())
+    except ServiceError as e:
+        print(e)
+    print(f"Took {(datetime.now() - started).total_seconds():.1f} s")
+    cli_session.close()
+    audit_writer.close()
@@ -0,0 +1,94 @@
+from datetime import date
+
+from models import CashRegisterEntry, DailyStockEntry
+from helpers import log_action
+from services import ServiceError, to_number
+from services.payroll import record_deduction
+from staff_totals import staff_day_totals, submitted_sales_total
+
+
+def _check_declared(declared_cash, declared_pos):
+    """Returns both declared amounts as floats, if they are non-negative numbers."""
+    declared_cash = to_number(declared_cash, "Declared Cash and POS must be numbers.")
+    declared_pos = to_number(declared_pos, "Declared Cash and POS must be numbers.")
+    if not (declared_cash >= 0 and declared_pos >= 0):
+        raise ServiceError("Declared Cash and POS cannot be negative.")
+    return declared_cash, declared_pos
+
+
+def _finalize_cash_entry(session, actor, entry_date, declared_cash, declared_pos, system_total_sales, reason_prefix):
+    """
+    Creates or updates the actor's cash register entry for the day and finalizes it. Any difference
+    between the declared total and the system total is deducted from the actor's salary.
+    Does not commit. Returns (cash entry, mismatch, deduction, old balance).
+    """
+    cash_entry = session.query(CashRegisterEntry).filter_by(user_id=actor.id, entry_date=entry_date).first()
+    if not cash_entry:
+        cash_entry = CashRegisterEntry(user_id=actor.id, entry_date=entry_date)
+        session.add(cash_entry)
+
+    cash_entry.declared_cash = declared_cash
+    cash_entry.declared_pos = declared_pos
+    cash_entry.system_total_sales = system_total_sales
+    cash_entry.is_finalized = True
+
+    total_declared = declared_cash + declared_pos
+    mismatch = total_declared - system_total_sales
+    deduction = 0.0
+    old_balance = actor.current_salary_balance
+    if mismatch != 0:
+        deduction = abs(mismatch)
+        cash_entry.mismatch_amount = mismatch
+        cash_entry.deduction_amount = deduction
+        _, old_balance = record_deduction(session, actor, deduction,
+                                          f"{reason_prefix} for {entry_date}. Expected: ₦{system_total_sales:.2f}, "
+                                          f"Declared: ₦{total_declared:.2f}", deduction_date=entry_date)
+    return cash_entry, mismatch, deduction, old_balance
+
+
+def declare_staff_cash(session, actor, declared_cash, declared_pos, entry_date=None):
+    """
+    Finalizes a waiter's end-of-shift cash and POS declaration against their submitted sales.
+    Returns the CashRegisterEntry; its mismatch_amount and deduction_amount say what was deducted.
+    """
+    entry_date = entry_date or date.today()
+    declared_cash, declared_pos = _check_declared(declared_cash, declared_pos)
+    submitted_count, system_total_sales = staff_day_totals(session, actor.id, entry_date)['submitted']
+    if not submitted_count:
+        raise ServiceError("No submitted sales to declare cash/POS for today. Please submit sales first.")
+
+    cash_entry, mismatch, deduction, old_balance = _finalize_cash_entry(
+        session, actor, entry_date, declared_cash, declared_pos, system_total_sales, "Staff Cash/POS Mismatch")
+    session.commit()
+    if deduction:
+        log_action(actor.username, actor.role, 'Staff Cash/POS Mismatch Deduction',
+                   old_value=f"Old Balance:{old_balance}",
+                   new_value=f"New Balance:{actor.current_salary_balance}, Deduction:{deduction}", durable=True)
+    return cash_entry
+
+
+def declare_manager_cash(session, actor, declared_cash, declared_pos, entry_date=None):
+    """
+    Finalizes the day: the manager's POS and cash declaration is checked against all submitted staff
+    sales, any mismatch is deducted from the manager's salary and the daily stock entry is closed.
+    Returns the DailyStockEntry.
+    """
+    entry_date = entry_date or date.today()
+    declared_cash, declared_pos = _check_declared(declared_cash, declared_pos)
+    daily_entry = session.query(DailyStockEntry).filter_by(manager_id=actor.id, entry_date=entry_date).first()
+    if not daily_entry or not daily_entry.item_sales_snapshot:
+        raise ServiceError("Please save daily stock entries first.")
+
+    system_total_sales = submitted_sales_total(session, entry_date)
+    _, mismatch, deduction, old_balance = _finalize_cash_entry(
+        session, actor, entry_date, declared_cash, declared_pos, system_total_sales, "Manager POS/Cash Mismatch")
+    daily_entry.total_pos_cash_declared = declared_cash + declared_pos
+    daily_entry.mismatch_amount = mismatch
+    daily_entry.deduction_amount = deduction
+    daily_entry.is_finalized = True
+    session.commit()
+    if deduction:
+        log_action(actor.username, actor.role, 'Manager Cash/POS Mismatch Deduction',
+                   old_value=f"Old Balance:{old_balance}",
+                   new_value=f"New Balance:{actor.current_salary_balance}, Deduction:{deduction}", durable=True)
+    return daily_entry
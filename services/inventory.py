@@ -0,0 +1,151 @@
+import json
+from datetime import date
+
+from models import InventoryItem, DailyStockEntry, DailyItemMovement
+from helpers import log_action
+from services import ServiceError, increment, to_number
+
+
+def _item(session, item_id):
+    item = session.query(InventoryItem).get(item_id)
+    if not item:
+        raise ServiceError("Item not found.")
+    return item
+
+
+def _check_price(price_per_unit):
+    price_per_unit = to_number(price_per_unit, "Price must be a number.")
+    if not price_per_unit >= 0:
+        raise ServiceError("Price cannot be negative.")
+    return price_per_unit
+
+
+def add_item(session, actor, name, price_per_unit, initial_supply_qty=0):
+    """Adds an inventory item whose opening and closing stock start at the initial supply. Returns the item."""
+    price_per_unit = _check_price(price_per_unit)
+    initial_supply_qty = to_number(initial_supply_qty, "Initial supply quantity must be a whole number.", int)
+    if initial_supply_qty < 0:
+        raise ServiceError("Initial supply quantity cannot be negative.")
+    if not name:
+        raise ServiceError("Item Name cannot be empty.")
+    if session.query(InventoryItem.id).filter_by(name=name).first():
+        raise ServiceError("Item with this name already exists.")
+    item = InventoryItem(name=name, price_per_unit=price_per_unit, supply_qty=initial_supply_qty,
+                         opening_stock=initial_supply_qty, closing_stock=initial_supply_qty)
+    session.add(item)
+    session.commit()
+    log_action(actor.username, actor.role, 'Add Inventory Item',
+               new_value=f"Name:{name}, Price:{price_per_unit}, Initial Supply:{initial_supply_qty}")
+    return item
+
+
+def update_item(session, actor, item_id, name, price_per_unit):
+    """Renames and/or reprices an item. Returns the item."""
+    price_per_unit = _check_price(price_per_unit)
+    item = _item(session, item_id)
+    old_values = f"Name:{item.name}, Price:{item.price_per_unit}"
+    item.name = name
+    item.price_per_unit = price_per_unit
+    session.commit()
+    log_action(actor.username, actor.role, 'Update Inventory Item',
+               old_value=old_values, new_value=f"Name:{item.name}, Price:{item.price_per_unit}")
+    return item
+
+
+def supply_item(session, actor, item_id, quantity):
+    """Records a delivery: quantity is added to the item's supply, opening and closing stock. Returns the item."""
+    quantity = to_number(quantity, "Please enter a valid positive number for quantity.", int)
+    if quantity <= 0:
+        raise ServiceError("Please enter a valid positive number for quantity.")
+    item = _item(session, item_id)
+    old = increment(session, item, supply_qty=quantity, opening_stock=quantity, closing_stock=quantity)
+    session.commit()
+    log_action(actor.username, actor.role, 'Supply Inventory Item',
+               old_value=f"Item:{item.name}, Old Supply:{old['supply_qty']}, Old Opening:{old['opening_stock']}, "
+                         f"Old Closing:{old['closing_stock']}",
+               new_value=f"New Supply:{item.supply_qty}, New Opening:{item.opening_stock}, New Closing:{item.closing_stock}")
+    return item
+
+
+def delete_item(session, actor, item_id):
+    """Deletes an inventory item. Returns its name."""
+    item = _item(session, item_id)
+    name = item.name
+    try:
+        session.delete(item)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    log_action(actor.username, actor.role, 'Delete Inventory Item', old_value=name)
+    return name
+
+
+def save_daily_stock(session, actor, closing_stocks, entry_date=None):
+    """
+    Records the manager's closing stock count for the day. closing_stocks maps item id to the counted
+    quantity; items left out keep their current closing stock. Quantity sold is opening + supply - closing,
+    which becomes the expected sales total. Each item's closing stock is carried over as the next opening
+    stock; the items' versions make this fail with StaleDataError if a delivery lands after they were read.
+    Returns the DailyStockEntry.
+    """
+    entry_date = entry_date or date.today()
+    for item_id, closing_stock in closing_stocks.items():
+        if closing_stock < 0:
+            raise ServiceError(f"Closing stock for item ID {item_id} cannot be negative.")
+
+    daily_entry = session.query(DailyStockEntry).filter_by(manager_id=actor.id, entry_date=entry_date).first()
+    total_sales_expected = 0.0
+    item_sales_details = {}
+    item_movements = []
+    for item in session.query(InventoryItem).all():
+        closing_stock = closing_stocks.get(item.id, item.closing_stock)
+        quantity_sold = item.opening_stock + item.supply_qty - closing_stock
+        if quantity_sold < 0:
+            session.rollback()  # Undo the carry-over already applied to earlier items
+            raise ServiceError(f"Closing stock for {item.name} ({closing_stock}) is higher than available stock "
+                               f"({item.opening_stock + item.supply_qty}). Cannot proceed.")
+
+        item_sales_details[item.name] = {
+            'opening_stock': item.opening_stock,
+            'supply_qty': item.supply_qty,
+            'closing_stock': closing_stock,
+            'quantity_sold': quantity_sold,
+            'price_per_unit': item.price_per_unit,
+            'profit': quantity_sold * item.price_per_unit
+        }
+        item_movements.append(DailyItemMovement(
+            entry_date=entry_date,
+            item_id=item.id,
+            item_name=item.name,
+            opening_stock=item.opening_stock,
+            supply_qty=item.supply_qty,
+            closing_stock=closing_stock,
+            quantity_sold=quantity_sold,
+            price_per_unit=item.price_per_unit,
+            total_sales=quantity_sold * item.price_per_unit
+        ))
+        total_sales_expected += quantity_sold * item.price_per_unit
+
+        item.opening_stock = closing_stock
+        item.closing_stock = closing_stock
+        item.supply_qty = 0
+
+    created = daily_entry is None
+    if created:
+        daily_entry = DailyStockEntry(manager_id=actor.id, entry_date=entry_date)
+        session.add(daily_entry)
+
+    daily_entry.total_sales_expected = total_sales_expected
+    daily_entry.item_sales_snapshot = json.dumps(item_sales_details)
+    # Queryable per-item rows, committed in the same transaction as the snapshot.
+    # Flush away any earlier rows for the day first so the (entry_date, item_name) key is free.
+    if daily_entry.item_movements:
+        daily_entry.item_movements = []
+        session.flush()
+    daily_entry.item_movements = item_movements
+
+    session.commit()
+    if created:
+        log_action(actor.username, actor.role, 'Created Daily Stock Entry', new_value=f"Date:{entry_date}")
+    return daily_entry
@@ -0,0 +1,82 @@
+from datetime import date
+
+from models import User, SalaryDeduction
+from helpers import log_action
+from services import ServiceError, increment, to_number
+
+
+def _target_user(session, user_id):
+    user = session.query(User).get(user_id)
+    if not user:
+        raise ServiceError("Selected user not found.")
+    return user
+
+
+def _check_amount(amount, reason):
+    """Returns amount as a float, if it is a non-negative number and a reason is given."""
+    amount = to_number(amount, "Amount must be a non-negative number.")
+    if not amount >= 0:  # Also refuses NaN
+        raise ServiceError("Amount must be a non-negative number.")
+    if not reason:
+        raise ServiceError("Reason cannot be empty.")
+    return amount
+
+
+def record_deduction(session, user, amount, reason, deduction_date=None):
+    """
+    Takes amount off the user's balance and records why. Does not commit: callers add it to their transaction.
+    Returns (the SalaryDeduction, the balance before it).
+    """
+    old_balance = increment(session, user, current_salary_balance=-amount)['current_salary_balance']
+    deduction = SalaryDeduction(user_id=user.id, amount=amount, reason=reason,
+                                deduction_date=deduction_date or date.today())
+    session.add(deduction)
+    return deduction, old_balance
+
+
+def add_bonus(session, actor, user_id, amount, reason):
+    """Adds amount to a user's salary balance. Returns the user."""
+    amount = _check_amount(amount, reason)
+    user = _target_user(session, user_id)
+    old_balance = increment(session, user, current_salary_balance=amount)['current_salary_balance']
+    session.commit()
+    log_action(actor.username, actor.role, 'Add Bonus',
+               old_value=f"User:{user.username}, Old Balance:{old_balance}",
+               new_value=f"New Balance:{user.current_salary_balance}, Reason:{reason}", durable=True)
+    return user
+
+
+def deduct_penalty(session, actor, user_id, amount, reason):
+    """Deducts a manual penalty from a user's salary balance. Returns the SalaryDeduction."""
+    amount = _check_amount(amount, reason)
+    user = _target_user(session, user_id)
+    deduction, old_balance = record_deduction(session, user, amount, f"Manual Penalty: {reason}")
+    session.commit()
+    log_action(actor.username, actor.role, 'Deduct Penalty',
+               old_value=f"User:{user.username}, Old Balance:{old_balance}",
+               new_value=f"New Balance:{user.current_salary_balance}, Reason:{reason}", durable=True)
+    return deduction
+
+
+def clear_debt(session, actor, user_id, amount, reason):
+    """
+    Pays off up to amount of a negative salary balance. Returns the amount actually cleared,
+    which is 0.0 when the user has no debt. The amount depends on the balance read here, so the
+    update is checked against the user's version (StaleDataError if it changed meanwhile).
+    """
+    amount = _check_amount(amount, reason)
+    user = _target_user(session, user_id)
+    if user.current_salary_balance >= 0:
+        return 0.0
+    old_balance = user.current_salary_balance
+    cleared = min(amount, -old_balance)
+    if amount >= abs(old_balance):
+        user.current_salary_balance = 0.0
+    else:
+        user.current_salary_balance += amount
+    session.commit()
+    log_action(actor.username, actor.role, 'Clear Debt',
+               old_value=f"User:{user.username}, Old Balance:{old_balance}",
+               new_value=f"New Balance:{user.current_salary_balance}, Amount Cleared:{amount}, Reason:{reason}",
+               durable=True)
+    return cleared
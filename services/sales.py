@@ -0,0 +1,52 @@
+from datetime import date
+
+from models import InventoryItem, StaffSaleEntry
+from helpers import log_action
+from services import ServiceError, to_number
+
+
+def add_sale(session, actor, item_name, quantity, entry_date=None):
+    """
+    Adds a pending sale at the item's current price. Does not commit or log: callers add it to their
+    transaction, as record_sale and the handheld server's batches do. Returns the StaffSaleEntry.
+    """
+    quantity = to_number(quantity, "Quantity must be a whole number.", int)
+    if quantity <= 0:
+        raise ServiceError("Quantity must be positive.")
+    item = session.query(InventoryItem).filter_by(name=item_name).first()
+    if not item:
+        raise ServiceError("Selected item not found in inventory. Please choose an existing item.")
+    sale = StaffSaleEntry(
+        staff_id=actor.id,
+        entry_date=entry_date or date.today(),
+        item_name=item.name,
+        quantity=quantity,
+        price_per_unit=item.price_per_unit,
+        total_cost=item.price_per_unit * quantity,
+        is_submitted=False  # Not counted towards the day's system sales until submitted
+    )
+    session.add(sale)
+    return sale
+
+
+def record_sale(session, actor, item_name, quantity, entry_date=None):
+    """Records a pending sale at the item's current price. Returns the StaffSaleEntry."""
+    sale = add_sale(session, actor, item_name, quantity, entry_date)
+    session.commit()
+    log_action(actor.username, actor.role, 'Staff Add Sale', new_value=f"{sale.item_name} x {quantity}")
+    return sale
+
+
+def submit_sales(session, actor, entry_date=None):
+    """Submits all of the waiter's pending sales for the day. Returns how many were submitted."""
+    entry_date = entry_date or date.today()
+    # One UPDATE for all pending rows; the staff_daily_totals triggers move their totals to 'submitted'
+    submitted = session.query(StaffSaleEntry).filter_by(staff_id=actor.id, entry_date=entry_date,
+                                                        is_submitted=False).update({StaffSaleEntry.is_submitted: True},
+                                                                                   synchronize_session='fetch')
+    if not submitted:
+        session.rollback()
+        raise ServiceError("No pending sales to submit for today.")
+    session.commit()
+    log_action(actor.username, actor.role, 'Staff Submit Sales', new_value=f"Sales for {entry_date}")
+    return submitted
@@ -0,0 +1,43 @@
+from models import User
+from helpers import log_action
+from services import ServiceError
+
+
+def add_user(session, actor, username, password, role, monthly_salary):
+    """Creates a user whose salary balance starts at their monthly salary. Returns the user."""
+    if not username or not password:
+        raise ServiceError("Username and Password cannot be empty.")
+    if session.query(User.id).filter_by(username=username).first():
+        raise ServiceError("Username already exists.")
+    user = User(username=username, role=role, monthly_salary=monthly_salary, current_salary_balance=monthly_salary)
+    user.set_password(password)
+    session.add(user)
+    session.commit()
+    log_action(actor.username, actor.role, 'Add User',
+               new_value=f"Username:{username}, Role:{role}, Monthly Salary:{monthly_salary}")
+    return user
+
+
+def check_user_deletable(session, actor, user):
+    """Raises ServiceError if actor may not delete user: themselves, or the last Admin."""
+    if user.id == actor.id:
+        raise ServiceError("You cannot delete your own active account.")
+    if user.role == 'Admin' and session.query(User).filter_by(role='Admin').count() == 1:
+        raise ServiceError("Cannot delete the last Admin user in the system.")
+
+
+def delete_user(session, actor, user_id):
+    """Deletes a user and all their records. Returns the deleted username."""
+    user = session.query(User).get(user_id)
+    if not user:
+        raise ServiceError("Selected user not found in database.")
+    check_user_deletable(session, actor, user)
+    username = user.username
+    try:
+        session.delete(user)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    log_action(actor.username, actor.role, 'Delete User', old_value=username)
+    return username
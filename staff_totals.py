@@ -0,0 +1,95 @@
+import argparse
+import sys
+
+from sqlalchemy import func, text
+from models import StaffSaleEntry, StaffDailyTotal
+
+# Differences below this are floating point noise from adding and subtracting the same amounts
+TOTAL_TOLERANCE = 0.005
+
+# Recomputes staff_daily_totals from the raw sale rows (used by migration 6 and --rebuild)
+REBUILD_STAFF_DAILY_TOTALS_SQL = (
+    "DELETE FROM staff_daily_totals",
+    "INSERT INTO staff_daily_totals (staff_id, entry_date, is_submitted, sale_count, quantity, total_cost) "
+    "SELECT staff_id, entry_date, COALESCE(is_submitted, 0), COUNT(*), COALESCE(SUM(quantity), 0), "
+    "COALESCE(SUM(total_cost), 0.0) FROM staff_sale_entries "
+    "GROUP BY staff_id, entry_date, COALESCE(is_submitted, 0)",
+)
+
+
+def staff_day_totals(session, staff_id, entry_date):
+    """
+    One waiter's totals for a day, read from at most two aggregate rows:
+    {'pending': (sale_count, total_cost), 'submitted': (...), 'all': (...)}.
+    """
+    totals = {'pending': (0, 0.0), 'submitted': (0, 0.0)}
+    for row in session.query(StaffDailyTotal).filter_by(staff_id=staff_id, entry_date=entry_date):
+        totals['submitted' if row.is_submitted else 'pending'] = (row.sale_count, row.total_cost)
+    totals['all'] = (totals['pending'][0] + totals['submitted'][0], totals['pending'][1] + totals['submitted'][1])
+    return totals
+
+
+def submitted_sales_total(session, entry_date, staff_id=None):
+    """Total cost of submitted sales for a day, for every waiter or just one."""
+    query = session.query(func.coalesce(func.sum(StaffDailyTotal.total_cost), 0.0)).filter(
+        StaffDailyTotal.entry_date == entry_date, StaffDailyTotal.is_submitted == True)
+    if staff_id is not None:
+        query = query.filter(StaffDailyTotal.staff_id == staff_id)
+    return query.scalar()
+
+
+def find_staff_total_mismatches(session):
+    """
+    Compares staff_daily_totals with totals recomputed from staff_sale_entries.
+    Returns (staff_id, entry_date, is_submitted, stored (count, cost), actual (count, cost)) for each difference.
+    """
+    actual = {
+        (staff_id, entry_date, bool(is_submitted)): (count, cost or 0.0)
+        for staff_id, entry_date, is_submitted, count, cost in session.query(
+            StaffSaleEntry.staff_id, StaffSaleEntry.entry_date, func.coalesce(StaffSaleEntry.is_submitted, False),
+            func.count(StaffSaleEntry.id), func.sum(StaffSaleEntry.total_cost)
+        ).group_by(StaffSaleEntry.staff_id, StaffSaleEntry.entry_date,
+                   func.coalesce(StaffSaleEntry.is_submitted, False))
+    }
+    stored = {
+        (row.staff_id, row.entry_date, bool(row.is_submitted)): (row.sale_count, row.total_cost)
+        for row in session.query(StaffDailyTotal)
+    }
+    mismatches = []
+    for key in sorted(set(actual) | set(stored), key=lambda k: (k[1], k[0], k[2])):
+        stored_total = stored.get(key, (0, 0.0))
+        actual_total = actual.get(key, (0, 0.0))
+        if stored_total[0] != actual_total[0] or abs(stored_total[1] - actual_total[1]) > TOTAL_TOLERANCE:
+            mismatches.append(key + (stored_total, actual_total))
+    return mismatches
+
+
+def rebuild_staff_daily_totals(session):
+    """Replaces the aggregate with totals recomputed from the raw sale rows, in one transaction."""
+    for statement in REBUILD_STAFF_DAILY_TOTALS_SQL:
+        session.execute(text(statement))
+    session.commit()
+
+
+if __name__ == '__main__':
+    from database import Base, engine, db_session
+    from migrations import run_migrations
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the staff_daily_totals aggregate.")
+    parser.add_argument('--rebuild', action='store_true', help="recompute the aggregate from staff_sale_entries")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    mismatches = find_staff_total_mismatches(db_session)
+    for staff_id, entry_date, is_submitted, stored_total, actual_total in mismatches:
+        print(f"staff {staff_id} on {entry_date} ({'submitted' if is_submitted else 'pending'}): "
+              f"stored {stored_total[0]} sales / {stored_total[1]:.2f}, actual {actual_total[0]} / {actual_total[1]:.2f}")
+    if args.rebuild:
+        rebuild_staff_daily_totals(db_session)
+        print(f"Rebuilt staff_daily_totals ({len(mismatches)} mismatched row(s) before rebuild).")
+    elif mismatches:
+        print(f"{len(mismatches)} mismatched row(s). Run with --rebuild to recompute the totals.")
+        sys.exit(1)
+    else:
+        print("staff_daily_totals is consistent with staff_sale_entries.")
@@ -0,0 +1,35 @@
+import time
+
+# main.py imports this module first, so the timeline starts before any heavy import
+STARTED = time.perf_counter()
+_marks = []
+
+
+def mark(label):
+    """Records that a start-up step has just finished."""
+    _marks.append((label, time.perf_counter()))
+
+
+def timeline():
+    """(label, ms since start, ms taken by the step) for every mark so far."""
+    rows = []
+    previous = STARTED
+    for label, at in _marks:
+        rows.append((label, (at - STARTED) * 1000, (at - previous) * 1000))
+        previous = at
+    return rows
+
+
+def print_timeline():
+    print("Start-up timeline (ms since main.py started; run with python -X importtime for per-module detail):")
+    for label, total_ms, step_ms in timeline():
+        print(f"{total_ms:9.1f} ms  {step_ms:+8.1f} ms  {label}")
+
+
+def report_when_shown(master):
+    """Prints the timeline once Tk has drawn the first window, i.e. when the login screen is visible."""
+    def shown():
+        mark("login window shown")
+        print_timeline()
+    # Geometry and redraw are idle tasks queued while the window was built, so they run before this one
+    master.after_idle(shown)
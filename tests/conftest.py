@@ -0,0 +1,40 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# The app's modules live in the repository root. Point the app's engine and checkpoint key at a scratch
+# directory before they are imported, so the tests never open bar_audit.db or its key file
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TEST_DATA_DIR = tempfile.mkdtemp(prefix='bar_audit_tests_')
+TEST_DATABASE = os.path.join(TEST_DATA_DIR, 'test.db')
+os.environ['BAR_AUDIT_DATABASE_URL'] = f"sqlite:///{TEST_DATABASE}"
+os.environ['BAR_AUDIT_AUDIT_CHECKPOINT_KEY_FILE'] = os.path.join(TEST_DATA_DIR, 'checkpoint.key')
+os.environ['BAR_AUDIT_AUDIT_ARCHIVE_DIR'] = os.path.join(TEST_DATA_DIR, 'audit_archive')
+os.environ['BAR_AUDIT_REPORTS_CACHE_DIR'] = os.path.join(TEST_DATA_DIR, 'report_cache')
+
+
+@pytest.fixture
+def app_database():
+    """
+    A fresh, migrated database behind the app's own engine and Session, with an empty audit archive,
+    for code that opens its own sessions or threads. Yields the engine.
+    """
+    from database import Base, engine, db_session
+    from migrations import run_migrations
+    from audit_writer import audit_writer
+    from audit_archive import audit_archive
+
+    db_session.close()
+    engine.dispose()
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(TEST_DATABASE + suffix):
+            os.remove(TEST_DATABASE + suffix)
+    shutil.rmtree(audit_archive.directory, ignore_errors=True)
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    yield engine
+    audit_writer.flush()  # Queued logs belong to this test's database
+    db_session.close()
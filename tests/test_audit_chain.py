@@ -0,0 +1,110 @@
+"""Hash-chained audit logs: a clean chain verifies, and edits, deletions and forged checkpoints are caught."""
+import os
+
+import pytest
+from sqlalchemy import text, update
+from sqlalchemy.exc import IntegrityError
+
+from database import Session
+from helpers import log_action
+from models import AuditLog, AuditCheckpoint
+from audit_chain import verify_audit_chain
+
+
+def write_logs(count, start=0):
+    for number in range(start, start + count):
+        assert log_action('admin', 'Admin', 'Test Action', old_value=f"old {number}", new_value=f"new {number}",
+                          durable=True)
+
+
+@pytest.fixture
+def session(app_database):
+    session = Session()
+    yield session
+    session.close()
+
+
+def tamper(session, log_id, **values):
+    """Edits a log the way someone with the database file could: past the append-only trigger."""
+    session.execute(text("DROP TRIGGER trg_audit_logs_append_only"))
+    session.execute(update(AuditLog).where(AuditLog.id == log_id).values(**values))
+    session.commit()
+
+
+def test_logs_cannot_be_updated_in_place(session):
+    write_logs(3)
+    with pytest.raises(IntegrityError, match='audit logs cannot be changed'):
+        session.execute(update(AuditLog).where(AuditLog.id == 2).values(new_value='edited'))
+    session.rollback()
+
+
+def test_clean_chain_verifies(session):
+    write_logs(20)
+    result = verify_audit_chain(session, full=True)
+    assert result.ok, result.summary()
+    assert result.checked == 20
+    assert result.checkpoint is not None and result.checkpoint.last_log_id == 20
+
+
+@pytest.mark.parametrize('column', ('old_value', 'new_value'))
+def test_edited_log_is_detected(session, column):
+    write_logs(20)
+    tamper(session, 7, **{column: 'edited'})
+    result = verify_audit_chain(session, full=True, write_checkpoint=False)
+    assert not result.ok
+    assert result.broken_id == 7
+
+
+def test_deleted_log_is_detected(session):
+    write_logs(20)
+    session.query(AuditLog).filter(AuditLog.id == 12).delete()
+    session.commit()
+    result = verify_audit_chain(session, full=True, write_checkpoint=False)
+    assert not result.ok
+    assert result.broken_id == 13  # The log after the gap no longer matches its hash
+
+
+def test_incremental_verification_checks_new_logs_only(session):
+    write_logs(20)
+    assert verify_audit_chain(session).ok
+    write_logs(5, start=20)
+    result = verify_audit_chain(session)
+    assert result.ok, result.summary()
+    assert result.start_id == 20 and result.checked == 5
+
+
+def test_incremental_verification_catches_tampering_after_the_checkpoint(session):
+    write_logs(20)
+    assert verify_audit_chain(session).ok
+    write_logs(10, start=20)
+    tamper(session, 25, new_value='edited')
+    result = verify_audit_chain(session)
+    assert not result.ok
+    assert result.broken_id == 25
+
+
+def test_checkpoint_with_bad_signature_is_rejected(session):
+    write_logs(20)
+    assert verify_audit_chain(session).ok
+    session.query(AuditCheckpoint).update({'signature': '0' * 64})
+    session.commit()
+    result = verify_audit_chain(session)
+    assert not result.ok
+    assert 'signature' in result.problem
+
+
+def test_checkpoint_signed_with_another_key_is_rejected(session):
+    write_logs(20)
+    assert verify_audit_chain(session).ok
+    result = verify_audit_chain(session, key=os.urandom(32))
+    assert not result.ok
+    assert 'signature' in result.problem
+
+
+def test_edit_up_to_the_checkpoint_is_detected(session):
+    write_logs(20)
+    assert verify_audit_chain(session).ok
+    tamper(session, 20, row_hash='f' * 64)  # Rewrites the checkpointed log's hash along with its values
+    result = verify_audit_chain(session)
+    assert not result.ok
+    assert result.broken_id == 20
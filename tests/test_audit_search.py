@@ -0,0 +1,71 @@
+"""
+Paging through an audit log search while new logs keep arriving: every match present when the search
+started is returned exactly once, across the ranked, recent and archived stretches.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+import audit_queries
+from database import Session
+from helpers import log_action
+from models import AuditLog
+from audit_archive import audit_archive
+from audit_chain import chain_records, chain_tail
+
+PAGE_SIZE = 20
+
+
+def add_logs(session, count, start):
+    """Chained logs an hour apart from start; two in three mention beer. Returns the ids of those that do."""
+    records = [{'username': f"staff{number % 4}", 'user_role': 'Staff', 'action_type': 'Staff Add Sale',
+                'old_value': None, 'new_value': f"{'Beer' if number % 3 else 'Wine'} bottle x{number % 5 + 1}",
+                'timestamp': start + timedelta(hours=number)} for number in range(count)]
+    session.execute(insert(AuditLog), chain_records(records, *chain_tail(session)))
+    session.commit()
+    return {record['id'] for record in records if record['new_value'].startswith('Beer')}
+
+
+@pytest.fixture
+def logs(app_database):
+    """60 logs archived from 2020, then 240 in the database. Returns (session, ids of the matching logs)."""
+    session = Session()
+    archived_ids = add_logs(session, 60, datetime(2020, 3, 1))
+    database_ids = add_logs(session, 240, datetime.utcnow() - timedelta(days=20))
+    assert audit_archive.archive(12, today=date.today()) == 60
+    session.expire_all()
+    yield session, archived_ids | database_ids
+    session.close()
+
+
+def page_through(session, search):
+    """Fetches every page, writing a new matching log between pages. Returns (ids, stretches seen)."""
+    ids, stretches, cursor = [], [], None
+    while True:
+        page, cursor = audit_queries.search_audit_logs(session, search, after=cursor, limit=PAGE_SIZE)
+        ids += [log.id for log in page]
+        if cursor is None:
+            return ids, stretches
+        stretches.append(cursor[0])
+        log_action('staff1', 'Staff', 'Staff Add Sale', new_value="Beer bottle x1", durable=True)
+        session.rollback()  # Like refresh_session(): the next page sees the new logs
+
+
+def test_ranked_search_pages_neither_repeat_nor_skip(logs, monkeypatch):
+    session, matching_ids = logs
+    monkeypatch.setattr(audit_queries, 'SEARCH_RANK_WINDOW', 30)
+    assert audit_queries.audit_search_available(session)
+    ids, stretches = page_through(session, 'beer')
+    assert len(ids) == len(set(ids)), "a log was returned twice"
+    assert set(ids) == matching_ids
+    assert {'ranked', 'recent', 'archive'} <= set(stretches)
+
+
+def test_like_fallback_pages_neither_repeat_nor_skip(logs, monkeypatch):
+    session, matching_ids = logs
+    monkeypatch.setattr(audit_queries, 'audit_search_available', lambda session: False)
+    ids, stretches = page_through(session, 'beer')
+    assert len(ids) == len(set(ids)), "a log was returned twice"
+    assert set(ids) == matching_ids
+    assert 'ranked' not in stretches and {'recent', 'archive'} <= set(stretches)
@@ -0,0 +1,20 @@
+"""
+Runs benchmarks/stress_terminals.py on a small scale: several terminal processes writing to one
+temporary database at once must lose no sale, delivery, deduction or audit log, in both journal modes.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+STRESS_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks',
+                             'stress_terminals.py')
+
+
+@pytest.mark.parametrize('journal_mode', ('WAL', 'DELETE'))
+def test_concurrent_terminals_lose_nothing(journal_mode):
+    completed = subprocess.run([sys.executable, STRESS_SCRIPT, '--terminals', '3', '--sales', '30',
+                                '--journal-mode', journal_mode], capture_output=True, text=True, timeout=300)
+    assert completed.returncode == 0, completed.stdout + completed.stderr
+    assert "All checks passed." in completed.stdout
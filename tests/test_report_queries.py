@@ -0,0 +1,68 @@
+"""
+N+1 checks for the report data layer: each call must issue at most its budget of SQL statements,
+whether the day has 2 users' rows or 25.
+"""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models import User, StaffSaleEntry, CashRegisterEntry, SalaryDeduction
+from report_data import (count_queries, daily_report_data, staff_sales_with_usernames, cash_entries_with_usernames,
+                         salary_deductions_with_usernames, staff_sales_totals, daily_summary_totals)
+
+DAY = date(2024, 1, 15)
+
+# Statements each report section may issue, however many rows and users it covers
+QUERY_BUDGETS = {
+    'daily_report_data': 5,
+    'staff_sales_with_usernames': 1,
+    'cash_entries_with_usernames': 1,
+    'salary_deductions_with_usernames': 1,
+    'staff_sales_totals': 1,
+    'daily_summary_totals': 1,
+}
+
+CALLS = {
+    'daily_report_data': lambda session, user_id: daily_report_data(session, DAY, user_id),
+    'staff_sales_with_usernames': lambda session, user_id: staff_sales_with_usernames(session, DAY),
+    'cash_entries_with_usernames': lambda session, user_id: cash_entries_with_usernames(session, DAY),
+    'salary_deductions_with_usernames': lambda session, user_id: salary_deductions_with_usernames(session),
+    'staff_sales_totals': lambda session, user_id: staff_sales_totals(session, DAY, DAY),
+    'daily_summary_totals': lambda session, user_id: daily_summary_totals(session, DAY, DAY),
+}
+
+
+@pytest.fixture(params=(2, 25), ids=lambda users: f"{users}_users")
+def seeded(request):
+    """An in-memory database with one sale, cash declaration and deduction per staff member on DAY."""
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    staff = [User(username=f"staff{i}", password_hash='x', role='Staff') for i in range(request.param)]
+    session.add_all(staff)
+    session.flush()
+    for user in staff:
+        session.add(StaffSaleEntry(staff_id=user.id, entry_date=DAY, item_name='Beer', quantity=2,
+                                   price_per_unit=1000.0, total_cost=2000.0, is_submitted=True))
+        session.add(CashRegisterEntry(user_id=user.id, entry_date=DAY, declared_cash=1000.0, declared_pos=1000.0,
+                                      system_total_sales=2000.0, mismatch_amount=0.0, deduction_amount=0.0))
+        session.add(SalaryDeduction(user_id=user.id, deduction_date=DAY, amount=100.0, reason='Check',
+                                    timestamp=datetime(2024, 1, 15, 12, 0)))
+    session.commit()
+    yield engine, session, staff[0].id
+    session.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize('name', QUERY_BUDGETS)
+def test_report_section_stays_within_query_budget(seeded, name):
+    engine, session, user_id = seeded
+    session.expire_all()
+    with count_queries(engine) as counter:
+        rows = CALLS[name](session, user_id)
+        if isinstance(rows, list):
+            [row[1] for row in rows]  # Touch every username the way the report and views do
+    assert counter['count'] <= QUERY_BUDGETS[name], "\n".join(counter['statements'])
@@ -0,0 +1,64 @@
+"""Builds the daily PDF report for days with and without a finalized stock entry."""
+from datetime import date, datetime
+
+from database import Session
+from models import (User, DailyStockEntry, DailyItemMovement, StaffSaleEntry, CashRegisterEntry,
+                    SalaryDeduction)
+from reports import build_daily_report
+
+DAY = date(2024, 1, 15)
+
+
+def seed_day(session):
+    manager = User(username='manager', password_hash='x', role='Manager')
+    staff = User(username='staff1', password_hash='x', role='Staff')
+    session.add_all([manager, staff])
+    session.flush()
+    entry = DailyStockEntry(manager_id=manager.id, entry_date=DAY, total_sales_expected=5000.0,
+                            total_pos_cash_declared=4500.0, mismatch_amount=500.0, deduction_amount=500.0,
+                            is_finalized=True)
+    session.add(entry)
+    session.flush()
+    session.add_all([
+        DailyItemMovement(daily_stock_entry_id=entry.id, entry_date=DAY, item_name='Beer Bottle', opening_stock=20,
+                          supply_qty=0, closing_stock=17, quantity_sold=3, price_per_unit=1000.0, total_sales=3000.0),
+        DailyItemMovement(daily_stock_entry_id=entry.id, entry_date=DAY, item_name='Soda Can', opening_stock=10,
+                          supply_qty=0, closing_stock=6, quantity_sold=4, price_per_unit=500.0, total_sales=2000.0),
+        StaffSaleEntry(staff_id=staff.id, entry_date=DAY, item_name='Beer Bottle', quantity=3,
+                       price_per_unit=1000.0, total_cost=3000.0, is_submitted=True),
+        CashRegisterEntry(user_id=staff.id, entry_date=DAY, declared_cash=2500.0, declared_pos=2000.0,
+                          system_total_sales=5000.0, mismatch_amount=500.0, deduction_amount=500.0),
+        SalaryDeduction(user_id=manager.id, deduction_date=DAY, amount=500.0, reason='Shortage',
+                        timestamp=datetime(2024, 1, 15, 22, 0)),
+    ])
+    session.commit()
+    return manager.id
+
+
+def assert_pdf(path):
+    with open(path, 'rb') as pdf_file:
+        content = pdf_file.read()
+    assert content.startswith(b'%PDF-')
+    assert b'%%EOF' in content[-1024:]
+
+
+def test_daily_report_with_stock_entry_and_item_movements(app_database, tmp_path):
+    session = Session()
+    try:
+        manager_id = seed_day(session)
+        report_path = str(tmp_path / 'daily.pdf')
+        assert build_daily_report(session, DAY, manager_id, report_filename=report_path) == report_path
+        assert_pdf(report_path)
+    finally:
+        session.close()
+
+
+def test_daily_report_for_a_day_without_entries(app_database, tmp_path):
+    session = Session()
+    try:
+        manager_id = seed_day(session)
+        report_path = str(tmp_path / 'empty_day.pdf')
+        build_daily_report(session, date(2024, 1, 16), manager_id, report_filename=report_path)
+        assert_pdf(report_path)
+    finally:
+        session.close()
@@ -0,0 +1,121 @@
+"""Idempotency-Key handling of the handheld sales server, over real HTTP on a local port."""
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from database import Session
+from models import User, InventoryItem, StaffSaleEntry, IdempotencyKey, hash_password
+from sales_server import SalesServer
+
+PASSWORD = 'password'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def server(app_database):
+    """A SalesServer on its own event loop thread, with a waiter and one item. Yields its port."""
+    session = Session()
+    session.add(User(username='waiter1', password_hash=hash_password(PASSWORD), role='Staff'))
+    session.add(InventoryItem(name='Beer Bottle', price_per_unit=1000.0))
+    session.commit()
+    session.close()
+
+    port = free_port()
+    loop = asyncio.new_event_loop()
+    serving = loop.create_task(SalesServer('127.0.0.1', port).serve())
+    thread = threading.Thread(target=lambda: loop.run_until_complete(asyncio.gather(serving, return_exceptions=True)),
+                              daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+    yield port
+    loop.call_soon_threadsafe(serving.cancel)
+    thread.join(10)
+    loop.close()
+
+
+class Handheld:
+    def __init__(self, port):
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        self.token = None
+
+    def post(self, path, body, key=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        if key:
+            headers['Idempotency-Key'] = key
+        self.connection.request('POST', path, json.dumps(body), headers)
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read()), response.getheader('Idempotent-Replayed')
+
+    def sign_in(self):
+        status, body, _ = self.post('/api/login', {'username': 'waiter1', 'password': PASSWORD})
+        assert status == 200, body
+        self.token = body['token']
+        return self
+
+
+def counts():
+    session = Session()
+    try:
+        return session.query(StaffSaleEntry).count(), session.query(IdempotencyKey).count()
+    finally:
+        session.close()
+
+
+def test_retried_sale_gets_the_stored_response_and_no_second_sale(server):
+    handheld = Handheld(server).sign_in()
+    sale = {'item': 'Beer Bottle', 'quantity': 2}
+    status, first, replayed = handheld.post('/api/sales', sale, key='sale-1')
+    assert (status, replayed) == (201, None)
+    assert first['total_cost'] == 2000.0
+
+    status, retry, replayed = handheld.post('/api/sales', sale, key='sale-1')
+    assert (status, replayed) == (201, 'true')
+    assert retry == first
+    assert counts() == (1, 1)
+
+
+def test_reusing_a_key_for_a_different_request_is_refused(server):
+    handheld = Handheld(server).sign_in()
+    assert handheld.post('/api/sales', {'item': 'Beer Bottle', 'quantity': 2}, key='sale-1')[0] == 201
+    status, body, replayed = handheld.post('/api/sales', {'item': 'Beer Bottle', 'quantity': 3}, key='sale-1')
+    assert status == 422 and replayed is None
+    assert 'Idempotency-Key' in body['error']
+    assert counts() == (1, 1)
+
+
+def test_sales_without_a_key_are_each_written(server):
+    handheld = Handheld(server).sign_in()
+    sale = {'item': 'Beer Bottle', 'quantity': 1}
+    assert handheld.post('/api/sales', sale)[0] == 201
+    assert handheld.post('/api/sales', sale)[0] == 201
+    assert counts() == (2, 0)
+
+
+def test_retried_submission_is_replayed(server):
+    handheld = Handheld(server).sign_in()
+    assert handheld.post('/api/sales', {'item': 'Beer Bottle', 'quantity': 1}, key='sale-1')[0] == 201
+    status, first, _ = handheld.post('/api/sales/submit', {}, key='submit-1')
+    assert status == 200 and first['submitted'] == 1
+    status, retry, replayed = handheld.post('/api/sales/submit', {}, key='submit-1')
+    assert (status, replayed) == (200, 'true')
+    assert retry == first
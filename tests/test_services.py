@@ -0,0 +1,118 @@
+"""The services refuse invalid input with ServiceError and leave the database unchanged."""
+import pytest
+
+from database import Session
+from models import User, InventoryItem, StaffSaleEntry, SalaryDeduction
+from services import ServiceError, cash, inventory, payroll, sales, users
+
+
+@pytest.fixture
+def session(app_database):
+    session = Session()
+    session.add_all([
+        User(username='admin', password_hash='x', role='Admin', monthly_salary=1000.0, current_salary_balance=1000.0),
+        User(username='manager', password_hash='x', role='Manager', monthly_salary=800.0,
+             current_salary_balance=800.0),
+        User(username='staff1', password_hash='x', role='Staff', monthly_salary=500.0, current_salary_balance=500.0),
+        InventoryItem(name='Beer Bottle', price_per_unit=1000.0, supply_qty=10, opening_stock=10, closing_stock=10),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def user(session, username):
+    return session.query(User).filter_by(username=username).one()
+
+
+@pytest.mark.parametrize('operation', (payroll.add_bonus, payroll.deduct_penalty, payroll.clear_debt))
+@pytest.mark.parametrize('amount', (-50.0, 'fifty', None, float('nan')))
+def test_payroll_refuses_negative_or_non_numeric_amounts(session, operation, amount):
+    staff = user(session, 'staff1')
+    with pytest.raises(ServiceError):
+        operation(session, user(session, 'manager'), staff.id, amount, "Test")
+    session.rollback()
+    assert staff.current_salary_balance == 500.0
+    assert session.query(SalaryDeduction).count() == 0
+
+
+def test_payroll_refuses_an_empty_reason(session):
+    with pytest.raises(ServiceError, match="Reason"):
+        payroll.deduct_penalty(session, user(session, 'manager'), user(session, 'staff1').id, 10.0, "")
+
+
+def test_payroll_accepts_numeric_strings(session):
+    staff = user(session, 'staff1')
+    payroll.deduct_penalty(session, user(session, 'manager'), staff.id, "25.5", "Late")
+    assert staff.current_salary_balance == 474.5
+
+
+@pytest.mark.parametrize('declared', ((-1.0, 0.0), (0.0, -1.0), ('cash', 0.0), (0.0, None)))
+def test_cash_declaration_refuses_negative_or_non_numeric_amounts(session, declared):
+    with pytest.raises(ServiceError):
+        cash.declare_staff_cash(session, user(session, 'staff1'), *declared)
+
+
+@pytest.mark.parametrize('quantity', (0, -3, 'two', None))
+def test_sale_refuses_non_positive_or_non_numeric_quantities(session, quantity):
+    with pytest.raises(ServiceError):
+        sales.record_sale(session, user(session, 'staff1'), 'Beer Bottle', quantity)
+    session.rollback()
+    assert session.query(StaffSaleEntry).count() == 0
+
+
+def test_sale_refuses_unknown_items(session):
+    with pytest.raises(ServiceError, match="not found"):
+        sales.record_sale(session, user(session, 'staff1'), 'Champagne', 1)
+
+
+@pytest.mark.parametrize('quantity', (0, -3, 'lots'))
+def test_supply_refuses_non_positive_or_non_numeric_quantities(session, quantity):
+    item = session.query(InventoryItem).one()
+    with pytest.raises(ServiceError):
+        inventory.supply_item(session, user(session, 'manager'), item.id, quantity)
+    session.rollback()
+    assert item.supply_qty == 10
+
+
+@pytest.mark.parametrize('name, price, initial_supply_qty', (
+        ('Wine Glass', -1.0, 0), ('Wine Glass', 'cheap', 0), ('Wine Glass', 2500.0, -5),
+        ('Wine Glass', 2500.0, 'some'), ('', 2500.0, 0), ('Beer Bottle', 1000.0, 0)))
+def test_add_item_refuses_invalid_input(session, name, price, initial_supply_qty):
+    with pytest.raises(ServiceError):
+        inventory.add_item(session, user(session, 'manager'), name, price, initial_supply_qty)
+    session.rollback()
+    assert session.query(InventoryItem).count() == 1
+
+
+def test_stock_count_above_available_stock_is_refused(session):
+    item = session.query(InventoryItem).one()
+    with pytest.raises(ServiceError, match="higher than available stock"):
+        inventory.save_daily_stock(session, user(session, 'manager'), {item.id: 21})  # 20 available
+    session.rollback()
+    assert (item.opening_stock, item.supply_qty, item.closing_stock) == (10, 10, 10)
+
+
+def test_users_cannot_delete_themselves(session):
+    admin = user(session, 'admin')
+    with pytest.raises(ServiceError, match="your own"):
+        users.delete_user(session, admin, admin.id)
+    assert session.query(User).filter_by(username='admin').count() == 1
+
+
+def test_the_last_admin_cannot_be_deleted(session):
+    with pytest.raises(ServiceError, match="last Admin"):
+        users.delete_user(session, user(session, 'manager'), user(session, 'admin').id)
+    assert session.query(User).filter_by(username='admin').count() == 1
+
+
+def test_an_admin_can_be_deleted_while_another_remains(session):
+    users.add_user(session, user(session, 'admin'), 'admin2', 'secret', 'Admin', 1000.0)
+    assert users.delete_user(session, user(session, 'admin2'), user(session, 'admin').id) == 'admin'
+
+
+def test_add_user_refuses_empty_or_taken_usernames(session):
+    with pytest.raises(ServiceError, match="cannot be empty"):
+        users.add_user(session, user(session, 'admin'), '', 'secret', 'Staff', 500.0)
+    with pytest.raises(ServiceError, match="already exists"):
+        users.add_user(session, user(session, 'admin'), 'staff1', 'secret', 'Staff', 500.0)
@@ -1,21 +1,31 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import traceback  # For detailed error printing
+from datetime import datetime
+from sqlalchemy import func
 from views.base_ui import BaseUI
+from views.table_binding import TableBinding
 from database import db_session
-from models import User, SalaryDeduction, AuditLog
-from helpers import log_action
+from models import User, AuditLog
+from audit_writer import audit_writer
+from audit_queries import fetch_audit_log_page, distinct_audit_values
+from report_data import salary_deductions_with_usernames
+from data_export import run_export_job
+from audit_chain import run_verify_job
+from services import ServiceError
+from services import payroll, users
 
 
 class AdminViews(BaseUI):
     def __init__(self, master, app_instance):
         super().__init__(master, app_instance)
+        self.audit_jobs = {}  # Background jobs started from the audit log screen: job id -> (done title, error title)
 
     def show_admin_users(self):
         """Displays the admin panel for managing users."""
-        self.clear_frame()
-        admin_users_frame = ttk.Frame(self.master, padding="20", style="TFrame")
-        admin_users_frame.pack(expand=True, fill="both")
+        self.show_screen('admin_users', self.build_admin_users, on_show=self.load_users)
+
+    def build_admin_users(self, admin_users_frame):
         admin_users_frame.grid_columnconfigure(0, weight=1)
         admin_users_frame.grid_rowconfigure(3, weight=1)
 
@@ -70,6 +80,10 @@ class AdminViews(BaseUI):
         self.users_tree.grid(row=3, column=0, sticky="nsew", padx=(10, 0), pady=5)
 
         self.users_tree.bind('<<TreeviewSelect>>', self.on_user_selection_change)
+        self.users_table = TableBinding(self.users_tree, key=lambda user: user.id, values=lambda user: (
+            user.id, user.username, user.role, f"₦{user.monthly_salary:.2f}",
+            f"₦{user.current_salary_balance:.2f}", "Yes" if user.is_active else "No"
+        ))
 
         buttons_frame = ttk.Frame(admin_users_frame, style="TFrame")
         buttons_frame.grid(row=4, column=0, pady=15)
@@ -84,8 +98,6 @@ class AdminViews(BaseUI):
         ttk.Button(admin_users_frame, text="Back to Dashboard", command=self.app.show_dashboard, style="TButton").grid(
             row=5, column=0, pady=20, ipadx=10, ipady=5)
 
-        self.load_users()
-
     def on_user_selection_change(self, event):
         selected_item = self.users_tree.focus()
         if selected_item:
@@ -94,15 +106,7 @@ class AdminViews(BaseUI):
             self.delete_user_button.config(state='disabled')
 
     def load_users(self):
-        for i in self.users_tree.get_children():
-            self.users_tree.delete(i)
-        users = db_session.query(User).all()
-        for user in users:
-            active_status = "Yes" if user.is_active else "No"
-            self.users_tree.insert('', 'end', values=(
-                user.id, user.username, user.role, f"₦{user.monthly_salary:.2f}",
-                f"₦{user.current_salary_balance:.2f}", active_status
-            ), iid=user.id)
+        self.users_table.refresh(db_session.query(User).order_by(User.id).all())
         self.on_user_selection_change(None)
 
     def add_user_action(self):
@@ -115,22 +119,12 @@ class AdminViews(BaseUI):
             messagebox.showerror("Input Error", "Monthly Salary must be a number.")
             return
 
-        if not username or not password:
-            messagebox.showerror("Input Error", "Username and Password cannot be empty.")
-            return
-
-        if db_session.query(User).filter_by(username=username).first():
-            messagebox.showerror("Error", "Username already exists.")
+        try:
+            self.run_service(users.add_user, username, password, role, monthly_salary)
+        except ServiceError as e:
+            messagebox.showerror("Input Error", str(e))
             return
-
-        new_user = User(username=username, role=role, monthly_salary=monthly_salary,
-                        current_salary_balance=monthly_salary)
-        new_user.set_password(password)
-        db_session.add(new_user)
-        db_session.commit()
         messagebox.showinfo("Success", f"User {username} ({role}) created successfully!")
-        log_action(self.app.current_user.username, self.app.current_user.role, 'Add User',
-                   new_value=f"Username:{username}, Role:{role}, Monthly Salary:{monthly_salary}")
         self.new_username_entry.delete(0, tk.END)
         self.new_password_entry.delete(0, tk.END)
         self.new_monthly_salary_entry.delete(0, tk.END)
@@ -143,7 +137,7 @@ class AdminViews(BaseUI):
             messagebox.showerror("Error", "Please select a user to delete.")
             return
 
-        user_id = int(self.users_tree.item(selected_item, 'iid'))
+        user_id = int(selected_item)
         user_to_delete = db_session.query(User).get(user_id)
 
         if not user_to_delete:
@@ -151,24 +145,18 @@ class AdminViews(BaseUI):
             self.load_users()
             return
 
-        if user_to_delete.id == self.app.current_user.id:
-            messagebox.showerror("Error", "You cannot delete your own active account.")
-            return
-
-        if user_to_delete.role == 'Admin' and db_session.query(User).filter_by(role='Admin').count() == 1:
-            messagebox.showerror("Deletion Error", "Cannot delete the last Admin user in the system.")
+        try:
+            users.check_user_deletable(db_session, self.app.current_user, user_to_delete)
+        except ServiceError as e:
+            messagebox.showerror("Deletion Error", str(e))
             return
 
         if messagebox.askyesno("Confirm Delete",
                                f"Are you sure you want to permanently delete user {user_to_delete.username}? This action cannot be undone and will delete all related records."):
             try:
-                db_session.delete(user_to_delete)
-                db_session.commit()
-                messagebox.showinfo("Success", f"User {user_to_delete.username} deleted successfully.")
-                log_action(self.app.current_user.username, self.app.current_user.role, 'Delete User',
-                           old_value=user_to_delete.username)
+                username = self.run_service(users.delete_user, user_id)
+                messagebox.showinfo("Success", f"User {username} deleted successfully.")
             except Exception as e:
-                db_session.rollback()
                 messagebox.showerror("Error", f"Could not delete user: {e}\n{traceback.format_exc()}")
                 print(f"Error during user deletion: {traceback.format_exc()}")
             finally:
@@ -176,9 +164,9 @@ class AdminViews(BaseUI):
 
     def show_admin_salaries(self):
         """Displays the admin panel for managing user salaries and viewing deduction history."""
-        self.clear_frame()
-        admin_salaries_frame = ttk.Frame(self.master, padding="20", style="TFrame")
-        admin_salaries_frame.pack(expand=True, fill="both")
+        self.show_screen('admin_salaries', self.build_admin_salaries, on_show=self.refresh_admin_salaries)
+
+    def build_admin_salaries(self, admin_salaries_frame):
         admin_salaries_frame.grid_columnconfigure(0, weight=1)
         admin_salaries_frame.grid_rowconfigure(3, weight=1)
         admin_salaries_frame.grid_rowconfigure(5, weight=1)
@@ -192,10 +180,7 @@ class AdminViews(BaseUI):
 
         ttk.Label(adjust_salary_frame, text="Select User:", style="TLabel").grid(row=0, column=0, sticky="w", padx=5,
                                                                                  pady=3)
-        users_for_salary = db_session.query(User).all()
-        self.salary_user_combobox = ttk.Combobox(adjust_salary_frame,
-                                                 values=[f"{u.username} (ID: {u.id})" for u in users_for_salary],
-                                                 style="TCombobox")
+        self.salary_user_combobox = ttk.Combobox(adjust_salary_frame, style="TCombobox")
         self.salary_user_combobox.grid(row=0, column=1, sticky="ew", padx=5, pady=3, ipady=2)
 
         ttk.Label(adjust_salary_frame, text="Amount (₦):", style="TLabel").grid(row=1, column=0, sticky="w", padx=5,
@@ -232,9 +217,11 @@ class AdminViews(BaseUI):
 
         balance_scroll = ttk.Scrollbar(admin_salaries_frame, orient="vertical", command=self.balance_tree.yview)
         self.balance_tree.configure(yscrollcommand=balance_scroll.set)
+        self.balance_table = TableBinding(self.balance_tree, key=lambda user: user.id, values=lambda user: (
+            user.username, user.role, f"₦{user.monthly_salary:.2f}", f"₦{user.current_salary_balance:.2f}"
+        ))
         balance_scroll.grid(row=3, column=1, sticky="ns", padx=(0, 10))
         self.balance_tree.grid(row=3, column=0, sticky="nsew", padx=(10, 0), pady=5)
-        self.load_salary_balances()
 
         ttk.Label(admin_salaries_frame, text="Deduction History", style="SectionHeader.TLabel").grid(row=4, column=0,
                                                                                                      pady=10)
@@ -251,35 +238,29 @@ class AdminViews(BaseUI):
 
         deduction_scroll = ttk.Scrollbar(admin_salaries_frame, orient="vertical", command=self.deduction_tree.yview)
         self.deduction_tree.configure(yscrollcommand=deduction_scroll.set)
+        self.deduction_table = TableBinding(self.deduction_tree, key=lambda row: row[0].id, values=lambda row: (
+            row.username, row[0].deduction_date.strftime('%Y-%m-%d'), f"₦{row[0].amount:.2f}", row[0].reason,
+            row[0].timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        ))
         deduction_scroll.grid(row=5, column=1, sticky="ns", padx=(0, 10))
         self.deduction_tree.grid(row=5, column=0, sticky="nsew", padx=(10, 0), pady=5)
-        self.load_deduction_history()
 
         ttk.Button(admin_salaries_frame, text="Back to Dashboard", command=self.app.show_dashboard,
                    style="TButton").grid(
             row=6, column=0, pady=20, ipadx=10, ipady=5)
 
+    def refresh_admin_salaries(self):
+        """Reloads the user list and both tables; unchanged rows are left alone by the table bindings."""
+        self.salary_user_combobox.config(values=[f"{u.username} (ID: {u.id})"
+                                                 for u in db_session.query(User).order_by(User.id)])
+        self.load_salary_balances()
+        self.load_deduction_history()
+
     def load_salary_balances(self):
-        for i in self.balance_tree.get_children():
-            self.balance_tree.delete(i)
-        users = db_session.query(User).all()
-        for user in users:
-            self.balance_tree.insert('', 'end', values=(
-                user.username, user.role, f"₦{user.monthly_salary:.2f}",
-                f"₦{user.current_salary_balance:.2f}"
-            ))
+        self.balance_table.refresh(db_session.query(User).order_by(User.id).all())
 
     def load_deduction_history(self):
-        for i in self.deduction_tree.get_children():
-            self.deduction_tree.delete(i)
-        deductions = db_session.query(SalaryDeduction).order_by(SalaryDeduction.timestamp.desc()).all()
-        for ded in deductions:
-            user = db_session.query(User).get(ded.user_id)
-            username = user.username if user else "N/A"
-            self.deduction_tree.insert('', 'end', values=(
-                username, ded.deduction_date.strftime('%Y-%m-%d'),
-                f"₦{ded.amount:.2f}", ded.reason, ded.timestamp.strftime('%Y-%m-%d %H:%M:%S')
-            ))
+        self.deduction_table.refresh(salary_deductions_with_usernames(db_session))
 
     def adjust_salary_action(self, action_type):
         selected_user_str = self.salary_user_combobox.get()
@@ -294,61 +275,38 @@ class AdminViews(BaseUI):
             messagebox.showerror("Input Error", "Invalid user selection format. Please select from the dropdown.")
             return
 
-        target_user = db_session.query(User).get(user_id)
-
-        if not target_user:
-            messagebox.showerror("Error", "Selected user not found.")
-            self.load_salary_balances()
-            return
-
         try:
             amount = float(self.salary_amount_entry.get())
-            if amount < 0:
-                raise ValueError("Amount cannot be negative.")
         except ValueError:
             messagebox.showerror("Input Error", "Amount must be a non-negative number.")
             return
-
         reason = self.salary_reason_entry.get()
-        if not reason:
-            messagebox.showerror("Input Error", "Reason cannot be empty.")
-            return
 
         try:
-            old_balance = target_user.current_salary_balance
             if action_type == 'add_bonus':
-                target_user.current_salary_balance += amount
+                target_user = self.run_service(payroll.add_bonus, user_id, amount, reason)
                 messagebox.showinfo("Success", f"Bonus of ₦{amount:.2f} added to {target_user.username}.")
-                log_action(self.app.current_user.username, self.app.current_user.role, 'Add Bonus',
-                           old_value=f"User:{target_user.username}, Old Balance:{old_balance}",
-                           new_value=f"New Balance:{target_user.current_salary_balance}, Reason:{reason}")
             elif action_type == 'deduct_penalty':
-                target_user.current_salary_balance -= amount
-                deduction = SalaryDeduction(user_id=target_user.id, amount=amount, reason=f"Manual Penalty: {reason}")
-                db_session.add(deduction)
+                self.run_service(payroll.deduct_penalty, user_id, amount, reason)
+                target_user = db_session.query(User).get(user_id)
                 messagebox.showinfo("Success", f"Penalty of ₦{amount:.2f} deducted from {target_user.username}.")
-                log_action(self.app.current_user.username, self.app.current_user.role, 'Deduct Penalty',
-                           old_value=f"User:{target_user.username}, Old Balance:{old_balance}",
-                           new_value=f"New Balance:{target_user.current_salary_balance}, Reason:{reason}")
             elif action_type == 'clear_debt':
-                if target_user.current_salary_balance < 0:
-                    if amount >= abs(target_user.current_salary_balance):
-                        target_user.current_salary_balance = 0.0
-                        messagebox.showinfo("Success", f"Debt for {target_user.username} fully cleared.")
-                    else:
-                        target_user.current_salary_balance += amount
-                        messagebox.showinfo("Success", f"₦{amount:.2f} reduced from {target_user.username}'s debt.")
-                    log_action(self.app.current_user.username, self.app.current_user.role, 'Clear Debt',
-                               old_value=f"User:{target_user.username}, Old Balance:{old_balance}",
-                               new_value=f"New Balance:{target_user.current_salary_balance}, Amount Cleared:{amount}, Reason:{reason}")
-                else:
+                cleared = self.run_service(payroll.clear_debt, user_id, amount, reason)
+                target_user = db_session.query(User).get(user_id)
+                if not cleared:
                     messagebox.showinfo("Info", f"{target_user.username} does not have a negative balance.")
-            db_session.commit()
+                elif target_user.current_salary_balance == 0:
+                    messagebox.showinfo("Success", f"Debt for {target_user.username} fully cleared.")
+                else:
+                    messagebox.showinfo("Success", f"₦{amount:.2f} reduced from {target_user.username}'s debt.")
             self.salary_amount_entry.delete(0, tk.END)
             self.salary_reason_entry.delete(0, tk.END)
             self.load_salary_balances()
             self.load_deduction_history()
             self.app.dashboard_view.update_user_info_label()  # Update header if current user's salary was adjusted
+        except ServiceError as e:
+            messagebox.showerror("Input Error", str(e))
+            self.load_salary_balances()
         except Exception as e:
             db_session.rollback()
             messagebox.showerror("Error", f"An error occurred during salary adjustment: {e}\n{traceback.format_exc()}")
@@ -356,14 +314,59 @@ class AdminViews(BaseUI):
 
     def show_admin_audit_logs(self):
         """Displays the audit log history for all system actions."""
-        self.clear_frame()
-        audit_logs_frame = ttk.Frame(self.master, padding="20", style="TFrame")
-        audit_logs_frame.pack(expand=True, fill="both")
+        self.show_screen('admin_audit_logs', self.build_admin_audit_logs, on_show=self.refresh_audit_logs_if_stale)
+
+    def build_admin_audit_logs(self, audit_logs_frame):
         audit_logs_frame.grid_columnconfigure(0, weight=1)
-        audit_logs_frame.grid_rowconfigure(1, weight=1)
+        audit_logs_frame.grid_rowconfigure(2, weight=1)
 
         ttk.Label(audit_logs_frame, text="Admin: Audit Logs", style="Header.TLabel").grid(row=0, column=0, pady=15)
 
+        filter_frame = ttk.LabelFrame(audit_logs_frame, text="Filter Logs", padding="10")
+        filter_frame.grid(row=1, column=0, pady=10, sticky="ew", padx=10)
+        for col in (1, 3, 5):
+            filter_frame.grid_columnconfigure(col, weight=1)
+
+        ttk.Label(filter_frame, text="User:", style="TLabel").grid(row=0, column=0, sticky="w", padx=5, pady=3)
+        self.log_user_combobox = ttk.Combobox(filter_frame, style="TCombobox")
+        self.log_user_combobox.grid(row=0, column=1, sticky="ew", padx=5, pady=3, ipady=2)
+
+        ttk.Label(filter_frame, text="Role:", style="TLabel").grid(row=0, column=2, sticky="w", padx=5, pady=3)
+        self.log_role_combobox = ttk.Combobox(filter_frame,
+                                              values=["", "Admin", "Manager", "Staff", "System", "Unknown"],
+                                              style="TCombobox", state="readonly")
+        self.log_role_combobox.grid(row=0, column=3, sticky="ew", padx=5, pady=3, ipady=2)
+
+        ttk.Label(filter_frame, text="Action Type:", style="TLabel").grid(row=0, column=4, sticky="w", padx=5, pady=3)
+        self.log_action_combobox = ttk.Combobox(filter_frame, style="TCombobox")
+        self.log_action_combobox.grid(row=0, column=5, sticky="ew", padx=5, pady=3, ipady=2)
+
+        ttk.Label(filter_frame, text="From (YYYY-MM-DD):", style="TLabel").grid(row=1, column=0, sticky="w", padx=5,
+                                                                               pady=3)
+        self.log_start_date_entry = ttk.Entry(filter_frame, style="TEntry")
+        self.log_start_date_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=3, ipady=2)
+
+        ttk.Label(filter_frame, text="To (YYYY-MM-DD):", style="TLabel").grid(row=1, column=2, sticky="w", padx=5,
+                                                                             pady=3)
+        self.log_end_date_entry = ttk.Entry(filter_frame, style="TEntry")
+        self.log_end_date_entry.grid(row=1, column=3, sticky="ew", padx=5, pady=3, ipady=2)
+
+        ttk.Label(filter_frame, text="Search:", style="TLabel").grid(row=2, column=0, sticky="w", padx=5, pady=3)
+        self.log_search_entry = ttk.Entry(filter_frame, style="TEntry")
+        self.log_search_entry.grid(row=2, column=1, columnspan=3, sticky="ew", padx=5, pady=3, ipady=2)
+        self.log_search_entry.bind('<Return>', lambda event: self.load_audit_logs())
+        ttk.Label(filter_frame, text="Words in any field, e.g. an item name or \"balance\"",
+                  style="SmallInfo.TLabel").grid(row=2, column=4, columnspan=2, sticky="w", padx=5, pady=3)
+
+        filter_buttons_frame = ttk.Frame(filter_frame, style="TFrame")
+        filter_buttons_frame.grid(row=1, column=4, columnspan=2, padx=5, pady=3)
+        ttk.Button(filter_buttons_frame, text="Apply Filters", command=self.load_audit_logs,
+                   style="TButton").pack(side="left", padx=5)
+        ttk.Button(filter_buttons_frame, text="Clear Filters", command=self.clear_audit_log_filters,
+                   style="TButton").pack(side="left", padx=5)
+        ttk.Button(filter_buttons_frame, text="Export...", command=self.export_audit_logs,
+                   style="TButton").pack(side="left", padx=5)
+
         columns = ('Timestamp', 'User', 'Role', 'Action Type', 'Old Value', 'New Value')
         self.logs_tree = ttk.Treeview(audit_logs_frame, columns=columns, show='headings')
         for col in columns:
@@ -376,23 +379,155 @@ class AdminViews(BaseUI):
         self.logs_tree.column('Old Value', width=200, stretch=True)
         self.logs_tree.column('New Value', width=200, stretch=True)
 
-        logs_scroll = ttk.Scrollbar(audit_logs_frame, orient="vertical", command=self.logs_tree.yview)
-        self.logs_tree.configure(yscrollcommand=logs_scroll.set)
-        logs_scroll.grid(row=1, column=1, sticky="ns", padx=(0, 10))
-        self.logs_tree.grid(row=1, column=0, sticky="nsew", padx=(10, 0), pady=5)
+        self.logs_scroll = ttk.Scrollbar(audit_logs_frame, orient="vertical", command=self.logs_tree.yview)
+        # Load the next page when the user scrolls to the bottom of the list
+        self.logs_tree.configure(yscrollcommand=self.on_logs_scroll)
+        self.logs_scroll.grid(row=2, column=1, sticky="ns", padx=(0, 10))
+        self.logs_tree.grid(row=2, column=0, sticky="nsew", padx=(10, 0), pady=5)
+
+        status_frame = ttk.Frame(audit_logs_frame, style="TFrame")
+        status_frame.grid(row=3, column=0, pady=5)
+        self.logs_status_label = ttk.Label(status_frame, text="", style="SmallInfo.TLabel")
+        self.logs_status_label.pack(side="left", padx=10)
+        self.load_more_logs_button = ttk.Button(status_frame, text="Load More", command=self.load_more_audit_logs,
+                                                style="TButton", state='disabled')
+        self.load_more_logs_button.pack(side="left", padx=10)
+        ttk.Button(status_frame, text="Verify Integrity", command=self.verify_audit_logs,
+                   style="TButton").pack(side="left", padx=10)
+        self.logs_newest_id = None  # Newest log id when the list was last loaded; None forces the first load
 
+        ttk.Button(audit_logs_frame, text="Back to Dashboard", command=self.app.show_dashboard, style="TButton").grid(
+            row=4, column=0, pady=20, ipadx=10, ipady=5)
+
+    def refresh_audit_logs_if_stale(self):
+        """Reloads the list (keeping the filters) only if actions were logged since it was last loaded."""
+        audit_writer.flush()
+        newest_id = db_session.query(func.max(AuditLog.id)).scalar()
+        if self.logs_newest_id is not None and newest_id == self.logs_newest_id:
+            return
+        self.log_user_combobox.config(values=[""] + ["System"] + [u.username for u in
+                                                                  db_session.query(User).order_by(User.username)])
+        self.log_action_combobox.config(values=[""] + distinct_audit_values(db_session, AuditLog.action_type))
         self.load_audit_logs()
 
-        ttk.Button(audit_logs_frame, text="Back to Dashboard", command=self.app.show_dashboard, style="TButton").grid(
-            row=2, column=0, pady=20, ipadx=10, ipady=5)
+    def clear_audit_log_filters(self):
+        self.log_user_combobox.set("")
+        self.log_role_combobox.set("")
+        self.log_action_combobox.set("")
+        self.log_start_date_entry.delete(0, tk.END)
+        self.log_end_date_entry.delete(0, tk.END)
+        self.log_search_entry.delete(0, tk.END)
+        self.load_audit_logs()
+
+    def _audit_log_filters(self):
+        """Returns the filter fields as fetch_audit_log_page arguments, or None after showing the input error."""
+        filters = {
+            'username': self.log_user_combobox.get().strip() or None,
+            'user_role': self.log_role_combobox.get() or None,
+            'action_type': self.log_action_combobox.get().strip() or None,
+            'search': self.log_search_entry.get().strip() or None,
+        }
+        try:
+            for key, entry in (('start_date', self.log_start_date_entry), ('end_date', self.log_end_date_entry)):
+                value = entry.get().strip()
+                filters[key] = datetime.strptime(value, '%Y-%m-%d').date() if value else None
+        except ValueError:
+            messagebox.showerror("Input Error", "Invalid date format. Please use YYYY-MM-DD.")
+            return None
+        return filters
 
     def load_audit_logs(self):
+        """Reloads the audit log list from the first page using the current filters."""
+        audit_writer.flush()  # Show actions that are still waiting in the write queue
+        filters = self._audit_log_filters()
+        if filters is None:
+            return
+
+        self.logs_filters = filters
+        self.logs_newest_id = db_session.query(func.max(AuditLog.id)).scalar()
+        self.logs_next_cursor = None
+        self.logs_loaded_count = 0
         for i in self.logs_tree.get_children():
             self.logs_tree.delete(i)
-        logs = db_session.query(AuditLog).order_by(AuditLog.timestamp.desc()).all()
+        self.logs_tree.yview_moveto(0)
+        self._fetch_audit_log_page(after=None)
+
+    def export_audit_logs(self):
+        """Exports every log matching the current filters to CSV or Parquet as a background job."""
+        filters = self._audit_log_filters()
+        if filters is None:
+            return
+        path = filedialog.asksaveasfilename(parent=self.master, title="Export Audit Logs", defaultextension=".csv",
+                                            initialfile="audit_logs.csv",
+                                            filetypes=[("CSV files", "*.csv"), ("Parquet files", "*.parquet")])
+        if not path:
+            return
+        audit_writer.flush()  # Include actions that are still waiting in the write queue
+        start_date, end_date = filters.pop('start_date'), filters.pop('end_date')
+        current_user = self.app.current_user
+        job = self.app.report_jobs.submit("Export Audit Logs", run_export_job, 'audit', path, start_date, end_date,
+                                          filters, current_user.username, current_user.role)
+        self._watch_audit_job(job, "Export Finished", "Export Error")
+        messagebox.showinfo("Export Started",
+                            "The logs are being exported in the background. You will be told when it is done.")
+
+    def verify_audit_logs(self):
+        """Checks the audit log hash chain as a background job; asks whether to re-check every log."""
+        full = messagebox.askyesnocancel(
+            "Verify Integrity",
+            "Re-check every log, including archived months?\n\n"
+            "Yes: full check (slow on a large log).\nNo: only the logs written since the last check.",
+            parent=self.master)
+        if full is None:
+            return
+        audit_writer.flush()  # Include actions that are still waiting in the write queue
+        current_user = self.app.current_user
+        job = self.app.report_jobs.submit("Verify Audit Logs", run_verify_job, full, current_user.username,
+                                          current_user.role)
+        self._watch_audit_job(job, "Audit Logs Intact", "Integrity Check Failed")
+
+    def _watch_audit_job(self, job, done_title, error_title):
+        self.audit_jobs[job.id] = (done_title, error_title)
+        self.app.report_jobs.add_listener(self.on_audit_job_update)
+
+    def on_audit_job_update(self, job):
+        """Report job listener (runs on the Tk thread): announces finished audit log exports and checks."""
+        if job.id not in self.audit_jobs or not job.is_finished:
+            return
+        done_title, error_title = self.audit_jobs.pop(job.id)
+        if not self.audit_jobs:
+            self.app.report_jobs.remove_listener(self.on_audit_job_update)
+        if job.state == 'done':
+            messagebox.showinfo(done_title, job.status)
+        else:
+            messagebox.showerror(error_title, f"{job.title}: {job.status}")
+
+    def load_more_audit_logs(self):
+        """Appends the next page of audit logs, if any."""
+        if self.logs_next_cursor is not None:
+            self._fetch_audit_log_page(after=self.logs_next_cursor)
+
+    def on_logs_scroll(self, first, last):
+        self.logs_scroll.set(first, last)
+        if float(last) >= 1.0 and self.logs_next_cursor is not None:
+            # Defer the query so it does not run inside Tk's scroll callback
+            cursor = self.logs_next_cursor
+            self.master.after_idle(lambda: self._fetch_audit_log_page(after=cursor))
+
+    def _fetch_audit_log_page(self, after):
+        # Ignore stale scroll events for a page that has already been loaded or a screen that has been left
+        if after != self.logs_next_cursor or not self.logs_tree.winfo_exists():
+            return
+        logs, next_cursor = fetch_audit_log_page(db_session, after=after, **self.logs_filters)
         for log in logs:
             self.logs_tree.insert('', 'end', values=(
                 log.timestamp.strftime('%Y-%m-%d %H:%M:%S'), log.username, log.user_role,
                 log.action_type, log.old_value if log.old_value else 'N/A',
                 log.new_value if log.new_value else 'N/A'
-            ))
+            ), iid=log.id)
+        self.logs_next_cursor = next_cursor
+        self.logs_loaded_count += len(logs)
+        more_text = " (scroll down for more)" if next_cursor is not None else ""
+        order_text = ", best recent matches first" if self.logs_filters['search'] else ""
+        self.logs_status_label.config(text=f"Showing {self.logs_loaded_count} log entries{order_text}{more_text}")
+        self.load_more_logs_button.config(state='!disabled' if next_cursor is not None else 'disabled')
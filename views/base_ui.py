@@ -1,15 +1,77 @@
+import time
 import tkinter as tk
 from tkinter import ttk
+from config import get_bool_setting
+from database import run_in_session, refresh_session
+from models import User
+
+# Print how long each screen switch takes (also kept in app.navigation_timings)
+LOG_NAVIGATION_TIMING = get_bool_setting('ui', 'log_navigation_timing')
 
 class BaseUI:
     def __init__(self, master, app_instance):
         self.master = master
         self.app = app_instance # Reference to the main BarAuditApp instance
 
-    def clear_frame(self):
-        """Clears all widgets from the current frame."""
+    def show_screen(self, name, build, on_show=None, layout_key=None, padding="20"):
+        """
+        Shows a screen, building its widgets only on the first visit.
+        Screens are kept alive in app.screens and hidden with pack_forget when another screen is shown;
+        on_show runs on every visit to refresh whatever data may have changed while the screen was hidden.
+        A screen whose layout depends on data (e.g. which form step is showing) passes a layout_key and is
+        rebuilt when the key changes.
+        Every visit first refreshes db_session, so the screen shows what other terminals have changed.
+        """
+        started = time.perf_counter()
+        refresh_session()
+        screen = self.app.screens.get(name)
+        if screen and (screen['layout_key'] != layout_key or not screen['frame'].winfo_exists()):
+            screen['frame'].destroy()
+            screen = None
+
+        current = self.app.screens.get(self.app.current_screen)
+        if current and current is not screen and current['frame'].winfo_exists():
+            current['frame'].pack_forget()
+
+        built = screen is None
+        if built:
+            frame = ttk.Frame(self.master, padding=padding, style="TFrame")
+            build(frame)
+            screen = {'frame': frame, 'layout_key': layout_key}
+            self.app.screens[name] = screen
+        screen['frame'].pack(expand=True, fill="both")
+        self.app.current_screen = name
+        if on_show:
+            on_show()
+
+        self.master.update_idletasks()  # Include geometry and redraw in the measurement
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.app.navigation_timings.append((name, elapsed_ms, built))
+        if LOG_NAVIGATION_TIMING:
+            print(f"Navigation to {name}: {elapsed_ms:.1f} ms ({'built' if built else 'cached'})")
+
+    def run_service(self, operation, *args, **kwargs):
+        """
+        Runs a services operation for the logged-in user as its own unit of work (database.run_in_session,
+        retried while another terminal holds the lock), then refreshes db_session so the screen re-reads
+        what changed. ServiceError and other errors reach the caller.
+        """
+        user_id = self.app.current_user.id
+
+        def unit(session):
+            return operation(session, session.get(User, user_id), *args, **kwargs)
+
+        try:
+            return run_in_session(unit)
+        finally:
+            refresh_session()
+
+    def reset_screens(self):
+        """Destroys every screen, e.g. on logout, so the next user gets screens built for their role."""
         for widget in self.master.winfo_children():
             widget.destroy()
+        self.app.screens.clear()
+        self.app.current_screen = None
 
     def setup_styles(self):
         """Configures the modern theme and styles for ttk widgets."""
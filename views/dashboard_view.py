@@ -10,10 +10,11 @@ class DashboardView(BaseUI):
 
     def show_dashboard(self):
         """Displays the main dashboard with navigation options based on user role."""
-        self.clear_frame()
+        self.show_screen('dashboard', self.build_dashboard, on_show=self.update_user_info_label, padding=0)
 
+    def build_dashboard(self, dashboard_frame):
         # Create a header bar at the top
-        self.header_frame = ttk.Frame(self.master, style="TFrame", height=60)
+        self.header_frame = ttk.Frame(dashboard_frame, style="TFrame", height=60)
         self.header_frame.pack(fill='x', side='top')
         self.header_frame.grid_propagate(False)
 
@@ -26,10 +27,9 @@ class DashboardView(BaseUI):
 
         self.user_info_label = ttk.Label(self.header_frame, text="", style="SubHeader.TLabel")
         self.user_info_label.pack(side='right', padx=20, pady=5)
-        self.update_user_info_label()
 
         # Create main content frame for dashboard options
-        self.dashboard_content_frame = ttk.Frame(self.master, padding="20", style="TFrame")
+        self.dashboard_content_frame = ttk.Frame(dashboard_frame, padding="20", style="TFrame")
         self.dashboard_content_frame.pack(expand=True, fill="both")
         self.dashboard_content_frame.grid_columnconfigure(0, weight=1)
         self.dashboard_content_frame.grid_rowconfigure(0, weight=1)
@@ -78,8 +78,5 @@ class DashboardView(BaseUI):
         log_action(self.app.current_user.username, self.app.current_user.role, 'User Logout')
         self.app.current_user = None
         messagebox.showinfo("Logout", "You have been logged out.")
-        if self.header_frame:
-            self.header_frame.destroy()
-        if self.dashboard_content_frame:
-            self.dashboard_content_frame.destroy()
+        self.reset_screens()  # The next user may have a different role, so their screens are built afresh
         self.app.login_view.create_login_ui() # Call create_login_ui on the login view instance
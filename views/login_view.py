@@ -1,20 +1,29 @@
+import math
 import tkinter as tk
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
 from views.base_ui import BaseUI # Import BaseUI for common methods
 from database import db_session # Import db_session to interact with the database
 from models import User # Import User model
 from helpers import log_action # Import logging utility
+from auth import authenticate, login_throttle
+
+LOGIN_POLL_INTERVAL_MS = 30  # How often the Tk thread checks whether the password check has finished
 
 class LoginView(BaseUI):
     def __init__(self, master, app_instance):
         super().__init__(master, app_instance)
-        self.setup_styles() # Call setup_styles from BaseUI
+        # Password hashing is deliberately slow, so it runs here instead of freezing the window
+        self.login_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Login")
+        self.login_future = None
 
     def create_login_ui(self):
-        """Creates the login user interface."""
-        self.clear_frame()
-        self.login_frame = ttk.Frame(self.master, padding="50", style="TFrame")
-        self.login_frame.pack(expand=True, fill="both")
+        """Shows the login user interface."""
+        self.show_screen('login', self.build_login_ui, on_show=self.reset_login_form, padding="50")
+
+    def build_login_ui(self, login_frame):
+        self.login_frame = login_frame
 
         # Center content using grid weights for responsiveness
         self.login_frame.grid_rowconfigure(0, weight=1)
@@ -29,7 +38,6 @@ class LoginView(BaseUI):
         username_label.grid(row=2, column=1, sticky="w", pady=5)
         self.username_entry = ttk.Entry(self.login_frame, width=35, style="TEntry")
         self.username_entry.grid(row=3, column=1, pady=5, ipady=3)
-        self.username_entry.focus_set()
 
         password_label = ttk.Label(self.login_frame, text="Password:", style="TLabel")
         password_label.grid(row=4, column=1, sticky="w", pady=5)
@@ -37,22 +45,75 @@ class LoginView(BaseUI):
         self.password_entry.grid(row=5, column=1, pady=5, ipady=3)
         self.password_entry.bind("<Return>", lambda event: self.attempt_login()) # Allow Enter key to login
 
-        login_button = ttk.Button(self.login_frame, text="Login", command=self.attempt_login, style="TButton")
-        login_button.grid(row=6, column=1, pady=25, ipadx=20, ipady=8)
+        self.login_button = ttk.Button(self.login_frame, text="Login", command=self.attempt_login, style="TButton")
+        self.login_button.grid(row=6, column=1, pady=25, ipadx=20, ipady=8)
+        # Shown in place of the button while the password is being checked
+        self.login_spinner = ttk.Progressbar(self.login_frame, mode='indeterminate', length=200)
 
         ttk.Label(self.login_frame, text="Try: admin/admin123, manager/password, staff1/password", style="SmallInfo.TLabel").grid(row=7, column=1, pady=10)
 
+    def reset_login_form(self):
+        self.username_entry.delete(0, tk.END)
+        self.password_entry.delete(0, tk.END)
+        self.username_entry.focus_set()
+
     def attempt_login(self):
-        """Authenticates user credentials and navigates to dashboard on success."""
+        """Starts checking the credentials on the login thread; _finish_login picks up the result."""
+        if self.login_future is not None:
+            return  # A check is already running
         username = self.username_entry.get()
         password = self.password_entry.get()
 
-        user = db_session.query(User).filter_by(username=username).first()
+        seconds_locked = login_throttle.seconds_locked(username)
+        if seconds_locked:
+            messagebox.showerror("Login Locked", f"Too many failed attempts for this username. "
+                                                 f"Try again in {math.ceil(seconds_locked)} seconds.")
+            return
 
-        if user and user.check_password(password) and user.is_active:
-            self.app.current_user = user # Set current_user in the main app instance
-            log_action(user.username, user.role, 'User Login')
-            self.app.show_dashboard() # Call show_dashboard on the main app instance
-        else:
-            messagebox.showerror("Login Failed", "Invalid username or password, or account is inactive.")
+        self.set_login_busy(True)
+        self.login_future = self.login_executor.submit(authenticate, username, password)
+        self.master.after(LOGIN_POLL_INTERVAL_MS, self._finish_login, username)
+
+    def _finish_login(self, username):
+        """Navigates to the dashboard on success; otherwise counts the failure towards the backoff."""
+        if not self.login_future.done():
+            self.master.after(LOGIN_POLL_INTERVAL_MS, self._finish_login, username)
+            return
+        future, self.login_future = self.login_future, None
+        self.set_login_busy(False)
+        try:
+            user_id = future.result()
+        except Exception as e:
+            messagebox.showerror("Login Error", f"Could not check the password: {e}")
+            print(f"Error during login: {traceback.format_exc()}")
+            return
+
+        if user_id is None:
+            delay = login_throttle.record_failure(username)
             log_action(username, "Unknown", 'Login Failed')
+            message = "Invalid username or password, or account is inactive."
+            if delay:
+                message += f"\n\nToo many failed attempts. Wait {math.ceil(delay)} seconds before trying again."
+            messagebox.showerror("Login Failed", message)
+            return
+
+        login_throttle.record_success(username)
+        user = db_session.query(User).get(user_id)
+        db_session.refresh(user)  # The login thread may have just rehashed the password
+        self.app.current_user = user # Set current_user in the main app instance
+        log_action(user.username, user.role, 'User Login')
+        self.app.show_dashboard() # Call show_dashboard on the main app instance
+
+    def set_login_busy(self, busy):
+        """Swaps the Login button for the spinner and locks the form while the password is checked."""
+        state = 'disabled' if busy else '!disabled'
+        self.username_entry.state([state])
+        self.password_entry.state([state])
+        if busy:
+            self.login_button.grid_remove()
+            self.login_spinner.grid(row=6, column=1, pady=25, ipady=8)
+            self.login_spinner.start(15)
+        else:
+            self.login_spinner.stop()
+            self.login_spinner.grid_remove()
+            self.login_button.grid()
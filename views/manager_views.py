@@ -1,35 +1,38 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, date
-import json  # For serializing/deserializing item_sales_snapshot
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 import os
 import traceback  # For detailed error printing
 
 from views.base_ui import BaseUI
-from database import db_session
-from models import User, InventoryItem, DailyStockEntry, StaffSaleEntry, CashRegisterEntry, SalaryDeduction
-from helpers import log_action
+from views.table_binding import TableBinding
+from database import db_session, refresh_session
+from models import User, InventoryItem, DailyStockEntry
+from report_data import item_movements_for_date
+from staff_totals import submitted_sales_total
+from services import ServiceError
+from services import cash, inventory
+from services.bulk_import import IMPORT_KINDS, run_import_job
+from data_export import EXPORT_DATASETS, run_export_job
+from reports import run_daily_report_job, run_range_report_job, report_period, REPORT_PERIODS, REPORT_RECIPIENT_EMAIL
 
-# Import ReportLab components
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
+
+# Datasets offered by "Export Data" on the reports screen; audit logs are exported from the admin's log viewer
+EXPORT_CHOICES = {EXPORT_DATASETS[key][0]: key for key in ('sales', 'cash', 'deductions', 'movements')}
+# Import types offered on the inventory screen, in the order they are usually needed for a new branch
+IMPORT_CHOICES = {'Inventory Items': 'inventory', 'Supply Deliveries': 'supplies', 'Staff Sales': 'sales'}
 
 
 class ManagerViews(BaseUI):
     def __init__(self, master, app_instance):
         super().__init__(master, app_instance)
+        self.import_job_ids = set()
 
     def show_manager_inventory(self):
         """Displays the inventory management panel for managers (and admins)."""
-        self.clear_frame()
-        manager_inventory_frame = ttk.Frame(self.master, padding="20", style="TFrame")
-        manager_inventory_frame.pack(expand=True, fill="both")
+        self.show_screen('manager_inventory', self.build_manager_inventory, on_show=self.load_inventory_items)
+
+    def build_manager_inventory(self, manager_inventory_frame):
         manager_inventory_frame.grid_columnconfigure(0, weight=1)
         manager_inventory_frame.grid_rowconfigure(3, weight=1)
 
@@ -83,12 +86,16 @@ class ManagerViews(BaseUI):
         inventory_scroll.grid(row=3, column=1, sticky="ns", padx=(0, 10))
         self.inventory_tree.grid(row=3, column=0, sticky="nsew", padx=(10, 0), pady=5)
         self.inventory_tree.bind('<<TreeviewSelect>>', self.on_inventory_selection_change)
+        self.inventory_table = TableBinding(self.inventory_tree, key=lambda item: item.id, values=lambda item: (
+            item.id, item.name, f"₦{item.price_per_unit:.2f}", item.supply_qty, item.opening_stock
+        ))
 
         buttons_frame = ttk.Frame(manager_inventory_frame, style="TFrame")
         buttons_frame.grid(row=4, column=0, pady=15)
         buttons_frame.grid_columnconfigure(0, weight=1)
         buttons_frame.grid_columnconfigure(1, weight=1)
         buttons_frame.grid_columnconfigure(2, weight=1)
+        buttons_frame.grid_columnconfigure(3, weight=1)
 
         self.edit_item_button = ttk.Button(buttons_frame, text="Edit Selected Item",
                                            command=self.edit_selected_inventory_item, style="TButton", state='disabled')
@@ -104,12 +111,13 @@ class ManagerViews(BaseUI):
                                              state='disabled')
         self.delete_item_button.grid(row=0, column=2, padx=10, ipadx=5, ipady=3)
 
+        ttk.Button(buttons_frame, text="Import CSV...", command=self.open_import_modal, style="TButton").grid(
+            row=0, column=3, padx=10, ipadx=5, ipady=3)
+
         ttk.Button(manager_inventory_frame, text="Back to Dashboard", command=self.app.show_dashboard,
                    style="TButton").grid(
             row=5, column=0, pady=20, ipadx=10, ipady=5)
 
-        self.load_inventory_items()
-
     def on_inventory_selection_change(self, event):
         selected_item = self.inventory_tree.focus()
         if selected_item:
@@ -122,13 +130,7 @@ class ManagerViews(BaseUI):
             self.delete_item_button.config(state='disabled')
 
     def load_inventory_items(self):
-        for i in self.inventory_tree.get_children():
-            self.inventory_tree.delete(i)
-        items = db_session.query(InventoryItem).all()
-        for item in items:
-            self.inventory_tree.insert('', 'end', values=(
-                item.id, item.name, f"₦{item.price_per_unit:.2f}", item.supply_qty, item.opening_stock
-            ), iid=item.id)
+        self.inventory_table.refresh(db_session.query(InventoryItem).order_by(InventoryItem.id).all())
         self.on_inventory_selection_change(None)
 
     def add_inventory_item(self):
@@ -136,29 +138,16 @@ class ManagerViews(BaseUI):
         try:
             price = float(self.new_item_price_entry.get())
             initial_supply_qty = int(self.new_item_supply_qty_entry.get())
-            if initial_supply_qty < 0:
-                messagebox.showerror("Validation Error", "Initial supply quantity cannot be negative.")
-                return
         except ValueError:
             messagebox.showerror("Input Error", "Price per unit and initial supply quantity must be valid numbers.")
             return
 
-        if not name:
-            messagebox.showerror("Input Error", "Item Name cannot be empty.")
-            return
-
-        if db_session.query(InventoryItem).filter_by(name=name).first():
-            messagebox.showerror("Error", "Item with this name already exists.")
+        try:
+            self.run_service(inventory.add_item, name, price, initial_supply_qty)
+        except ServiceError as e:
+            messagebox.showerror("Validation Error", str(e))
             return
-
-        new_item = InventoryItem(name=name, price_per_unit=price,
-                                 supply_qty=initial_supply_qty, opening_stock=initial_supply_qty,
-                                 closing_stock=initial_supply_qty)
-        db_session.add(new_item)
-        db_session.commit()
         messagebox.showinfo("Success", f"Item '{name}' added successfully with initial supply of {initial_supply_qty}!")
-        log_action(self.app.current_user.username, self.app.current_user.role, 'Add Inventory Item',
-                   new_value=f"Name:{name}, Price:{price}, Initial Supply:{initial_supply_qty}")
         self.new_item_name_entry.delete(0, tk.END)
         self.new_item_price_entry.delete(0, tk.END)
         self.new_item_price_entry.insert(0, "0.00")
@@ -173,7 +162,7 @@ class ManagerViews(BaseUI):
             messagebox.showerror("Error", "Please select an item to edit.")
             return
 
-        item_id = int(self.inventory_tree.item(selected_item, 'iid'))
+        item_id = int(selected_item)
         item_to_edit = db_session.query(InventoryItem).get(item_id)
 
         if not item_to_edit:
@@ -203,18 +192,18 @@ class ManagerViews(BaseUI):
         price_entry.grid(row=1, column=1, sticky="ew", padx=5, pady=2, ipady=2)
 
         def save_changes():
-            old_values = f"Name:{item_to_edit.name}, Price:{item_to_edit.price_per_unit}"
-            item_to_edit.name = name_entry.get()
             try:
-                item_to_edit.price_per_unit = float(price_entry.get())
+                price = float(price_entry.get())
             except ValueError:
                 messagebox.showerror("Input Error", "Price must be a number.")
                 return
 
-            db_session.commit()
+            try:
+                self.run_service(inventory.update_item, item_id, name_entry.get(), price)
+            except ServiceError as e:
+                messagebox.showerror("Error", str(e))
+                return
             messagebox.showinfo("Success", "Item updated successfully!")
-            log_action(self.app.current_user.username, self.app.current_user.role, 'Update Inventory Item',
-                       old_value=old_values, new_value=f"Name:{item_to_edit.name}, Price:{item_to_edit.price_per_unit}")
             self.load_inventory_items()
             edit_window.destroy()
 
@@ -230,6 +219,71 @@ class ManagerViews(BaseUI):
         window.destroy()
         self.on_inventory_selection_change(None)
 
+    def open_import_modal(self):
+        """Asks what kind of CSV to import and which file, then imports it as a background job."""
+        import_window = tk.Toplevel(self.master)
+        import_window.title("Import CSV")
+        import_window.transient(self.master)
+        import_window.grab_set()
+        import_window.protocol("WM_DELETE_WINDOW", lambda: self._on_modal_close_inventory(import_window))
+
+        import_frame = ttk.Frame(import_window, padding="20", style="TFrame")
+        import_frame.pack(expand=True, fill="both")
+
+        ttk.Label(import_frame, text="Import Type:", style="TLabel").grid(row=0, column=0, sticky="w", padx=5, pady=2)
+        kind_combobox = ttk.Combobox(import_frame, values=list(IMPORT_CHOICES), state="readonly", width=20)
+        kind_combobox.set(next(iter(IMPORT_CHOICES)))
+        kind_combobox.grid(row=0, column=1, sticky="ew", padx=5, pady=2)
+        columns_label = ttk.Label(import_frame, style="SmallInfo.TLabel", wraplength=350, justify="left")
+        columns_label.grid(row=1, column=0, columnspan=2, sticky="w", padx=5, pady=5)
+
+        def show_columns(event=None):
+            importer = IMPORT_KINDS[IMPORT_CHOICES[kind_combobox.get()]]
+            text = f"Required columns: {', '.join(importer.required)}"
+            if importer.optional:
+                text += f"\nOptional columns: {', '.join(importer.optional)}"
+            columns_label.config(text=text)
+
+        kind_combobox.bind('<<ComboboxSelected>>', show_columns)
+        show_columns()
+
+        def choose_file():
+            path = filedialog.askopenfilename(parent=import_window, title="Choose a CSV file",
+                                              filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+            if not path:
+                return
+            label = kind_combobox.get()
+            job = self.app.report_jobs.submit(f"Import {label} from {os.path.basename(path)}", run_import_job,
+                                              IMPORT_CHOICES[label], path, self.app.current_user.id)
+            self.import_job_ids.add(job.id)
+            self.app.report_jobs.add_listener(self.on_import_job_update)
+            self._on_modal_close_inventory(import_window)
+            messagebox.showinfo("Import Started",
+                                "The file is being imported in the background. You will be told when it is done.")
+
+        button_frame = ttk.Frame(import_frame, style="TFrame")
+        button_frame.grid(row=2, column=0, columnspan=2, pady=10)
+        ttk.Button(button_frame, text="Choose File...", command=choose_file, style="TButton").pack(side="left", padx=5)
+        ttk.Button(button_frame, text="Cancel", command=lambda: self._on_modal_close_inventory(import_window),
+                   style="TButton").pack(side="left", padx=5)
+
+    def on_import_job_update(self, job):
+        """Report job listener (runs on the Tk thread): announces finished imports and reloads the inventory."""
+        if job.id not in self.import_job_ids or not job.is_finished:
+            return
+        self.import_job_ids.discard(job.id)
+        if not self.import_job_ids:
+            self.app.report_jobs.remove_listener(self.on_import_job_update)
+        if job.state == 'done':
+            messagebox.showinfo("Import Finished", job.status)
+        elif job.state == 'cancelled':
+            messagebox.showinfo("Import Cancelled", f"{job.title} was cancelled. Batches already saved stay imported.")
+        else:
+            messagebox.showerror("Import Error", f"{job.title}: {job.status}")
+        refresh_session()  # The import wrote through its own session
+        if hasattr(self, 'inventory_tree') and self.inventory_tree.winfo_exists():
+            self.load_inventory_items()
+
     def edit_selected_inventory_item(self):
         self.open_edit_inventory_modal()
 
@@ -240,7 +294,7 @@ class ManagerViews(BaseUI):
             messagebox.showerror("Error", "Please select an item to supply.")
             return
 
-        item_id = int(self.inventory_tree.item(selected_item, 'iid'))
+        item_id = int(selected_item)
         item_to_supply = db_session.query(InventoryItem).get(item_id)
 
         if not item_to_supply:
@@ -266,25 +320,12 @@ class ManagerViews(BaseUI):
         def perform_supply():
             try:
                 qty = int(supply_qty_entry.get())
-                if qty <= 0:
-                    raise ValueError("Quantity must be positive.")
-            except ValueError:
+                item = self.run_service(inventory.supply_item, item_id, qty)
+            except (ValueError, ServiceError):
                 messagebox.showerror("Input Error", "Please enter a valid positive number for quantity.")
                 return
 
-            old_supply_qty = item_to_supply.supply_qty
-            old_opening_stock = item_to_supply.opening_stock
-            old_closing_stock = item_to_supply.closing_stock
-
-            item_to_supply.supply_qty += qty
-            item_to_supply.opening_stock += qty
-            item_to_supply.closing_stock += qty
-
-            db_session.commit()
-            messagebox.showinfo("Success", f"Successfully supplied {qty} of {item_to_supply.name}.")
-            log_action(self.app.current_user.username, self.app.current_user.role, 'Supply Inventory Item',
-                       old_value=f"Item:{item_to_supply.name}, Old Supply:{old_supply_qty}, Old Opening:{old_opening_stock}, Old Closing:{old_closing_stock}",
-                       new_value=f"New Supply:{item_to_supply.supply_qty}, New Opening:{item_to_supply.opening_stock}, New Closing:{item_to_supply.closing_stock}")
+            messagebox.showinfo("Success", f"Successfully supplied {qty} of {item.name}.")
             self.load_inventory_items()
             supply_window.destroy()
             self.on_inventory_selection_change(None)
@@ -301,7 +342,7 @@ class ManagerViews(BaseUI):
             messagebox.showerror("Error", "Please select an item to delete.")
             return
 
-        item_id = int(self.inventory_tree.item(selected_item, 'iid'))
+        item_id = int(selected_item)
         item_to_delete = db_session.query(InventoryItem).get(item_id)
 
         if not item_to_delete:
@@ -312,13 +353,9 @@ class ManagerViews(BaseUI):
         if messagebox.askyesno("Confirm Delete",
                                f"Are you sure you want to delete item {item_to_delete.name}? This cannot be undone."):
             try:
-                db_session.delete(item_to_delete)
-                db_session.commit()
-                messagebox.showinfo("Success", f"Item {item_to_delete.name} deleted.")
-                log_action(self.app.current_user.username, self.app.current_user.role, 'Delete Inventory Item',
-                           old_value=item_to_delete.name)
+                name = self.run_service(inventory.delete_item, item_id)
+                messagebox.showinfo("Success", f"Item {name} deleted.")
             except Exception as e:
-                db_session.rollback()
                 messagebox.showerror("Error", f"Could not delete item: {e}\n{traceback.format_exc()}")
                 print(f"Error during item deletion: {traceback.format_exc()}")
             finally:
@@ -326,9 +363,35 @@ class ManagerViews(BaseUI):
 
     def show_manager_daily_stock(self):
         """Displays the manager's daily stock and sales entry panel."""
-        self.clear_frame()
-        daily_stock_frame = ttk.Frame(self.master, padding="20", style="TFrame")
-        daily_stock_frame.pack(expand=True, fill="both")
+        self.show_screen('manager_daily_stock', self.build_manager_daily_stock,
+                         on_show=self.warn_skipped_daily_stock_entries, layout_key=self.daily_stock_layout_key())
+
+    def daily_stock_layout_key(self):
+        """
+        Everything the daily stock form is built from: today's entry step, the stock figures in its labels
+        and the staff sales total. The cached form is reused until one of these changes.
+        """
+        today = date.today()
+        daily_entry = db_session.query(DailyStockEntry).filter_by(manager_id=self.app.current_user.id,
+                                                                  entry_date=today).first()
+        entry_state = None
+        if daily_entry:
+            entry_state = (daily_entry.id, bool(daily_entry.item_sales_snapshot), daily_entry.is_finalized,
+                           daily_entry.total_pos_cash_declared)
+        items = tuple(db_session.query(InventoryItem.id, InventoryItem.name, InventoryItem.opening_stock,
+                                       InventoryItem.supply_qty).order_by(InventoryItem.id))
+        return today, entry_state, items, submitted_sales_total(db_session, today)
+
+    def warn_skipped_daily_stock_entries(self):
+        today = date.today()
+        last_daily_entry = db_session.query(DailyStockEntry).filter_by(manager_id=self.app.current_user.id).order_by(
+            DailyStockEntry.entry_date.desc()).first()
+        if last_daily_entry and (today - last_daily_entry.entry_date).days > 1:
+            skipped_days = (today - last_daily_entry.entry_date).days - 1
+            messagebox.showwarning("Warning",
+                                   f"It appears you have skipped {skipped_days} daily stock entr{'y' if skipped_days == 1 else 'ies'}. Please ensure all previous days are recorded if necessary.")
+
+    def build_manager_daily_stock(self, daily_stock_frame):
         daily_stock_frame.grid_columnconfigure(0, weight=1)
         daily_stock_frame.grid_rowconfigure(2, weight=1)
 
@@ -342,13 +405,6 @@ class ManagerViews(BaseUI):
         daily_entry = db_session.query(DailyStockEntry).filter_by(manager_id=self.app.current_user.id,
                                                                   entry_date=today).first()
 
-        last_daily_entry = db_session.query(DailyStockEntry).filter_by(manager_id=self.app.current_user.id).order_by(
-            DailyStockEntry.entry_date.desc()).first()
-        if last_daily_entry and (today - last_daily_entry.entry_date).days > 1:
-            skipped_days = (today - last_daily_entry.entry_date).days - 1
-            messagebox.showwarning("Warning",
-                                   f"It appears you have skipped {skipped_days} daily stock entr{'y' if skipped_days == 1 else 'ies'}. Please ensure all previous days are recorded if necessary.")
-
         stock_entry_content_frame = ttk.Frame(daily_stock_frame, style="TFrame")
         stock_entry_content_frame.grid(row=2, column=0, expand=True, fill="both", padx=10, pady=10)
         stock_entry_content_frame.grid_columnconfigure(0, weight=1)
@@ -359,6 +415,9 @@ class ManagerViews(BaseUI):
             closing_stock_frame.grid_columnconfigure(1, weight=1)
 
             inventory_items = db_session.query(InventoryItem).all()
+            saved_movements = {}
+            if daily_entry and daily_entry.item_sales_snapshot:
+                saved_movements = {m.item_name: m for m in item_movements_for_date(db_session, today)}
             self.closing_stock_entries = {}
             for i, item in enumerate(inventory_items):
                 closing_stock_frame.grid_rowconfigure(i, weight=0)
@@ -367,17 +426,12 @@ class ManagerViews(BaseUI):
                           style="TLabel").grid(row=i, column=0, sticky="w", padx=5, pady=3)
                 entry = ttk.Entry(closing_stock_frame, style="TEntry")
 
-                if daily_entry and daily_entry.item_sales_snapshot:
-                    try:
-                        snapshot_data = json.loads(daily_entry.item_sales_snapshot)
-                        if item.name in snapshot_data:
-                            entry.insert(0, str(snapshot_data[item.name].get('closing_stock', '')))
-                        else:
-                            entry.insert(0, str(item.opening_stock))
-                        entry.config(state='readonly')
-                    except json.JSONDecodeError:
+                if saved_movements:
+                    if item.name in saved_movements:
+                        entry.insert(0, str(saved_movements[item.name].closing_stock))
+                    else:
                         entry.insert(0, str(item.opening_stock))
-                        entry.config(state='!readonly')
+                    entry.config(state='readonly')
                 else:
                     entry.insert(0, str(item.opening_stock))
                     entry.config(state='!readonly')
@@ -396,9 +450,7 @@ class ManagerViews(BaseUI):
                 pos_cash_frame.grid(row=1, column=0, pady=10, sticky="ew", padx=10)
                 pos_cash_frame.grid_columnconfigure(0, weight=1)
 
-                staff_sales_today = db_session.query(StaffSaleEntry).filter(StaffSaleEntry.entry_date == today,
-                                                                            StaffSaleEntry.is_submitted == True).all()
-                total_system_sales_from_staff = sum(sale.total_cost for sale in staff_sales_today)
+                total_system_sales_from_staff = submitted_sales_total(db_session, today)
 
                 ttk.Label(pos_cash_frame, text=f"Total System Sales from Staff: ₦{total_system_sales_from_staff:.2f}",
                           style="Info.TLabel").pack(pady=5)
@@ -446,71 +498,28 @@ class ManagerViews(BaseUI):
 
     def save_daily_stock(self):
         """Saves the entered closing stock and calculates expected sales."""
-        today = date.today()
-        current_user = self.app.current_user
-        daily_entry = db_session.query(DailyStockEntry).filter_by(manager_id=current_user.id, entry_date=today).first()
-        inventory_items = db_session.query(InventoryItem).all()
-
         closing_stocks_data = {}
         for item_id, entry_widget in self.closing_stock_entries.items():
             try:
-                closing_stock = int(entry_widget.get())
-                if closing_stock < 0:
-                    messagebox.showerror("Validation Error", f"Closing stock for item ID {item_id} cannot be negative.")
-                    return
-                closing_stocks_data[item_id] = closing_stock
+                closing_stocks_data[item_id] = int(entry_widget.get())
             except ValueError:
                 messagebox.showerror("Input Error",
                                      f"Invalid closing stock for item ID {item_id}. Please enter a number.")
                 return
 
-        calculated_total_sales_expected = 0.0
-        item_sales_details = {}
-
-        for item in inventory_items:
-            current_item = db_session.query(InventoryItem).get(item.id)
-            if not current_item: continue
-
-            closing_stock = closing_stocks_data.get(current_item.id, current_item.closing_stock)
-
-            quantity_sold = current_item.opening_stock + current_item.supply_qty - closing_stock
-            if quantity_sold < 0:
-                messagebox.showerror("Validation Error",
-                                     f"Closing stock for {current_item.name} ({closing_stock}) is higher than available stock ({current_item.opening_stock + current_item.supply_qty}). Cannot proceed.")
-                return
-
-            item_sales_details[current_item.name] = {
-                'opening_stock': current_item.opening_stock,
-                'supply_qty': current_item.supply_qty,
-                'closing_stock': closing_stock,
-                'quantity_sold': quantity_sold,
-                'price_per_unit': current_item.price_per_unit,
-                'profit': quantity_sold * current_item.price_per_unit
-            }
-            calculated_total_sales_expected += (quantity_sold * current_item.price_per_unit)
-
-            current_item.opening_stock = closing_stock
-            current_item.closing_stock = closing_stock
-            current_item.supply_qty = 0
-
-        if not daily_entry:
-            daily_entry = DailyStockEntry(manager_id=current_user.id, entry_date=today)
-            db_session.add(daily_entry)
-            log_action(current_user.username, current_user.role, 'Created Daily Stock Entry', new_value=f"Date:{today}")
-
-        daily_entry.total_sales_expected = calculated_total_sales_expected
-        daily_entry.item_sales_snapshot = json.dumps(item_sales_details)
-
-        db_session.commit()
+        try:
+            self.run_service(inventory.save_daily_stock, closing_stocks_data)
+        except ServiceError as e:
+            messagebox.showerror("Validation Error", str(e))
+            return
         messagebox.showinfo("Success", "Daily stock entry saved successfully. Now proceed to enter POS and Cash.")
         self.show_manager_daily_stock()
 
     def submit_pos_cash(self):
         """Submits the manager's POS and cash declaration, calculates mismatch, and applies deductions."""
         today = date.today()
-        current_user = self.app.current_user
-
-        daily_entry = db_session.query(DailyStockEntry).filter_by(manager_id=current_user.id, entry_date=today).first()
+        daily_entry = db_session.query(DailyStockEntry).filter_by(manager_id=self.app.current_user.id,
+                                                                  entry_date=today).first()
         if not daily_entry or not daily_entry.item_sales_snapshot:
             messagebox.showerror("Error", "Please save daily stock entries first.")
             return
@@ -524,309 +533,211 @@ class ManagerViews(BaseUI):
             messagebox.showerror("Input Error", "Declared Cash and POS must be numbers.")
             return
 
-        staff_sales_today = db_session.query(StaffSaleEntry).filter(StaffSaleEntry.entry_date == today,
-                                                                    StaffSaleEntry.is_submitted == True).all()
-        total_system_sales_from_staff = sum(sale.total_cost for sale in staff_sales_today)
-
         if not messagebox.askyesno("Confirm Submission",
                                    "Are you sure you want to finalize today's POS and Cash declaration? This cannot be changed later."):
             return
 
-        manager_cash_entry = db_session.query(CashRegisterEntry).filter_by(user_id=current_user.id,
-                                                                           entry_date=today).first()
-        if not manager_cash_entry:
-            manager_cash_entry = CashRegisterEntry(user_id=current_user.id, entry_date=today)
-            db_session.add(manager_cash_entry)
-
-        total_declared = declared_cash + declared_pos
-        manager_cash_entry.system_total_sales = total_system_sales_from_staff
-        manager_cash_entry.declared_cash = declared_cash
-        manager_cash_entry.declared_pos = declared_pos
-        manager_cash_entry.is_finalized = True
-
-        mismatch = total_declared - manager_cash_entry.system_total_sales
-        deduction = 0.0
-
-        if mismatch != 0:
-            deduction = abs(mismatch)
-            manager_cash_entry.mismatch_amount = mismatch
-            manager_cash_entry.deduction_amount = deduction
-
-            old_balance = current_user.current_salary_balance
-            current_user.current_salary_balance -= deduction
-            db_session.add(SalaryDeduction(
-                user_id=current_user.id,
-                amount=deduction,
-                reason=f"Manager POS/Cash Mismatch for {today}. Expected: ₦{manager_cash_entry.system_total_sales:.2f}, Declared: ₦{total_declared:.2f}"
-            ))
+        try:
+            daily_entry = self.run_service(cash.declare_manager_cash, declared_cash, declared_pos,
+                                           entry_date=today)
+        except ServiceError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if daily_entry.deduction_amount:
             messagebox.showwarning("Mismatch Detected",
-                                   f"Mismatch: ₦{mismatch:.2f}. ₦{deduction:.2f} deducted from your salary.")
-            log_action(current_user.username, current_user.role, 'Manager Cash/POS Mismatch Deduction',
-                       old_value=f"Old Balance:{old_balance}",
-                       new_value=f"New Balance:{current_user.current_salary_balance}, Deduction:{deduction}")
+                                   f"Mismatch: ₦{daily_entry.mismatch_amount:.2f}. "
+                                   f"₦{daily_entry.deduction_amount:.2f} deducted from your salary.")
         else:
             messagebox.showinfo("Success", "POS and Cash balance tally. No deduction.")
 
-        daily_entry.total_pos_cash_declared = total_declared
-        daily_entry.mismatch_amount = mismatch
-        daily_entry.deduction_amount = deduction
-        daily_entry.is_finalized = True
-
-        db_session.commit()
         self.app.dashboard_view.update_user_info_label()
         self.show_manager_daily_stock()
 
     def show_manager_reports(self):
         """Displays the manager's report generation panel."""
-        self.clear_frame()
-        reports_frame = ttk.Frame(self.master, padding="20", style="TFrame")
-        reports_frame.pack(expand=True, fill="both")
+        self.show_screen('manager_reports', self.build_manager_reports)
+
+    def build_manager_reports(self, reports_frame):
         reports_frame.grid_columnconfigure(0, weight=1)
+        reports_frame.grid_rowconfigure(6, weight=1)
 
         ttk.Label(reports_frame, text="Manager: Generate Reports", style="Header.TLabel").grid(row=0, column=0, pady=15)
 
-        ttk.Label(reports_frame, text="Select Date for Report:", style="TLabel").grid(row=1, column=0, pady=5)
-        self.report_date_entry = ttk.Entry(reports_frame, style="TEntry")
+        options_frame = ttk.Frame(reports_frame, style="TFrame")
+        options_frame.grid(row=1, column=0, pady=5)
+        ttk.Label(options_frame, text="Report Period:", style="TLabel").grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.report_period_combobox = ttk.Combobox(options_frame, values=list(REPORT_PERIODS), state="readonly",
+                                                   width=15)
+        self.report_period_combobox.set(REPORT_PERIODS[0])
+        self.report_period_combobox.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        self.report_period_combobox.bind('<<ComboboxSelected>>', lambda event: self.update_report_period_fields())
+
+        ttk.Label(options_frame, text="Date (or Start Date):", style="TLabel").grid(row=1, column=0, padx=5, pady=5,
+                                                                                   sticky="w")
+        self.report_date_entry = ttk.Entry(options_frame, style="TEntry")
         self.report_date_entry.insert(0, date.today().strftime('%Y-%m-%d'))
-        self.report_date_entry.grid(row=2, column=0, pady=5, ipady=2, sticky="ew", padx=100)
-        ttk.Label(reports_frame, text="(Format:YYYY-MM-DD)", style="SmallInfo.TLabel").grid(row=3, column=0, pady=2)
-
-        ttk.Button(reports_frame, text="Generate & Email Report", command=self.generate_and_email_report,
-                   style="TButton").grid(row=4, column=0, pady=15, ipadx=10, ipady=5)
-
-        ttk.Label(reports_frame, text="""
+        self.report_date_entry.grid(row=1, column=1, padx=5, pady=5, ipady=2, sticky="ew")
+
+        ttk.Label(options_frame, text="End Date (Custom Range):", style="TLabel").grid(row=2, column=0, padx=5, pady=5,
+                                                                                      sticky="w")
+        self.report_end_date_entry = ttk.Entry(options_frame, style="TEntry")
+        self.report_end_date_entry.insert(0, date.today().strftime('%Y-%m-%d'))
+        self.report_end_date_entry.grid(row=2, column=1, padx=5, pady=5, ipady=2, sticky="ew")
+        self.update_report_period_fields()
+        ttk.Label(reports_frame, text="(Format:YYYY-MM-DD. Weekly reports run Monday to Sunday around the date; "
+                                      "monthly reports cover its calendar month.)",
+                  style="SmallInfo.TLabel").grid(row=3, column=0, pady=2)
+
+        actions_frame = ttk.Frame(reports_frame, style="TFrame")
+        actions_frame.grid(row=4, column=0, pady=15)
+        ttk.Button(actions_frame, text="Generate & Email Report", command=self.generate_and_email_report,
+                   style="TButton").grid(row=0, column=0, padx=(0, 40), ipadx=10, ipady=5)
+        ttk.Label(actions_frame, text="Export Data:", style="TLabel").grid(row=0, column=1, padx=5)
+        self.export_dataset_combobox = ttk.Combobox(actions_frame, values=list(EXPORT_CHOICES), state="readonly",
+                                                    width=18)
+        self.export_dataset_combobox.set(next(iter(EXPORT_CHOICES)))
+        self.export_dataset_combobox.grid(row=0, column=2, padx=5)
+        ttk.Button(actions_frame, text="Export...", command=self.export_report_data, style="TButton").grid(
+            row=0, column=3, padx=5, ipadx=5, ipady=5)
+
+        ttk.Label(reports_frame, text="Report Jobs", style="SectionHeader.TLabel").grid(row=5, column=0, pady=5)
+
+        jobs_frame = ttk.Frame(reports_frame, style="TFrame")
+        jobs_frame.grid(row=6, column=0, sticky="nsew", padx=100)
+        jobs_frame.grid_columnconfigure(0, weight=1)
+        jobs_frame.grid_rowconfigure(0, weight=1)
+
+        job_columns = ('Report', 'Progress', 'Status')
+        self.report_jobs_tree = ttk.Treeview(jobs_frame, columns=job_columns, show='headings', height=5)
+        for col in job_columns:
+            self.report_jobs_tree.heading(col, text=col)
+            self.report_jobs_tree.column(col, anchor='center')
+        self.report_jobs_tree.column('Report', width=300, stretch=False)
+        self.report_jobs_tree.column('Progress', width=80, stretch=False)
+        self.report_jobs_tree.column('Status', width=400, stretch=True)
+        jobs_scroll = ttk.Scrollbar(jobs_frame, orient="vertical", command=self.report_jobs_tree.yview)
+        self.report_jobs_tree.configure(yscrollcommand=jobs_scroll.set)
+        jobs_scroll.grid(row=0, column=1, sticky="ns")
+        self.report_jobs_tree.grid(row=0, column=0, sticky="nsew", pady=5)
+        self.report_jobs_tree.bind('<<TreeviewSelect>>', lambda event: self.update_report_job_controls())
+
+        self.report_progress_bar = ttk.Progressbar(jobs_frame, orient="horizontal", mode="determinate", maximum=100)
+        self.report_progress_bar.grid(row=1, column=0, columnspan=2, sticky="ew", pady=5)
+
+        self.cancel_report_button = ttk.Button(jobs_frame, text="Cancel Selected Report",
+                                               command=self.cancel_selected_report_job, style="Danger.TButton",
+                                               state='disabled')
+        self.cancel_report_button.grid(row=2, column=0, columnspan=2, pady=5, ipadx=5, ipady=3)
+
+        for job in self.app.report_jobs.jobs:
+            self.on_report_job_update(job)
+        self.app.report_jobs.add_listener(self.on_report_job_update)
+
+        ttk.Label(reports_frame, text=f"""
         Report Generation Notes:
-        - Reports are generated in PDF format.
-        - The generated report will be automatically emailed to 'paulwillie27@gmail.com'.
-        - Important: You MUST configure your email sending credentials in this Python script (sender_email and sender_password variables) for email functionality to work.
+        - Reports are generated in PDF format in the background; you can keep using the app while they render and send.
+        - The generated report is placed in the email outbox for '{REPORT_RECIPIENT_EMAIL}'. If the internet is down, it is sent automatically once the connection is back, even after a restart.
+        - Important: You MUST configure the [smtp] section of bar_audit.ini (sender, username and password) for email functionality to work.
         - The PDF report is saved locally temporarily and then deleted after emailing.
-        """, justify="left", style="TLabel", wraplength=900).grid(row=5, column=0, pady=20, sticky="ew", padx=100)
+        """, justify="left", style="TLabel", wraplength=900).grid(row=7, column=0, pady=10, sticky="ew", padx=100)
 
         ttk.Button(reports_frame, text="Back to Dashboard", command=self.app.show_dashboard, style="TButton").grid(
-            row=6, column=0,
+            row=8, column=0,
             pady=20,
             ipadx=10,
             ipady=5)
 
-    def generate_and_email_report(self):
-        """Generates a PDF report for the selected date and attempts to email it."""
-        report_date_str = self.report_date_entry.get()
+    def update_report_period_fields(self):
+        """Only the Custom Range period uses the end date."""
+        if self.report_period_combobox.get() == 'Custom Range':
+            self.report_end_date_entry.config(state='normal')
+        else:
+            self.report_end_date_entry.config(state='disabled')
+
+    def _selected_report_period(self):
+        """Returns (period, start_date, end_date) for the period fields, or None after showing the input error."""
+        period = self.report_period_combobox.get()
         try:
-            report_date_obj = datetime.strptime(report_date_str, '%Y-%m-%d').date()
+            report_date_obj = datetime.strptime(self.report_date_entry.get(), '%Y-%m-%d').date()
+            end_date_obj = None
+            if period == 'Custom Range':
+                end_date_obj = datetime.strptime(self.report_end_date_entry.get(), '%Y-%m-%d').date()
         except ValueError:
             messagebox.showerror("Input Error", "Invalid date format. Please use YYYY-MM-DD.")
-            return
-
-        daily_entry = db_session.query(DailyStockEntry).filter_by(entry_date=report_date_obj).first()
-        staff_sales_for_day = db_session.query(StaffSaleEntry).filter_by(entry_date=report_date_obj).all()
-        cash_register_entries_for_day = db_session.query(CashRegisterEntry).filter_by(entry_date=report_date_obj).all()
-        salary_deductions_for_day = db_session.query(SalaryDeduction).filter(
-            SalaryDeduction.deduction_date == report_date_obj,
-            SalaryDeduction.user_id == self.app.current_user.id
-        ).all()
-
-        report_filename = f"Bar_Audit_Report_{report_date_str}.pdf"
-        doc = SimpleDocTemplate(report_filename, pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
+            return None
+        try:
+            start_date, end_date = report_period(period, report_date_obj, end_date_obj)
+        except ValueError as e:
+            messagebox.showerror("Input Error", str(e))
+            return None
+        return period, start_date, end_date
 
-        story.append(Paragraph(f"<h2>Bar Audit Daily Report - {report_date_str}</h2>", styles['h2']))
-        story.append(Spacer(1, 0.2 * 10))
+    def generate_and_email_report(self):
+        """Queues a background job that generates a PDF report for the selected period and emails it."""
+        selected = self._selected_report_period()
+        if not selected:
+            return
+        period, start_date, end_date = selected
 
-        if daily_entry:
-            story.append(Paragraph("<h3>Daily Stock Summary:</h3>", styles['h3']))
-            data = [['Metric', 'Value']]
-            data.append(['Expected Sales from Stock Movement', f"₦{daily_entry.total_sales_expected:.2f}"])
-            data.append(['Declared POS + Cash', f"₦{daily_entry.total_pos_cash_declared:.2f}"])
-            data.append(['Mismatch Amount', f"₦{daily_entry.mismatch_amount:.2f}"])
-            data.append(['Deduction Amount', f"₦{daily_entry.deduction_amount:.2f}"])
-
-            table = Table(data, colWidths=[200, 200])
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(table)
-            story.append(Spacer(1, 0.2 * 10))
-
-            if daily_entry.item_sales_snapshot:
-                try:
-                    item_sales_details = json.loads(daily_entry.item_sales_snapshot)
-                    story.append(Paragraph("<h3>Inventory Movement:</h3>", styles['h3']))
-                    item_data = [
-                        ['Item Name', 'Opening Stock', 'Closing Stock', 'Qty Sold', 'Price/Unit', 'Total Sales']]
-                    sorted_item_names = sorted(item_sales_details.keys())
-                    for item_name in sorted_item_names:
-                        details = item_sales_details[item_name]
-                        item_data.append([
-                            item_name,
-                            details.get('opening_stock', 0),
-                            details.get('closing_stock', 0),
-                            details.get('quantity_sold', 0),
-                            f"₦{details.get('price_per_unit', 0):.2f}",
-                            f"₦{details.get('profit', 0):.2f}"
-                        ])
-                    item_table = Table(item_data, colWidths=[100, 80, 80, 60, 60, 80])
-                    item_table.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-                    ]))
-                    story.append(item_table)
-                    story.append(Spacer(1, 0.2 * 10))
-                except json.JSONDecodeError:
-                    story.append(Paragraph("<i>Error loading item sales snapshot.</i>", styles['Normal']))
-                    story.append(Spacer(1, 0.2 * 10))
-        else:
-            story.append(Paragraph(f"No Daily Stock Entry found for {report_date_str}.", styles['Normal']))
-            story.append(Spacer(1, 0.2 * 10))
-
-        if staff_sales_for_day:
-            story.append(Paragraph("<h3>Staff Sales Entries:</h3>", styles['h3']))
-            sales_data = [['Staff', 'Item', 'Quantity', 'Price/Unit', 'Total Cost']]
-            sorted_staff_sales = sorted(staff_sales_for_day, key=lambda s: (
-            db_session.query(User).get(s.staff_id).username if db_session.query(User).get(s.staff_id) else 'Unknown',
-            s.item_name))
-            for sale in sorted_staff_sales:
-                staff_user = db_session.query(User).get(sale.staff_id)
-                staff_name = staff_user.username if staff_user else 'Unknown'
-                sales_data.append([
-                    staff_name,
-                    sale.item_name,
-                    sale.quantity,
-                    f"₦{sale.price_per_unit:.2f}",
-                    f"₦{sale.total_cost:.2f}"
-                ])
-            sales_table = Table(sales_data, colWidths=[100, 100, 60, 80, 80])
-            sales_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(sales_table)
-            story.append(Spacer(1, 0.2 * 10))
+        current_user = self.app.current_user
+        if period == 'Daily':
+            job = self.app.report_jobs.submit(f"Daily Report {start_date.strftime('%Y-%m-%d')}", run_daily_report_job,
+                                              start_date, current_user.id, current_user.username, current_user.role)
         else:
-            story.append(Paragraph(f"No Staff Sales Entries found for {report_date_str}.", styles['Normal']))
-            story.append(Spacer(1, 0.2 * 10))
-
-        if cash_register_entries_for_day:
-            story.append(Paragraph("<h3>Cash Register Declarations:</h3>", styles['h3']))
-            cash_data = [['User', 'Declared Cash', 'Declared POS', 'System Total', 'Mismatch', 'Deduction']]
-            sorted_cash_entries = sorted(cash_register_entries_for_day, key=lambda c: (
-                db_session.query(User).get(c.user_id).username if db_session.query(User).get(c.user_id) else 'Unknown'))
-            for entry in sorted_cash_entries:
-                declaring_user = db_session.query(User).get(entry.user_id)
-                user_name = declaring_user.username if declaring_user else 'Unknown'
-                cash_data.append([
-                    user_name,
-                    f"₦{entry.declared_cash:.2f}",
-                    f"₦{entry.declared_pos:.2f}",
-                    f"₦{entry.system_total_sales:.2f}",
-                    f"₦{entry.mismatch_amount:.2f}",
-                    f"₦{entry.deduction_amount:.2f}"
-                ])
-            cash_table = Table(cash_data, colWidths=[80, 80, 80, 80, 80, 80])
-            cash_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(cash_table)
-            story.append(Spacer(1, 0.2 * 10))
+            job = self.app.report_jobs.submit(
+                f"{period} Report {start_date.strftime('%Y-%m-%d')} - {end_date.strftime('%Y-%m-%d')}",
+                run_range_report_job, start_date, end_date, current_user.username, current_user.role)
+        self.report_jobs_tree.selection_set(str(job.id))
+        self.report_jobs_tree.see(str(job.id))
+
+    def export_report_data(self):
+        """Queues a background job that streams the chosen dataset for the selected period to CSV or Parquet."""
+        selected = self._selected_report_period()
+        if not selected:
+            return
+        _, start_date, end_date = selected
+        label = self.export_dataset_combobox.get()
+        path = filedialog.asksaveasfilename(
+            parent=self.master, title="Export Data", defaultextension=".csv",
+            initialfile=f"{EXPORT_CHOICES[label]}_{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}.csv",
+            filetypes=[("CSV files", "*.csv"), ("Parquet files", "*.parquet")])
+        if not path:
+            return
+        current_user = self.app.current_user
+        job = self.app.report_jobs.submit(
+            f"Export {label} {start_date.strftime('%Y-%m-%d')} - {end_date.strftime('%Y-%m-%d')}", run_export_job,
+            EXPORT_CHOICES[label], path, start_date, end_date, None, current_user.username, current_user.role)
+        self.report_jobs_tree.selection_set(str(job.id))
+        self.report_jobs_tree.see(str(job.id))
+
+    def on_report_job_update(self, job):
+        """Report job listener (runs on the Tk thread): mirrors the job's state in the jobs list."""
+        if not self.report_jobs_tree.winfo_exists():
+            self.app.report_jobs.remove_listener(self.on_report_job_update)
+            return
+        values = (job.title, f"{job.progress * 100:.0f}%", job.status)
+        if self.report_jobs_tree.exists(str(job.id)):
+            self.report_jobs_tree.item(str(job.id), values=values)
         else:
-            story.append(Paragraph(f"No Cash Register Declarations found for {report_date_str}.", styles['Normal']))
-            story.append(Spacer(1, 0.2 * 10))
-
-        if salary_deductions_for_day:
-            story.append(Paragraph("<h3>Salary Deductions (for Manager):</h3>", styles['h3']))
-            deduction_data = [['Date', 'Amount', 'Reason']]
-            for ded in salary_deductions_for_day:
-                deduction_data.append([
-                    ded.deduction_date.strftime('%Y-%m-%d'),
-                    f"₦{ded.amount:.2f}",
-                    ded.reason
-                ])
-            deduction_table = Table(deduction_data, colWidths=[80, 80, 200])
-            deduction_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(deduction_table)
-            story.append(Spacer(1, 0.2 * 10))
+            self.report_jobs_tree.insert('', 0, values=values, iid=str(job.id))
+        self.update_report_job_controls()
+
+    def _selected_report_job(self):
+        selected = self.report_jobs_tree.selection()
+        if not selected:
+            return None
+        return next((job for job in self.app.report_jobs.jobs if str(job.id) == selected[0]), None)
+
+    def update_report_job_controls(self):
+        job = self._selected_report_job()
+        self.report_progress_bar['value'] = job.progress * 100 if job else 0
+        if job and not job.is_finished and not job.is_cancelled():
+            self.cancel_report_button.config(state='!disabled')
         else:
-            story.append(Paragraph(f"No Salary Deductions for you on {report_date_str}.", styles['Normal']))
-            story.append(Spacer(1, 0.2 * 10))
+            self.cancel_report_button.config(state='disabled')
 
-        try:
-            doc.build(story)
-            messagebox.showinfo("Report Generated", f"Report saved as {report_filename}")
-            log_action(self.app.current_user.username, self.app.current_user.role, 'Generated Report',
-                       new_value=report_filename)
-
-            recipient_email = 'paulwillie27@gmail.com'
-            sender_email = 'your_email@example.com'  # <--- IMPORTANT: CHANGE THIS TO YOUR SENDER EMAIL
-            sender_password = 'your_email_password'  # <--- IMPORTANT: CHANGE THIS TO YOUR EMAIL PASSWORD
-            smtp_server = 'smtp.gmail.com'
-            smtp_port = 465
-
-            if sender_email == 'your_email@example.com' or sender_password == 'your_email_password':
-                messagebox.showwarning("Email Setup Required",
-                                       "Email sending is not configured. Please edit the script to set your sender_email and sender_password variables, then try again.")
-            else:
-                msg = MIMEMultipart()
-                msg['From'] = sender_email
-                msg['To'] = recipient_email
-                msg['Subject'] = f"Bar Audit Daily Report - {report_date_str}"
-
-                body = f"Dear recipient,\n\nPlease find attached the daily bar audit report for {report_date_str}.\n\nRegards,\nYour Bar Audit System"
-                msg.attach(MIMEText(body, 'plain'))
-
-                with open(report_filename, 'rb') as f:
-                    attach = MIMEApplication(f.read(), _subtype="pdf")
-                    attach.add_header('Content-Disposition', 'attachment', filename=str(report_filename))
-                    msg.attach(attach)
-
-                try:
-                    server = smtplib.SMTP_SSL(smtp_server, smtp_port)
-                    server.login(sender_email, sender_password)
-                    server.sendmail(sender_email, recipient_email, msg.as_string())
-                    server.quit()
-                    messagebox.showinfo("Email Sent", f'Report emailed to {recipient_email} successfully!')
-                    log_action(self.app.current_user.username, self.app.current_user.role, 'Emailed Report',
-                               new_value=report_filename)
-                except Exception as e:
-                    messagebox.showwarning("Email Error",
-                                           f"Error sending email: {e}.\n\nPlease check your email configuration (sender_email, sender_password, smtp_server, smtp_port) and internet connection.\nFor Gmail, you might need to enable 'App Passwords' in your Google Account security settings if 2-Step Verification is on.")
-                    log_action(self.app.current_user.username, self.app.current_user.role, 'Failed to Email Report',
-                               new_value=f"Error:{e}")
-
-            if os.path.exists(report_filename):
-                os.remove(report_filename)
-
-        except Exception as e:
-            messagebox.showerror("Report Error", f"Failed to generate report: {e}\n{traceback.format_exc()}")
-            print(f"Error generating report: {traceback.format_exc()}")
-            log_action(self.app.current_user.username, self.app.current_user.role, 'Report Generation Failed',
-                       new_value=f"Error:{e}")
+    def cancel_selected_report_job(self):
+        job = self._selected_report_job()
+        if job and not job.is_finished:
+            job.cancel()
+            self.update_report_job_controls()
@@ -2,9 +2,12 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import date
 from views.base_ui import BaseUI
+from views.table_binding import TableBinding
 from database import db_session
-from models import User, InventoryItem, StaffSaleEntry, CashRegisterEntry, SalaryDeduction
-from helpers import log_action
+from models import User, InventoryItem, StaffSaleEntry, CashRegisterEntry
+from staff_totals import staff_day_totals
+from services import ServiceError
+from services import cash, sales
 
 
 class StaffViews(BaseUI):
@@ -13,9 +16,30 @@ class StaffViews(BaseUI):
 
     def show_staff_sales_entry(self):
         """Displays the staff's sales and cash declaration panel."""
-        self.clear_frame()
-        staff_sales_frame = ttk.Frame(self.master, padding="20", style="TFrame")
-        staff_sales_frame.pack(expand=True, fill="both")
+        self.show_screen('staff_sales_entry', self.build_staff_sales_entry, on_show=self.refresh_staff_sales_entry,
+                         layout_key=self.staff_sales_layout_key())
+
+    def staff_sales_layout_key(self):
+        """
+        Which sections the panel shows: the sale form and list, the cash declaration step or the finalized
+        summary. The cached panel is reused until the day or the step changes.
+        """
+        today = date.today()
+        day_totals = staff_day_totals(db_session, self.app.current_user.id, today)
+        cash_entry_today = db_session.query(CashRegisterEntry).filter_by(user_id=self.app.current_user.id,
+                                                                         entry_date=today).first()
+        finalized = bool(cash_entry_today and cash_entry_today.is_finalized)
+        return today, finalized, day_totals['all'][0] > 0, day_totals['pending'][0] == 0
+
+    def refresh_staff_sales_entry(self):
+        """Brings the item list, sales list and total up to date when the panel is shown again."""
+        if not hasattr(self, 'staff_sales_tree') or not self.staff_sales_tree.winfo_exists():
+            return  # The finalized summary has nothing to refresh
+        self.sale_item_combobox.config(values=[item.name for item in db_session.query(InventoryItem)])
+        self.load_staff_sales()
+        self.update_staff_total_sales_label()
+
+    def build_staff_sales_entry(self, staff_sales_frame):
         staff_sales_frame.grid_columnconfigure(0, weight=1)  # Make column expandable
         staff_sales_frame.grid_rowconfigure(3, weight=1)  # Allow sales tree to expand
 
@@ -26,9 +50,8 @@ class StaffViews(BaseUI):
             row=1, column=0, pady=5)
 
         today = date.today()
-        staff_sales_today = db_session.query(StaffSaleEntry).filter_by(staff_id=self.app.current_user.id,
-                                                                       entry_date=today).all()
-        inventory_items = db_session.query(InventoryItem).all()  # Get all inventory items for combobox
+        day_totals = staff_day_totals(db_session, self.app.current_user.id, today)
+        has_sales_today = day_totals['all'][0] > 0
         cash_entry_today = db_session.query(CashRegisterEntry).filter_by(user_id=self.app.current_user.id,
                                                                          entry_date=today).first()
 
@@ -41,8 +64,7 @@ class StaffViews(BaseUI):
 
             ttk.Label(add_sale_frame, text="Select Item:", style="TLabel").grid(row=0, column=0, sticky="w", padx=5,
                                                                                 pady=3)
-            self.sale_item_combobox = ttk.Combobox(add_sale_frame, values=[item.name for item in inventory_items],
-                                                   style="TCombobox")
+            self.sale_item_combobox = ttk.Combobox(add_sale_frame, style="TCombobox")
             self.sale_item_combobox.grid(row=0, column=1, sticky="ew", padx=5, pady=3, ipady=2)
 
             ttk.Label(add_sale_frame, text="Quantity:", style="TLabel").grid(row=1, column=0, sticky="w", padx=5,
@@ -80,28 +102,31 @@ class StaffViews(BaseUI):
             self.staff_sales_tree.configure(yscrollcommand=staff_sales_scroll.set)
             staff_sales_scroll.grid(row=0, column=1, sticky="ns", padx=(0, 5))
             self.staff_sales_tree.grid(row=0, column=0, sticky="nsew", padx=(5, 0), pady=5)  # Made sticky nsew
-            self.load_staff_sales()
+            self.staff_sales_table = TableBinding(self.staff_sales_tree, key=lambda sale: sale.id, values=lambda sale: (
+                sale.item_name, sale.quantity, f"₦{sale.price_per_unit:.2f}", f"₦{sale.total_cost:.2f}",
+                "Submitted" if sale.is_submitted else "Pending"
+            ))
 
-            system_total_sales = sum(sale.total_cost for sale in staff_sales_today)
+            system_total_sales = day_totals['all'][1]
             self.total_sales_label = ttk.Label(sales_display_frame,
                                                text=f"Total System Sales: ₦{system_total_sales:.2f}",
                                                style="Info.TLabel")
             self.total_sales_label.grid(row=1, column=0, pady=10, sticky="e", padx=5)  # Use grid for alignment
 
             # Conditionally display "Submit All Sales" button
-            all_sales_submitted = all(sale.is_submitted for sale in staff_sales_today)
-            if not all_sales_submitted and staff_sales_today:
+            all_sales_submitted = day_totals['pending'][0] == 0
+            if not all_sales_submitted and has_sales_today:
                 ttk.Button(sales_display_frame, text="Submit All Today's Sales", command=self.submit_all_staff_sales,
                            style="TButton").grid(row=2, column=0, pady=15, sticky="ew", ipadx=10, ipady=5)  # Use grid
-            elif staff_sales_today:  # All sales submitted, but cash declaration is pending
+            elif has_sales_today:  # All sales submitted, but cash declaration is pending
                 ttk.Label(sales_display_frame, text="All your sales for today have been submitted.",
                           style="SmallInfo.TLabel").grid(row=2, column=0, pady=5)  # Use grid
-            elif not staff_sales_today:  # No sales recorded for today
+            elif not has_sales_today:  # No sales recorded for today
                 ttk.Label(sales_display_frame, text="You have no sales recorded for today yet.",
                           style="SmallInfo.TLabel").grid(row=2, column=0, pady=5)  # Use grid
 
             # Cash & POS Declaration Section (only visible if all sales are submitted)
-            if all_sales_submitted and staff_sales_today:
+            if all_sales_submitted and has_sales_today:
                 cash_pos_declaration_frame = ttk.LabelFrame(staff_sales_frame, text="Declare End-of-Shift Cash & POS",
                                                             padding="15")
                 cash_pos_declaration_frame.grid(row=4, column=0, pady=10, sticky="ew", padx=10)
@@ -156,59 +181,33 @@ class StaffViews(BaseUI):
 
     def load_staff_sales(self):
         """Loads and displays the current staff's sales entries for today."""
-        for i in self.staff_sales_tree.get_children():
-            self.staff_sales_tree.delete(i)
         today = date.today()
-        sales = db_session.query(StaffSaleEntry).filter_by(staff_id=self.app.current_user.id, entry_date=today).all()
-        for sale in sales:
-            status = "Submitted" if sale.is_submitted else "Pending"
-            self.staff_sales_tree.insert('', 'end', values=(
-                sale.item_name, sale.quantity, f"₦{sale.price_per_unit:.2f}", f"₦{sale.total_cost:.2f}", status
-            ))
+        self.staff_sales_table.refresh(db_session.query(StaffSaleEntry).filter_by(
+            staff_id=self.app.current_user.id, entry_date=today).order_by(StaffSaleEntry.id).all())
 
     def add_staff_sale(self):
         """Adds a new sales entry for the current staff."""
         item_name = self.sale_item_combobox.get()
         try:
             quantity = int(self.sale_quantity_entry.get())
-            if quantity <= 0:
-                messagebox.showerror("Input Error", "Quantity must be positive.")
-                return
         except ValueError:
             messagebox.showerror("Input Error", "Please enter a valid positive number for quantity.")
             return
 
-        item = db_session.query(InventoryItem).filter_by(name=item_name).first()
-        if not item:
-            messagebox.showerror("Error", "Selected item not found in inventory. Please choose an existing item.")
+        try:
+            new_sale = self.run_service(sales.record_sale, item_name, quantity)
+        except ServiceError as e:
+            messagebox.showerror("Input Error", str(e))
             return
-
-        total_cost = item.price_per_unit * quantity
-        new_sale = StaffSaleEntry(
-            staff_id=self.app.current_user.id,
-            entry_date=date.today(),
-            item_name=item.name,
-            quantity=quantity,
-            price_per_unit=item.price_per_unit,
-            total_cost=total_cost,
-            is_submitted=False  # Initially, not submitted until "Submit All Today's Sales" is clicked
-        )
-        db_session.add(new_sale)
-        db_session.commit()
         messagebox.showinfo("Success",
-                            f"Sale of {quantity} x {item.name} recorded. Don't forget to Submit All Today's Sales!")
-        log_action(self.app.current_user.username, self.app.current_user.role, 'Staff Add Sale',
-                   new_value=f"{item.name} x {quantity}")
+                            f"Sale of {quantity} x {new_sale.item_name} recorded. Don't forget to Submit All Today's Sales!")
         self.sale_quantity_entry.delete(0, tk.END)  # Clear quantity entry
-        self.load_staff_sales()  # Refresh sales list
+        self.staff_sales_table.upsert(new_sale)  # Show the new sale without reloading the others
         self.update_staff_total_sales_label()  # Update total sales display
 
     def update_staff_total_sales_label(self):
         """Updates the label displaying the current staff's total system sales for today."""
-        today = date.today()
-        staff_sales_today = db_session.query(StaffSaleEntry).filter_by(staff_id=self.app.current_user.id,
-                                                                       entry_date=today).all()
-        system_total_sales = sum(sale.total_cost for sale in staff_sales_today)
+        system_total_sales = staff_day_totals(db_session, self.app.current_user.id, date.today())['all'][1]
         # Check if the label object exists and is still part of the UI
         if hasattr(self, 'total_sales_label') and self.total_sales_label.winfo_exists():
             self.total_sales_label.config(text=f"Total System Sales: ₦{system_total_sales:.2f}")
@@ -216,11 +215,7 @@ class StaffViews(BaseUI):
     def submit_all_staff_sales(self):
         """Submits all pending sales entries for the current staff for today."""
         today = date.today()
-        staff_sales_today = db_session.query(StaffSaleEntry).filter_by(staff_id=self.app.current_user.id,
-                                                                       entry_date=today,
-                                                                       is_submitted=False).all()
-
-        if not staff_sales_today:
+        if staff_day_totals(db_session, self.app.current_user.id, today)['pending'][0] == 0:
             messagebox.showinfo("Info", "No pending sales to submit for today.")
             return
 
@@ -228,12 +223,12 @@ class StaffViews(BaseUI):
                                    "Are you sure you want to submit all your pending sales for today? This cannot be changed later."):
             return
 
-        for sale in staff_sales_today:
-            sale.is_submitted = True  # Mark sales as submitted
-        db_session.commit()
+        try:
+            self.run_service(sales.submit_sales, entry_date=today)
+        except ServiceError as e:
+            messagebox.showinfo("Info", str(e))
+            return
         messagebox.showinfo("Success", "Your sales for today have been submitted. Now proceed to Declare Cash & POS.")
-        log_action(self.app.current_user.username, self.app.current_user.role, 'Staff Submit Sales',
-                   new_value=f"Sales for {today}")
         self.show_staff_sales_entry()  # Reload UI to show next step (cash declaration)
 
     def submit_staff_cash_pos(self):
@@ -241,9 +236,8 @@ class StaffViews(BaseUI):
         today = date.today()
         current_user = self.app.current_user
 
-        staff_sales_today = db_session.query(StaffSaleEntry).filter_by(staff_id=current_user.id, entry_date=today,
-                                                                       is_submitted=True).all()
-        if not staff_sales_today:
+        submitted_count, system_total_sales = staff_day_totals(db_session, current_user.id, today)['submitted']
+        if not submitted_count:
             messagebox.showerror("Error",
                                  "No submitted sales to declare cash/POS for today. Please submit sales first.")
             return
@@ -257,48 +251,22 @@ class StaffViews(BaseUI):
             messagebox.showerror("Input Error", "Declared Cash and POS must be numbers.")
             return
 
-        system_total_sales = sum(sale.total_cost for sale in staff_sales_today)
-
         if not messagebox.askyesno("Confirm Declaration",
                                    "Are you sure you want to submit your cash and POS declaration for today? This action is final."):
             return
 
-        # Create or update CashRegisterEntry for staff
-        cash_register_entry = db_session.query(CashRegisterEntry).filter_by(user_id=current_user.id,
-                                                                            entry_date=today).first()
-        if not cash_register_entry:
-            cash_register_entry = CashRegisterEntry(user_id=current_user.id, entry_date=today)
-            db_session.add(cash_register_entry)
-
-        cash_register_entry.declared_cash = declared_cash
-        cash_register_entry.declared_pos = declared_pos
-        cash_register_entry.system_total_sales = system_total_sales
-        cash_register_entry.is_finalized = True  # Mark cash entry as finalized
-
-        total_declared = declared_cash + declared_pos
-        mismatch = total_declared - system_total_sales
-        deduction_amount = 0.0
-
-        if mismatch != 0:
-            deduction_amount = abs(mismatch)
-            cash_register_entry.mismatch_amount = mismatch
-            cash_register_entry.deduction_amount = deduction_amount
-
-            old_balance = current_user.current_salary_balance
-            current_user.current_salary_balance -= deduction_amount  # Deduct from staff's salary
-            db_session.add(SalaryDeduction(  # Record the deduction
-                user_id=current_user.id,
-                amount=deduction_amount,
-                reason=f"Staff Cash/POS Mismatch for {today}. Expected: ₦{system_total_sales:.2f}, Declared: ₦{total_declared:.2f}"
-            ))
+        try:
+            cash_register_entry = self.run_service(cash.declare_staff_cash, declared_cash, declared_pos,
+                                                   entry_date=today)
+        except ServiceError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        if cash_register_entry.deduction_amount:
             messagebox.showwarning("Mismatch Detected",
-                                   f"Mismatch: ₦{mismatch:.2f}. ₦{deduction_amount:.2f} deducted from your salary.")
-            log_action(current_user.username, current_user.role, 'Staff Cash/POS Mismatch Deduction',
-                       old_value=f"Old Balance:{old_balance}",
-                       new_value=f"New Balance:{current_user.current_salary_balance}, Deduction:{deduction_amount}")
+                                   f"Mismatch: ₦{cash_register_entry.mismatch_amount:.2f}. "
+                                   f"₦{cash_register_entry.deduction_amount:.2f} deducted from your salary.")
         else:
             messagebox.showinfo("Success", "Cash and POS declaration tally with system sales. No deduction.")
 
-        db_session.commit()
         self.app.dashboard_view.update_user_info_label()  # Update header salary display
         self.show_staff_sales_entry()  # Reload UI to show finalized state
@@ -0,0 +1,70 @@
+class TableBinding:
+    """
+    Keeps a ttk.Treeview in step with a list of rows, keyed by primary key.
+    refresh() compares the new rows with what is on screen and only inserts, updates, moves or
+    deletes the items that changed, so refreshing after one edit touches one item, and the
+    selection and scroll position stay where they were.
+    """
+
+    def __init__(self, tree, key, values):
+        self.tree = tree
+        self.key = key  # row -> primary key, used as the item iid
+        self.values = values  # row -> tuple of column values
+        self._values = {}  # iid -> values currently shown
+        self._order = []  # iids in on-screen order
+
+    def refresh(self, rows):
+        """Makes the tree show exactly `rows`, in order. Returns the number of items changed."""
+        new_values = {}
+        new_order = []
+        for row in rows:
+            iid = str(self.key(row))
+            new_values[iid] = tuple(self.values(row))
+            new_order.append(iid)
+
+        stale = [iid for iid in self._order if iid not in new_values]
+        if stale:
+            self.tree.delete(*stale)
+            self._order = [iid for iid in self._order if iid in new_values]
+        changed = len(stale)
+
+        for index, iid in enumerate(new_order):
+            values = new_values[iid]
+            if iid not in self._values:
+                self.tree.insert('', index, iid=iid, values=values)
+                self._order.insert(index, iid)
+                changed += 1
+                continue
+            if self._values[iid] != values:
+                self.tree.item(iid, values=values)
+                changed += 1
+            if self._order[index] != iid:
+                self.tree.move(iid, '', index)
+                self._order.remove(iid)
+                self._order.insert(index, iid)
+                changed += 1
+        self._values = new_values
+        return changed
+
+    def upsert(self, row, index='end'):
+        """Shows one added or edited row without reloading the rest."""
+        iid = str(self.key(row))
+        values = tuple(self.values(row))
+        if iid in self._values:
+            if self._values[iid] != values:
+                self.tree.item(iid, values=values)
+        else:
+            self.tree.insert('', index, iid=iid, values=values)
+            if index == 'end':
+                self._order.append(iid)
+            else:
+                self._order.insert(index, iid)
+        self._values[iid] = values
+
+    def remove(self, key):
+        """Removes the row with this primary key, if it is shown."""
+        iid = str(key)
+        if iid in self._values:
+            self.tree.delete(iid)
+            del self._values[iid]
+            self._order.remove(iid)